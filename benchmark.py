@@ -0,0 +1,222 @@
+"""Performance benchmark for the load/filter/sort/render/export engine.
+
+Synthesizes scaled-up copies of car_price_dataset.csv and times each stage,
+recording wall time and peak RSS per stage to a JSON report:
+
+    python benchmark.py                                  # 10k, 100k, 1M, 5M rows
+    python benchmark.py --sizes 10000 100000 --out before.json
+    python benchmark.py --sizes 10000 100000 --out after.json --compare before.json
+
+Excel stages (writing the test workbook, sheet listing, xlsx load and xlsx
+export) only run up to --xlsx-max-rows, since xlsx is slow to produce and
+capped at 1,048,576 rows; larger sizes start from the in-memory frame.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from column_store import open_store
+from data_view import ColumnCache, DataView, build_view
+from exporter import EXCEL_MAX_ROWS, EXPORT_FORMATS, HAS_PYARROW, export_view
+from filter_engine import Condition, evaluate, parse_filter
+from perf_stats import RssSampler
+from sheet_cache import SheetCache
+from sheet_index import scan_workbook
+from workbook_loader import WorkbookLoader
+
+DEFAULT_SIZES = [10000, 100000, 1000000, 5000000]
+DEFAULT_XLSX_MAX_ROWS = 100000
+DATASET = "car_price_dataset.csv"
+PAGE_SIZE = 50
+
+# One condition per filter type the apps offer
+FILTERS = [
+    ("Brand", "equals", "Kia"),
+    ("Model", "contains", "a"),
+    ("Fuel_Type", "starts with", "El"),
+    ("Transmission", "ends with", "ic"),
+    ("Price", "greater than", "10000"),
+    ("Mileage", "less than", "50000"),
+]
+COMPOUND_FILTER = "Brand = Kia AND Year > 2015 OR Fuel_Type = Electric"
+SORT = (("Price", False),)
+MULTI_SORT = (("Brand", True), ("Year", False), ("Price", True))
+
+
+class Benchmark:
+    def __init__(self):
+        self.results = []
+
+    def run(self, rows, stage, func):
+        """Time func() as one stage and record it; returns func's result"""
+        with RssSampler() as rss:
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+        record = {
+            "rows": rows,
+            "stage": stage,
+            "seconds": round(elapsed, 6),
+            "rows_per_sec": round(rows / elapsed) if elapsed > 0 else None,
+            "peak_rss_mb": round(rss.peak, 1) if rss.peak is not None else None,
+            "rss_delta_mb": round(rss.peak - rss.baseline, 1) if rss.peak is not None else None,
+        }
+        self.results.append(record)
+        delta = f"{record['rss_delta_mb']:+,.1f} MB" if record["rss_delta_mb"] is not None else "n/a"
+        print(f"{rows:>10,}  {stage:<36} {elapsed:>9.3f}s  {delta:>12}")
+        return result
+
+    def skip(self, rows, stage, reason):
+        self.results.append({"rows": rows, "stage": stage, "skipped": reason})
+        print(f"{rows:>10,}  {stage:<36} {'skipped':>10}  ({reason})")
+
+
+def synthesize(base, rows, seed=0):
+    """Resample the dataset to the given row count, jittering the numbers a
+    little so sorts and numeric filters don't see only the original values"""
+    rng = np.random.default_rng(seed)
+    df = base.iloc[rng.integers(0, len(base), rows)].reset_index(drop=True)
+    df["Mileage"] = (df["Mileage"] + rng.integers(-500, 500, rows)).clip(lower=0)
+    df["Price"] = (df["Price"] + rng.integers(-100, 100, rows)).clip(lower=0)
+    return df
+
+
+def bench_size(bench, base, rows, work_dir, xlsx_max_rows):
+    df = synthesize(base, rows)
+
+    # Sheet listing and load need a real workbook
+    if rows <= min(xlsx_max_rows, EXCEL_MAX_ROWS - 1):
+        xlsx = os.path.join(work_dir, f"cars_{rows}.xlsx")
+        print(f"{rows:>10,}  (writing test workbook...)")
+        df.to_excel(xlsx, index=False, sheet_name="cars")
+
+        bench.run(rows, "sheet listing: metadata scan", lambda: scan_workbook(xlsx))
+        bench.run(rows, "sheet listing: openpyxl", lambda: _close_after(WorkbookLoader(xlsx), lambda loader: loader.sheet_names))
+        df = bench.run(rows, "load xlsx", lambda: _close_after(WorkbookLoader(xlsx), lambda loader: loader.read_sheet("cars")))
+        bench.run(rows, "load xlsx: 3 of 10 columns", lambda: _close_after(WorkbookLoader(xlsx), lambda loader: loader.read_sheet("cars", usecols=["Brand", "Year", "Price"])))
+
+        cache = SheetCache(os.path.join(work_dir, "sheet_cache"), max_bytes=2 ** 40)
+        bench.run(rows, "sheet cache: store", lambda: cache.put(xlsx, "cars", df))
+        bench.run(rows, "load from sheet cache", lambda: cache.get(xlsx, "cars"))
+    else:
+        for stage in ("sheet listing: metadata scan", "sheet listing: openpyxl", "load xlsx",
+                      "load xlsx: 3 of 10 columns", "sheet cache: store", "load from sheet cache"):
+            bench.skip(rows, stage, f"over --xlsx-max-rows {xlsx_max_rows:,}")
+
+    # CSV has no row limit, so it is measured at every size
+    csv_path = os.path.join(work_dir, f"cars_{rows}.csv")
+    df.to_csv(csv_path, index=False)
+    sheet = os.path.splitext(os.path.basename(csv_path))[0]
+    bench.run(rows, "load csv", lambda: WorkbookLoader(csv_path, memory_map=False).read_sheet(sheet))
+    bench.run(rows, "load csv: memory-mapped", lambda: WorkbookLoader(csv_path, memory_map=True).read_sheet(sheet))
+    store_dir = os.path.join(work_dir, "column_store")
+    bench.run(rows, "column store: convert csv", lambda: open_store(WorkbookLoader(csv_path), sheet, store_dir=store_dir))
+    store = bench.run(rows, "column store: open", lambda: open_store(WorkbookLoader(csv_path), sheet, store_dir=store_dir))
+    store_view = DataView(store)
+    bench.run(rows, "column store: filter + sort", lambda: build_view(store_view, parse_filter(COMPOUND_FILTER), SORT))
+    del store, store_view
+    shutil.rmtree(store_dir)
+    os.remove(csv_path)
+
+    # Each filter on a cold column cache, so per-column setup is included
+    for column, condition, value in FILTERS:
+        bench.run(rows, f"filter: {column} {condition} {value}", lambda: evaluate(Condition(column, condition, value), ColumnCache(df)))
+    cache = ColumnCache(df)
+    expression = parse_filter(COMPOUND_FILTER)
+    bench.run(rows, "filter: compound (cold)", lambda: evaluate(expression, cache))
+    cache.masks.clear()
+    bench.run(rows, "filter: compound (warm columns)", lambda: evaluate(expression, cache))
+
+    base_view = DataView(df, cache=cache)
+    bench.run(rows, "sort: Price desc (cold)", lambda: build_view(base_view, None, SORT))
+    bench.run(rows, "sort: Price desc (cached order)", lambda: build_view(base_view, None, SORT))
+    bench.run(rows, "sort: 3 keys", lambda: build_view(base_view, None, MULTI_SORT))
+    cache.masks.clear()
+    view = bench.run(rows, "filter + sort", lambda: build_view(base_view, expression, SORT))
+    bench.run(rows, "render first page", lambda: view.rows(0, PAGE_SIZE))
+
+    # Export the whole sheet in display order
+    sorted_view = build_view(base_view, None, SORT)
+    for fmt, extension in EXPORT_FORMATS.items():
+        stage = f"export: {fmt}"
+        if fmt == "Excel" and rows > min(xlsx_max_rows, EXCEL_MAX_ROWS - 1):
+            bench.skip(rows, stage, f"over --xlsx-max-rows {xlsx_max_rows:,}")
+            continue
+        if fmt in ("Parquet", "Feather", "CSV (zstd)") and not HAS_PYARROW:
+            bench.skip(rows, stage, "pyarrow not installed")
+            continue
+        path = os.path.join(work_dir, f"export_{rows}{extension}")
+        bench.run(rows, stage, lambda: export_view(sorted_view, path, fmt=fmt))
+        os.remove(path)
+
+
+def _close_after(loader, func):
+    try:
+        return func(loader)
+    finally:
+        loader.close()
+
+
+def compare(results, previous_file):
+    """Print each stage's time against a previous report"""
+    with open(previous_file) as f:
+        previous = {(r["rows"], r["stage"]): r for r in json.load(f)["results"] if "seconds" in r}
+    print(f"\nCompared with {previous_file}:")
+    print(f"{'Rows':>10}  {'Stage':<36} {'Before':>9}  {'After':>9}  {'Change':>8}")
+    for record in results:
+        old = previous.get((record["rows"], record["stage"]))
+        if old is None or "seconds" not in record:
+            continue
+        change = (record["seconds"] / old["seconds"] - 1) * 100 if old["seconds"] > 0 else 0.0
+        print(f"{record['rows']:>10,}  {record['stage']:<36} {old['seconds']:>8.3f}s  {record['seconds']:>8.3f}s  {change:>+7.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Excel utility engine on scaled car price data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Row counts to test")
+    parser.add_argument("--xlsx-max-rows", type=int, default=DEFAULT_XLSX_MAX_ROWS, help="Largest size for Excel stages")
+    parser.add_argument("--dataset", default=DATASET, help="CSV to scale up")
+    parser.add_argument("--out", default="bench_report.json", help="JSON report to write")
+    parser.add_argument("--compare", help="Previous JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    base = pd.read_csv(args.dataset)
+    bench = Benchmark()
+    work_dir = tempfile.mkdtemp(prefix="excel-util-bench-")
+    try:
+        print(f"{'Rows':>10}  {'Stage':<36} {'Time':>10}  {'Peak RSS +':>12}")
+        for rows in args.sizes:
+            bench_size(bench, base, rows, work_dir, args.xlsx_max_rows)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "sizes": args.sizes,
+        "results": bench.results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.out}")
+
+    if args.compare:
+        compare(bench.results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,351 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_STORE_DIR = "column_store"
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024 * 1024
+MANIFEST = "manifest.json"
+# Rows rewritten at a time when finishing a store
+BLOCK_ROWS = 1 << 20
+
+
+class ColumnStore:
+    """A sheet converted to memory-mapped column files on disk.
+
+    Numbers are stored as float64 (remembering whether they were all
+    integers, to give them back as int64), dates as int64 nanoseconds and
+    everything else dictionary-encoded: int32 codes on disk (-1 for blanks)
+    and the distinct values, sorted, in memory. Opening a store maps the
+    files without reading them, so a sheet larger than RAM can be viewed:
+    the OS pages in the blocks that filters, sorts, exports and the grid
+    actually touch and can drop them again under memory pressure.
+
+    It stands in for the sheet's DataFrame where the apps use one: columns,
+    len(), store[column] (a Series over the mapped data) and
+    store.iloc[rows, positions] (a DataFrame of just those rows).
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST), "r") as f:
+            manifest = json.load(f)
+        self.rows = manifest["rows"]
+        self.specs = manifest["columns"]
+        self.columns = pd.Index([spec["name"] for spec in self.specs])
+        self._arrays = {}
+        self._categories = {}
+        for i, spec in enumerate(self.specs):
+            dtype = np.int32 if spec["kind"] == "text" else np.int64 if spec["kind"] == "datetime" else np.float64
+            file = os.path.join(directory, f"{i}.bin")
+            # np.memmap can't map an empty file
+            self._arrays[spec["name"]] = np.memmap(file, dtype=dtype, mode="r", shape=(self.rows,)) if self.rows else np.zeros(0, dtype)
+            if spec["kind"] == "text":
+                with open(os.path.join(directory, f"{i}.categories"), "rb") as f:
+                    self._categories[spec["name"]] = pickle.load(f)
+        self.iloc = _ILoc(self)
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, column):
+        return pd.Series(self._values(column, slice(None)), name=column, copy=False)
+
+    def numeric(self, column):
+        """The column as float64, mapped rather than copied for numbers"""
+        spec = self._spec(column)
+        if spec["kind"] == "number":
+            return self._arrays[column]
+        return pd.to_numeric(self[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def memory_usage(self):
+        """Bytes held in memory (the distinct text values); the rest is mapped"""
+        return sum(categories.nbytes for categories in self._categories.values())
+
+    def schema_frame(self, columns):
+        """A small frame with every distinct text value and some rows of the
+        other columns, which infers the same column types as the whole store"""
+        columns = list(columns)
+        size = min(self.rows, max([1] + [len(self._categories[col]) for col in columns if col in self._categories]))
+        frame = {}
+        for col in columns:
+            if col in self._categories:
+                values = np.full(size, None, dtype=object)
+                values[:len(self._categories[col])] = self._categories[col]
+                frame[col] = values
+            else:
+                frame[col] = self._values(col, slice(0, size))
+        return pd.DataFrame(frame, columns=columns)
+
+    def take(self, rows, columns=None):
+        """A DataFrame of the given row positions"""
+        columns = list(self.columns) if columns is None else list(columns)
+        return pd.DataFrame({col: self._values(col, rows) for col in columns}, columns=columns)
+
+    def _spec(self, column):
+        return self.specs[self.columns.get_loc(column)]
+
+    def _values(self, column, rows):
+        spec = self._spec(column)
+        data = self._arrays[column][rows]
+        if spec["kind"] == "text":
+            categories = self._categories[column]
+            if isinstance(rows, slice) and rows == slice(None):
+                # Whole column: a categorical over the mapped codes
+                return pd.Categorical.from_codes(data, categories=pd.Index(categories))
+            values = np.empty(len(data), dtype=object)
+            present = data >= 0
+            values[present] = categories[data[present]]
+            values[~present] = None
+            return values
+        if spec["kind"] == "datetime":
+            return np.asarray(data).view("datetime64[ns]")
+        if spec.get("integer"):
+            return np.asarray(data).astype(np.int64)
+        return data
+
+
+class _ILoc:
+    """store.iloc[rows, positions] as DataFrame.iloc does it"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, key):
+        rows, positions = key if isinstance(key, tuple) else (key, slice(None))
+        columns = self.store.columns[positions]
+        return self.store.take(rows, [columns] if isinstance(columns, str) else columns)
+
+
+def store_key(path, sheet_name, columns=None):
+    stat = os.stat(path)
+    raw = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}|{sheet_name}"
+    if columns is not None:
+        raw += "|" + "\x1f".join(str(col) for col in columns)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def open_store(loader, sheet_name, usecols=None, stats=None, on_chunk=None, store_dir=DEFAULT_STORE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """Open the column store of a sheet, converting it on first use.
+
+    The sheet is streamed from the loader chunk by chunk, so converting it
+    never needs more memory than one chunk. Stores are keyed like the sheet
+    cache (file, size, mtime, sheet and columns) and the least recently
+    used ones are deleted beyond max_bytes.
+    """
+    usecols = loader.projection(sheet_name, usecols)
+    directory = os.path.join(store_dir, store_key(loader.path, sheet_name, usecols))
+    if os.path.exists(os.path.join(directory, MANIFEST)):
+        os.utime(directory)  # Mark as recently used
+        store = ColumnStore(directory)
+        if stats is not None:
+            stats.from_cache = True
+            stats.add(len(store))
+        return store
+
+    def chunks():
+        index = -1
+        for index, chunk in enumerate(loader.iter_chunks(sheet_name, stats, usecols, stream=True)):
+            if on_chunk is not None:
+                on_chunk(chunk, index)
+            yield chunk
+        if index < 0:
+            # No data rows: keep the header's columns
+            yield pd.DataFrame(columns=usecols if usecols is not None else loader.header(sheet_name))
+
+    store = build_store(directory, chunks())
+    prune_stores(store_dir, max_bytes, keep=directory)
+    return store
+
+
+def build_store(directory, chunks):
+    """Write DataFrame chunks as a ColumnStore in directory and open it"""
+    tmp = directory + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    writers = None
+    rows = 0
+    try:
+        for chunk in chunks:
+            if writers is None:
+                writers = [_ColumnWriter(tmp, i, name) for i, name in enumerate(chunk.columns)]
+            for i, writer in enumerate(writers):
+                writer.append(chunk.iloc[:, i], rows)
+            rows += len(chunk)
+
+        specs = [writer.finish(rows) for writer in writers or []]
+        with open(os.path.join(tmp, MANIFEST), "w") as f:
+            json.dump({"rows": rows, "columns": specs}, f)
+    except BaseException:
+        for writer in writers or []:
+            writer.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    # The manifest is written last and the directory renamed into place, so
+    # an interrupted conversion never looks complete
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+    return ColumnStore(directory)
+
+
+def prune_stores(store_dir, max_bytes, keep=None):
+    """Delete least recently used stores until the rest fit max_bytes"""
+    entries = []
+    for name in os.listdir(store_dir):
+        full = os.path.join(store_dir, name)
+        if not os.path.isdir(full) or full == keep:
+            continue
+        size = sum(os.path.getsize(os.path.join(full, file)) for file in os.listdir(full))
+        entries.append((os.stat(full).st_mtime, size, full))
+
+    total = sum(size for _, size, _ in entries)
+    if keep is not None:
+        total += sum(os.path.getsize(os.path.join(keep, file)) for file in os.listdir(keep))
+    for _, size, full in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(full, ignore_errors=True)
+        total -= size
+
+
+class _ColumnWriter:
+    """Appends one column's chunks to its file, choosing the storage kind
+    from the first chunk and falling back to text if a later one doesn't fit"""
+
+    def __init__(self, directory, number, name):
+        self.file = os.path.join(directory, f"{number}.bin")
+        self.categories_file = os.path.join(directory, f"{number}.categories")
+        self.name = str(name)
+        self.kind = None
+        self.integer = True
+        self.lookup = {}
+        self.categories = []
+        self.handle = open(self.file, "wb")
+
+    def append(self, series, offset):
+        if self.kind is None:
+            self.kind = _kind(series)
+        if self.kind == "number":
+            values = _as_numbers(series)
+            if values is None:
+                self._to_text(offset)
+            else:
+                self.integer = self.integer and bool(np.all(np.mod(values, 1) == 0))
+                self.handle.write(values.tobytes())
+                return
+        if self.kind == "datetime":
+            values = _as_datetimes(series)
+            if values is None:
+                self._to_text(offset)
+            else:
+                self.handle.write(values.tobytes())
+                return
+        self.handle.write(self._encode(series.to_numpy(dtype=object)).tobytes())
+
+    def finish(self, rows):
+        self.close()
+        spec = {"name": self.name, "kind": self.kind or "text"}
+        if self.kind == "number":
+            spec["integer"] = self.integer and rows > 0
+        if spec["kind"] == "text":
+            self._sort_categories(rows)
+            with open(self.categories_file, "wb") as f:
+                pickle.dump(np.array(self.categories + [None], dtype=object)[:-1], f)
+        return spec
+
+    def close(self):
+        if not self.handle.closed:
+            self.handle.close()
+
+    def _encode(self, values):
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        mapping = np.empty(len(uniques) + 1, dtype=np.int32)
+        mapping[-1] = -1  # factorize's -1 for blanks stays -1
+        for i, value in enumerate(uniques):
+            code = self.lookup.get(value)
+            if code is None:
+                code = self.lookup[value] = len(self.categories)
+                self.categories.append(value)
+            mapping[i] = code
+        return mapping[codes]
+
+    def _to_text(self, rows):
+        # Re-encode what was written so far as text
+        self.handle.close()
+        if rows:
+            dtype = np.int64 if self.kind == "datetime" else np.float64
+            old = np.fromfile(self.file, dtype=dtype, count=rows)
+            if self.kind == "datetime":
+                values = pd.Series(old.view("datetime64[ns]")).astype(object).where(old != np.iinfo(np.int64).min, None)
+            elif self.integer:
+                values = pd.Series(old).astype(object).where(~np.isnan(old), None).map(lambda v: v if v is None else int(v))
+            else:
+                values = pd.Series(old).astype(object).where(~np.isnan(old), None)
+            codes = self._encode(values.to_numpy(dtype=object))
+        self.handle = open(self.file, "wb")
+        if rows:
+            self.handle.write(codes.tobytes())
+        self.kind = "text"
+
+    def _sort_categories(self, rows):
+        # Sorted categories keep sorts and group orders in value order
+        try:
+            order = sorted(range(len(self.categories)), key=self.categories.__getitem__)
+        except TypeError:
+            # Mixed types that can't be compared, e.g. numbers and "N/A"
+            order = sorted(range(len(self.categories)), key=lambda i: mixed_sort_key(self.categories[i]))
+        if order == list(range(len(order))) or not rows:
+            self.categories = [self.categories[i] for i in order]
+            return
+        remap = np.empty(len(order) + 1, dtype=np.int32)
+        remap[np.array(order, dtype=np.int64)] = np.arange(len(order), dtype=np.int32)
+        remap[-1] = -1
+        codes = np.memmap(self.file, dtype=np.int32, mode="r+", shape=(rows,))
+        for start in range(0, rows, BLOCK_ROWS):
+            codes[start:start + BLOCK_ROWS] = remap[codes[start:start + BLOCK_ROWS]]
+        codes.flush()
+        del codes
+        self.categories = [self.categories[i] for i in order]
+
+
+def mixed_sort_key(value):
+    """Sort key for values of mixed types: numbers first in numeric order,
+    then everything else by its text"""
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_)):
+        return (0, float(value), "")
+    return (1, 0.0, str(value))
+
+
+def _kind(series):
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return "text"
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return "number"
+    if pd.api.types.is_datetime64_dtype(series.dtype):
+        return "datetime"
+    return "text"
+
+
+def _as_numbers(series):
+    """float64 values of a chunk, or None if it holds anything but numbers"""
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return None
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return series.to_numpy(dtype=np.float64, na_value=np.nan)
+    if series.isna().all():
+        return np.full(len(series), np.nan)
+    return None
+
+
+def _as_datetimes(series):
+    """int64 nanoseconds of a chunk, or None if it holds anything but dates"""
+    if pd.api.types.is_datetime64_dtype(series.dtype):
+        return series.astype("datetime64[ns]").to_numpy().view(np.int64)
+    if series.isna().all():
+        return np.full(len(series), np.iinfo(np.int64).min, dtype=np.int64)
+    return None
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+# Text columns with at most this share of distinct values become categoricals
+MAX_CATEGORY_RATIO = 0.5
+
+
+def frame_memory(df):
+    """Bytes held by a frame, including the Python objects in text columns"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def compact_column(series, max_category_ratio=MAX_CATEGORY_RATIO):
+    """Return the series in a smaller dtype, or unchanged if none fits.
+
+    Integers are downcast to the smallest integer type holding their range,
+    floats to float32 only when no value changes, and text with few
+    distinct values (relative to the row count) becomes a categorical.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype) or len(series) == 0:
+        return series
+
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return series
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return pd.to_numeric(series, downcast="integer")
+    if pd.api.types.is_float_dtype(series.dtype):
+        if series.dtype == np.float32:
+            return series
+        values = series.to_numpy()
+        with np.errstate(over="ignore"):
+            narrow = values.astype(np.float32)
+        # float32 would turn e.g. 4.7 into 4.699999809, breaking equals filters
+        if np.array_equal(narrow.astype(np.float64), values, equal_nan=True):
+            return pd.Series(narrow, index=series.index, name=series.name)
+        return series
+
+    if pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype):
+        # Only pure text: mixed numbers and strings don't sort as categories
+        if pd.api.types.infer_dtype(series, skipna=True) != "string":
+            return series
+        if series.nunique(dropna=True) <= max_category_ratio * len(series):
+            return series.astype("category")
+    return series
+
+
+def compact_frame(df, max_category_ratio=MAX_CATEGORY_RATIO):
+    """Return (compacted copy of df, bytes before, bytes after)"""
+    before = frame_memory(df)
+    compacted = pd.DataFrame({col: compact_column(df[col], max_category_ratio) for col in df.columns}, index=df.index)
+    # Duplicate column names can't go through a dict: keep those as they were
+    if len(compacted.columns) != len(df.columns):
+        compacted = df
+    return compacted, before, frame_memory(compacted)
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:,.1f} {unit}" if unit != "B" else f"{size:,} B"
+        size /= 1024
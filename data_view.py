@@ -0,0 +1,289 @@
+import numpy as np
+import pandas as pd
+
+from column_store import ColumnStore, mixed_sort_key
+from filter_engine import MaskCache, evaluate
+from summary import SummaryCache
+
+
+class TextColumn:
+    """Lowercase, categorical-encoded shadow of one column for text filters.
+
+    The column is factorized and its distinct values lowercased once;
+    afterwards a text predicate is evaluated over the distinct values only
+    and expanded to rows with a single integer-code lookup. Blank cells
+    (missing or empty text) share one code that no text condition matches,
+    however the sheet was loaded.
+    """
+
+    def __init__(self, series):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes, values = series.cat.codes.to_numpy(), series.cat.categories
+        else:
+            codes, values = pd.factorize(series, use_na_sentinel=True)
+        codes, categories = self._lowercase(codes, values)
+        self.codes = codes.astype(np.int32) if len(categories) < 2 ** 31 else codes
+        self.categories = pd.Series(categories, dtype=object)
+        self._counts = None
+
+    @staticmethod
+    def _lowercase(codes, values):
+        # The one place text is normalized: values (never missing here) are
+        # lowercased, case variants merge into one code, and blanks (code
+        # -1, or empty text) get the last code, holding a missing value
+        lower = pd.Index(values).astype(str).str.lower()
+        lower_codes, categories = pd.factorize(lower)
+        blank = len(categories)
+        lower_codes = np.append(np.where(lower == "", blank, lower_codes), blank)
+        return lower_codes[codes], list(categories) + [np.nan]
+
+    def hits(self, condition, value):
+        """Return a boolean array over the distinct values ("contains"
+        takes a regular expression)"""
+        lower = value.lower()
+        if condition == "equals":
+            hits = self.categories == lower
+        elif condition == "contains":
+            hits = self.categories.str.contains(value, case=False, na=False)
+        elif condition == "starts with":
+            hits = self.categories.str.startswith(lower, na=False)
+        elif condition == "ends with":
+            hits = self.categories.str.endswith(lower, na=False)
+        else:
+            raise ValueError(f"Unknown text condition '{condition}'")
+        return hits.to_numpy(dtype=bool)
+
+    def counts(self):
+        """Number of rows holding each distinct value"""
+        if self._counts is None:
+            self._counts = np.bincount(self.codes, minlength=len(self.categories))
+        return self._counts
+
+    def mask(self, condition, value, rows=None):
+        codes = self.codes if rows is None else self.codes[rows]
+        return self.hits(condition, value)[codes]
+
+
+class ColumnCache:
+    """Derived per-column data for one source frame, built lazily on first use"""
+
+    def __init__(self, source):
+        self.source = source
+        self._text = {}
+        self._numeric = {}
+        self._ranks = {}
+        self._orders = {}
+        self._groups = {}
+        self.masks = MaskCache()
+        self.summaries = SummaryCache()
+
+    def text(self, column):
+        if column not in self._text:
+            self._text[column] = TextColumn(self.source[column])
+        return self._text[column]
+
+    def numeric(self, column):
+        """The column as float64 (NaN where a value isn't numeric)"""
+        if column not in self._numeric:
+            if isinstance(self.source, ColumnStore):
+                # Number columns are used straight from the memory map
+                self._numeric[column] = self.source.numeric(column)
+            else:
+                self._numeric[column] = pd.to_numeric(self.source[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        return self._numeric[column]
+
+    def ranks(self, column, ascending=True):
+        """Dense sort ranks of the column: equal values share a rank and
+        blanks rank last in either direction"""
+        key = (column, ascending)
+        if key not in self._ranks:
+            series = self.source[column]
+            try:
+                if isinstance(series.dtype, pd.CategoricalDtype):
+                    # Ranked through the categories, never the row values
+                    self._ranks[key] = categorical_ranks(series, ascending)
+                else:
+                    ranks = series.rank(method="dense", ascending=ascending, na_option="bottom")
+                    self._ranks[key] = ranks.to_numpy(dtype=np.int32) - 1
+            except TypeError:
+                # Values that can't be compared, such as numbers and "N/A"
+                self._ranks[key] = mixed_ranks(self.source[column], ascending)
+        return self._ranks[key]
+
+    def order(self, column, ascending=True):
+        """Stable argsort of the whole column (source row positions)"""
+        key = (column, ascending)
+        if key not in self._orders:
+            self._orders[key] = np.argsort(self.ranks(column, ascending), kind="stable")
+        return self._orders[key]
+
+    def groups(self, column):
+        """(codes, labels): the column's distinct values, sorted with blanks
+        last where the values allow it, and each row's index into them"""
+        if column not in self._groups:
+            try:
+                codes, labels = pd.factorize(self.source[column], sort=True, use_na_sentinel=False)
+            except TypeError:
+                # Mixed types that can't be ordered: keep first appearance order
+                codes, labels = pd.factorize(self.source[column], use_na_sentinel=False)
+            self._groups[column] = (codes.astype(np.int32), labels)
+        return self._groups[column]
+
+
+def categorical_ranks(series, ascending=True):
+    """Dense ranks of a categorical column (compact loads, ColumnStore text),
+    computed on its categories and expanded through the codes; categories
+    of mixed types are ordered as mixed_ranks orders values"""
+    categories = pd.Series(series.cat.categories)
+    try:
+        category_ranks = categories.rank(method="dense", ascending=ascending).to_numpy(dtype=np.int64) - 1
+    except TypeError:
+        category_ranks = mixed_ranks(categories, ascending).astype(np.int64)
+    codes = series.cat.codes.to_numpy()
+
+    # Renumber the ranks of the categories that occur, so ranks stay dense
+    occurs = np.bincount(codes[codes >= 0], minlength=len(categories)) > 0
+    used = np.zeros(len(categories) + 1, dtype=bool)
+    used[category_ranks[occurs]] = True
+    dense = np.cumsum(used) - 1
+    # Code -1 (blank) picks the last entry
+    lookup = np.append(dense[category_ranks], used.sum()).astype(np.int32)
+    return lookup[codes]
+
+
+def mixed_ranks(series, ascending=True):
+    """Dense ranks of a column whose values can't be compared with each
+    other: numbers first in numeric order, then the other values by their
+    text, blanks last in either direction"""
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    keys = [mixed_sort_key(value) for value in uniques]
+    unique_ranks = np.empty(len(keys) + 1, dtype=np.int32)
+    rank, previous = -1, None
+    for i in sorted(range(len(keys)), key=keys.__getitem__):
+        if keys[i] != previous:
+            rank, previous = rank + 1, keys[i]
+        unique_ranks[i] = rank
+    if not ascending:
+        unique_ranks[:-1] = rank - unique_ranks[:-1]
+    # Code -1 (blank) picks the last entry
+    unique_ranks[-1] = rank + 1
+    return unique_ranks[codes]
+
+
+class DataView:
+    """Filtered and sorted view over a source DataFrame.
+
+    The source frame is never modified or copied. A filter is kept as a
+    boolean mask over source rows and a sort as a permutation of the matching
+    rows, so the view is just an array of source row positions. Rows are only
+    materialized for the visible window or on export.
+
+    Views over the same sheet should share one ColumnCache so derived column
+    data (such as lowercase text codes and sort orders) is built only once
+    per sheet.
+
+    A sort is a list of (column, ascending) keys, most significant first.
+    """
+
+    def __init__(self, source, columns=None, cache=None):
+        self.source = source
+        self.columns = list(source.columns) if columns is None else list(columns)
+        self.cache = ColumnCache(source) if cache is None else cache
+        self.mask = None
+        self.filter_spec = None
+        self.sort_keys = []
+        self._index = None
+
+    def copy(self):
+        """Return a view with the same state; the source frame is shared"""
+        view = DataView(self.source, self.columns, self.cache)
+        view.mask = self.mask
+        view.filter_spec = self.filter_spec
+        view.sort_keys = self.sort_keys
+        view._index = self._index
+        return view
+
+    def set_filter(self, mask, spec=None):
+        self.mask = None if mask is None else np.asarray(mask, dtype=bool)
+        self.filter_spec = spec
+        self._index = None
+
+    def clear_filter(self):
+        self.set_filter(None)
+
+    def set_sort(self, keys):
+        self.sort_keys = [(column, bool(ascending)) for column, ascending in keys or ()]
+        self._index = None
+
+    def clear_sort(self):
+        self.set_sort(None)
+
+    @property
+    def sort_spec(self):
+        return tuple(self.sort_keys) if self.sort_keys else None
+
+    @property
+    def index(self):
+        """Source row positions in display order"""
+        if self._index is None:
+            if self.sort_keys:
+                self._index = self._sorted_rows()
+            elif self.mask is None:
+                self._index = np.arange(len(self.source))
+            else:
+                self._index = np.flatnonzero(self.mask)
+        return self._index
+
+    def _sorted_rows(self):
+        # The least significant key's cached order, restricted to the
+        # matching rows in one O(n) pass, already has ties in source order
+        column, ascending = self.sort_keys[-1]
+        rows = self.cache.order(column, ascending)
+        if self.mask is not None:
+            rows = rows[self.mask[rows]]
+
+        # Stable-sort by the more significant keys' ranks, keeping the order
+        # of the keys after them among ties
+        for column, ascending in reversed(self.sort_keys[:-1]):
+            ranks = self.cache.ranks(column, ascending)[rows]
+            rows = rows[np.argsort(ranks, kind="stable")]
+        return rows
+
+    def __len__(self):
+        return len(self.index)
+
+    def rows(self, start, stop):
+        """Return display rows [start, stop) as tuples of the view's columns"""
+        positions = [self.source.columns.get_loc(col) for col in self.columns]
+        return list(self.source.iloc[self.index[start:stop], positions].itertuples(index=False, name=None))
+
+    def frame(self):
+        """Materialize the view as a new DataFrame"""
+        positions = [self.source.columns.get_loc(col) for col in self.columns]
+        return self.source.iloc[self.index, positions].reset_index(drop=True)
+
+
+def build_view(base, filter_spec, sort_spec, check=None):
+    """Return a copy of base with the given filter expression (see
+    filter_engine) and sort keys ((column, ascending) pairs) applied and its
+    row index computed.
+
+    Meant to run on a worker thread: base is not modified, and the filter
+    mask is only rebuilt when the filter actually changed. check, if given,
+    is called between steps so a cancelled task can stop early.
+    """
+    view = base.copy()
+    if filter_spec != view.filter_spec:
+        if filter_spec is None:
+            view.clear_filter()
+        else:
+            view.set_filter(evaluate(filter_spec, view.cache), filter_spec)
+    if check is not None:
+        check()
+    if sort_spec != view.sort_spec:
+        if sort_spec is None:
+            view.clear_sort()
+        else:
+            view.set_sort(sort_spec)
+    view.index
+    return view
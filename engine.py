@@ -0,0 +1,357 @@
+"""GUI-free load/select/filter/sort/export pipeline.
+
+Used by the command-line runner (excel-util-cli.py) and by the apps for
+shared helpers such as export file naming. Nothing here imports tkinter.
+"""
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+from data_view import DataView, build_view
+from exporter import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, HAS_PYARROW, export_chunks, export_format, export_view
+from filter_engine import parse_filter
+from perf_stats import peak_rss_mb
+from workbook_loader import LoadStats, WorkbookLoader
+
+CONFIGS_DIR = "column_configs"
+
+# Worker processes are replaced after this many jobs, so memory held by a
+# large sheet is returned to the OS instead of accumulating in the pool
+MAX_JOBS_PER_WORKER = 4
+
+# Short names of the filter conditions used in export file names
+SHORT_CONDITIONS = {
+    "equals": "eq",
+    "contains": "cont",
+    "greater than": "gt",
+    "less than": "lt",
+    "starts with": "sw",
+    "ends with": "ew"
+}
+
+
+def load_column_config(name, configs_dir=CONFIGS_DIR):
+    """Return the {'sheet_name', 'columns'} dict saved under a config name"""
+    config_file = os.path.join(configs_dir, f"{name}.json")
+    if not os.path.exists(config_file):
+        raise ValueError(f"No saved configuration named '{name}' in {configs_dir}")
+    with open(config_file, 'r') as f:
+        return json.load(f)
+
+
+def parse_sort(text):
+    """Parse 'Brand, Price desc' (or 'Brand:asc,Price:desc') into sort keys"""
+    keys = []
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        column, ascending = item, True
+        if ":" in item:
+            column, order = item.rsplit(":", 1)
+        else:
+            parts = item.rsplit(None, 1)
+            order = parts[1] if len(parts) == 2 and parts[1].lower() in ("asc", "desc") else ""
+            if order:
+                column = parts[0]
+        order = order.strip().lower()
+        if order not in ("", "asc", "ascending", "desc", "descending"):
+            raise ValueError(f"Unknown sort order '{order}' for column '{column}'")
+        keys.append((column.strip(), not order.startswith("desc")))
+    return tuple(keys) or None
+
+
+def export_filename(source_path, sheet_name, filters, sorts):
+    """Generate a short descriptive filename (without extension).
+
+    filters are (column, condition, value) triples and sorts are (column,
+    ascending) pairs; incomplete filters are skipped.
+    """
+    base_name = os.path.splitext(os.path.basename(source_path))[0] if source_path else "export"
+    filename_parts = [base_name]
+
+    # Add sheet info if available
+    if sheet_name:
+        # Shorten sheet name if too long
+        if len(sheet_name) > 10:
+            sheet_name = sheet_name[:8] + ".."
+        filename_parts.append(sheet_name)
+
+    # Add filter info if available
+    for filter_col, filter_cond, filter_val in filters:
+        if not (filter_col and filter_cond and filter_val):
+            continue
+
+        # Shorten column name if too long
+        if len(filter_col) > 8:
+            filter_col = filter_col[:6] + ".."
+
+        # Shorten condition
+        short_cond = SHORT_CONDITIONS.get(filter_cond, filter_cond[:2])
+
+        # Shorten value if too long
+        if len(filter_val) > 8:
+            filter_val = filter_val[:6] + ".."
+
+        filter_str = f"{filter_col}-{short_cond}-{filter_val}"
+        filename_parts.append(filter_str)
+
+    # Add sort info if available
+    for sort_col, ascending in sorts:
+        # Shorten column name
+        if len(sort_col) > 8:
+            sort_col = sort_col[:6] + ".."
+
+        # Shorten order
+        short_order = "asc" if ascending else "desc"
+
+        sort_str = f"{sort_col}-{short_order}"
+        filename_parts.append(sort_str)
+
+    # Join parts with underscores
+    result = "_".join(filename_parts)
+
+    # Sanitize filename (remove invalid characters)
+    result = ''.join(c for c in result if c.isalnum() or c in ' -_.')
+
+    # Add date stamp for uniqueness
+    date_stamp = datetime.now().strftime("%m%d")
+    result += f"_{date_stamp}"
+
+    return result
+
+
+class JobResult:
+    """Outcome of one run_job call"""
+
+    def __init__(self, path):
+        self.path = path
+        self.out = None
+        self.sheet_name = None
+        self.columns = []
+        self.missing_columns = []
+        self.rows = 0
+        self.load_stats = None
+        self.export_stats = None
+        self.error = None
+        self.peak_rss = None
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def summary(self, out=None):
+        """One line for the log; out names the destination instead of self.out"""
+        if not self.ok:
+            return f"{self.path}: FAILED: {self.error}"
+        text = f"{self.path} [{self.sheet_name}] -> {out or self.out}: {self.rows:,} rows in {self.elapsed:.2f}s"
+        if self.missing_columns:
+            text += f" (skipped missing columns: {', '.join(self.missing_columns)})"
+        return text
+
+
+def run_job(path, config=None, columns=None, sheet_name=None, filter_text=None, sort_text=None,
+            out=None, fmt=None, configs_dir=CONFIGS_DIR, cache=None, check=None, on_progress=None):
+    """Load one workbook sheet, select columns, filter, sort and export it.
+
+    Columns come from a saved column configuration (config), an explicit
+    list, or default to all columns; the sheet defaults to the config's
+    sheet, then to the first sheet. out may be a file or a directory (or
+    None for the current directory), in which case the file is named like
+    the apps name exports. Errors are raised; see run_jobs for batches.
+    """
+    result = JobResult(path)
+    config_data = load_column_config(config, configs_dir) if config else {}
+    filter_spec = parse_filter(filter_text) if filter_text else None
+    sort_spec = parse_sort(sort_text) if sort_text else None
+
+    loader = WorkbookLoader(path, cache=cache)
+    try:
+        sheets = loader.sheet_names
+        if sheet_name is None:
+            sheet_name = config_data.get('sheet_name') if config_data.get('sheet_name') in sheets else sheets[0]
+        elif sheet_name not in sheets:
+            raise ValueError(f"Sheet '{sheet_name}' not found in {path}")
+        result.sheet_name = sheet_name
+
+        # Keep the configured columns that exist in this sheet, like the apps do
+        header = loader.header(sheet_name)
+        wanted = list(columns or config_data.get('columns') or header)
+        result.columns = [col for col in wanted if col in header]
+        result.missing_columns = [col for col in wanted if col not in header]
+        if not result.columns:
+            raise ValueError(f"None of the selected columns exist in sheet '{sheet_name}'")
+
+        referenced = [c.column for c in filter_spec.conditions()] if filter_spec is not None else []
+        referenced += [col for col, _ in sort_spec or ()]
+        unknown = [col for col in referenced if col not in header]
+        if unknown:
+            raise ValueError(f"Unknown column(s) in filter/sort: {', '.join(unknown)}")
+
+        # Only parse the exported columns and those the filter and sort need
+        result.load_stats = LoadStats()
+        df = loader.read_sheet(sheet_name, result.load_stats, usecols=result.columns + referenced)
+    finally:
+        loader.close()
+
+    view = build_view(DataView(df, result.columns), filter_spec, sort_spec, check)
+    result.rows = len(view)
+
+    # Name the output the way the apps name exports unless a file was given
+    if out is None or os.path.isdir(out):
+        fmt = fmt or "Excel"
+        filters = [(c.column, c.condition, c.value) for c in filter_spec.conditions()] if filter_spec is not None else []
+        name = export_filename(path, sheet_name, filters, sort_spec or ()) + EXPORT_FORMATS[fmt]
+        out = os.path.join(out or ".", name)
+    result.out = out
+    result.export_stats = export_view(view, out, fmt=fmt or export_format(out), check=check, on_progress=on_progress)
+
+    result.elapsed = time.perf_counter() - result.start
+    return result
+
+
+def expand_jobs(paths, sheet_name=None, all_sheets=False):
+    """List (path, sheet) jobs; with all_sheets every sheet of every file"""
+    jobs = []
+    for path in paths:
+        if not all_sheets:
+            jobs.append((path, sheet_name))
+            continue
+        try:
+            loader = WorkbookLoader(path)
+        except Exception:
+            # Let the job itself report the unreadable file
+            jobs.append((path, sheet_name))
+            continue
+        try:
+            jobs.extend((path, name) for name in loader.sheet_names)
+        finally:
+            loader.close()
+    return jobs
+
+
+def _run_job_safe(path, sheet_name, options):
+    # Module level so process pool workers can unpickle it
+    try:
+        result = run_job(path, sheet_name=sheet_name, **options)
+    except Exception as e:
+        result = JobResult(path)
+        result.sheet_name = sheet_name
+        # Keep only the message: not every exception type pickles back
+        result.error = str(e) or type(e).__name__
+        result.elapsed = time.perf_counter() - result.start
+    result.peak_rss = peak_rss_mb()
+    return result
+
+
+def run_jobs(paths, log=None, workers=1, sheet_name=None, all_sheets=False, merge=None, **options):
+    """Run run_job over several files (and sheets); a failure doesn't stop the rest.
+
+    With workers > 1 the jobs fan out over a process pool, so xlsx parsing
+    isn't serialized by the GIL. Workers are recycled every
+    MAX_JOBS_PER_WORKER jobs to bound their memory. With merge=path all
+    results are combined into that one file (columns are unioned) instead
+    of one output per job; if no job succeeds, no merge file is written.
+
+    Returns one JobResult per job, in job order. log(message) gets a
+    summary line per job as it finishes. Merged results report (and end up
+    with) the merge file as their output; part files are never shown.
+    """
+    jobs = expand_jobs(paths, sheet_name, all_sheets)
+    job_options = [options] * len(jobs)
+    parts_dir = None
+    if merge:
+        # Each job writes a typed part file to its own directory; they are
+        # combined at the end
+        parts_dir = tempfile.mkdtemp(prefix="excel-util-parts-")
+        job_options = []
+        for i in range(len(jobs)):
+            os.makedirs(os.path.join(parts_dir, str(i)))
+            job_options.append(dict(options, out=os.path.join(parts_dir, str(i)), fmt="Feather" if HAS_PYARROW else "CSV"))
+
+    try:
+        results = [None] * len(jobs)
+        if workers <= 1 or len(jobs) <= 1:
+            for i, (path, name) in enumerate(jobs):
+                results[i] = _run_job_safe(path, name, job_options[i])
+                if log is not None:
+                    log(results[i].summary(merge))
+        else:
+            # spawn: workers start clean instead of inheriting the parent's memory
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, max_tasks_per_child=MAX_JOBS_PER_WORKER) as pool:
+                futures = {pool.submit(_run_job_safe, path, name, job_options[i]): i for i, (path, name) in enumerate(jobs)}
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+                    if log is not None:
+                        log(results[futures[future]].summary(merge))
+
+        merged_results = [result for result in results if result.ok]
+        if merge and not merged_results:
+            # No merge file at all rather than an empty one
+            if log is not None:
+                log(f"Nothing merged into {merge}: no sheet was exported")
+        elif merge:
+            merged = merge_outputs(merged_results, merge, options.get("fmt"))
+            for result in merged_results:
+                result.out = merge
+            if log is not None:
+                sources = ", ".join(dict.fromkeys(os.path.basename(result.path) for result in merged_results))
+                log(f"Merged {merged.rows:,} rows from {sources or 'no sheets'} into {merge} in {merged.elapsed:.2f}s")
+    finally:
+        if parts_dir is not None:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+    return results
+
+
+def merge_outputs(results, path, fmt=None):
+    """Combine the part files of several results into one export file.
+
+    Parts are read one at a time, so memory stays at one part plus one
+    export chunk. Columns are the union of the parts' columns, in first
+    seen order; a part lacking a column gets blanks.
+    """
+    columns = []
+    for result in results:
+        columns.extend(col for col in result.columns if col not in columns)
+    total = sum(result.rows for result in results)
+
+    def read_part(result):
+        if export_format(result.out) == "Feather":
+            df = pd.read_feather(result.out)
+        else:
+            df = pd.read_csv(result.out)
+        return df.reindex(columns=columns)
+
+    def chunks():
+        for result in results:
+            df = read_part(result)
+            for start in range(0, len(df), EXPORT_CHUNK_SIZE):
+                yield df.iloc[start:start + EXPORT_CHUNK_SIZE]
+        if not total:
+            yield pd.DataFrame(columns=columns)
+
+    schema_frame = read_part(results[0]) if results and HAS_PYARROW and (fmt or export_format(path)) in ("Parquet", "Feather") else None
+    return export_chunks(chunks(), path, columns, total, fmt, schema_frame)
+
+
+def format_summary(results):
+    """Per-job timing table (load, export, total time and peak memory)"""
+    lines = [f"{'File':<40} {'Sheet':<20} {'Rows':>10} {'Load s':>8} {'Export s':>9} {'Total s':>8} {'Peak MB':>8}  Status"]
+    for result in results:
+        load = f"{result.load_stats.elapsed:.2f}" if result.load_stats is not None else "-"
+        export = f"{result.export_stats.elapsed:.2f}" if result.export_stats is not None else "-"
+        peak = f"{result.peak_rss:,.0f}" if result.peak_rss is not None else "-"
+        status = "ok" if result.ok else f"FAILED: {result.error}"
+        lines.append(f"{os.path.basename(result.path)[:40]:<40} {str(result.sheet_name or '')[:20]:<20} {result.rows:>10,} "
+                     f"{load:>8} {export:>9} {result.elapsed:>8.2f} {peak:>8}  {status}")
+    return "\n".join(lines)
@@ -0,0 +1,73 @@
+"""Headless runner for saved column configs, filters and sorts.
+
+Example:
+    python excel-util-cli.py run --file car_price_dataset.xlsx --config CAR_COLS \
+        --filter "Brand contains Kia AND Year > 2015" --sort "Year desc" --out extracts/
+
+Several --file arguments (or shell globs) are processed in one invocation,
+in parallel with --workers; --out must then be a directory, or use --merge
+to combine everything into one file. Never imports tkinter.
+"""
+import argparse
+import os
+import sys
+
+from engine import CONFIGS_DIR, format_summary, run_jobs
+from exporter import EXPORT_FORMATS
+from sheet_cache import SheetCache
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="excel-util", description="Filter, sort and export Excel sheets without the GUI")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the load/select/filter/sort/export pipeline")
+    run.add_argument("--file", dest="files", action="append", nargs="+", required=True, help="Workbook(s) or CSV/TSV file(s) to process")
+    run.add_argument("--sheet", help="Sheet name (default: the config's sheet, else the first sheet)")
+    run.add_argument("--config", help="Saved column configuration name (see column_configs)")
+    run.add_argument("--columns", help="Comma separated columns to export instead of a config")
+    run.add_argument("--filter", help="Filter expression, e.g. \"Brand = Kia AND Year > 2015\"")
+    run.add_argument("--sort", help="Sort keys, e.g. \"Brand, Price desc\"")
+    run.add_argument("--out", help="Output file, or directory for generated file names (default: current directory)")
+    run.add_argument("--format", choices=list(EXPORT_FORMATS), help="Export format (default: from --out extension, else Excel)")
+    run.add_argument("--configs-dir", default=CONFIGS_DIR, help="Directory of saved column configurations")
+    run.add_argument("--no-cache", action="store_true", help="Don't read or write the parsed sheet cache")
+    run.add_argument("--all-sheets", action="store_true", help="Process every sheet of each file")
+    run.add_argument("--workers", type=int, default=1, help="Worker processes for batches (default: 1, 0 = one per CPU)")
+    run.add_argument("--merge", help="Combine all results into this one file instead of one file per sheet")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    files = [path for group in args.files for path in group]
+
+    several = len(files) > 1 or args.all_sheets
+    if args.out and not (several and args.merge) and not os.path.isdir(args.out):
+        # A new directory when it ends in a separator or has no extension,
+        # rather than an extensionless file
+        directory = args.out.endswith(("/", os.sep)) or not os.path.splitext(args.out)[1]
+        if several and not directory:
+            print("--out must be a directory when several files are given", file=sys.stderr)
+            return 2
+        if directory:
+            os.makedirs(args.out)
+        elif os.path.dirname(args.out):
+            os.makedirs(os.path.dirname(args.out), exist_ok=True)
+
+    columns = [col.strip() for col in args.columns.split(",") if col.strip()] if args.columns else None
+    workers = args.workers if args.workers > 0 else os.cpu_count() or 1
+    results = run_jobs(files, log=print, workers=workers, all_sheets=args.all_sheets, merge=args.merge,
+                       config=args.config, columns=columns, sheet_name=args.sheet,
+                       filter_text=args.filter, sort_text=args.sort, out=args.out, fmt=args.format,
+                       configs_dir=args.configs_dir, cache=None if args.no_cache else SheetCache())
+
+    failed = [result for result in results if not result.ok]
+    print()
+    print(format_summary(results))
+    print(f"{len(results) - len(failed)} of {len(results)} sheet(s) exported")
+    return 1 if failed or not results else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
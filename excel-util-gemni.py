@@ -4,6 +4,13 @@ import pandas as pd
 import os
 import json
 from datetime import datetime
+from virtual_grid import VirtualGrid
+from workbook_loader import WorkbookLoader, LoadStats
+from tasks import TaskRunner
+from data_view import DataView, build_view
+from filter_engine import CONDITIONS, Condition, combine
+from sheet_cache import SheetCache
+from exporter import EXPORT_FORMATS, export_frame
 
 class ExcelUtilityApp(tk.Tk):
     def __init__(self):
@@ -12,19 +19,25 @@ class ExcelUtilityApp(tk.Tk):
         self.geometry("1200x800")
 
         self.excel_file_path = None
+        self.workbook = None
         self.sheet_name = None
         self.df = pd.DataFrame()
+        self.view = DataView(self.df) # Filter and sort as row positions over self.df, never a copy of it
+        self.requested_filter = None # Latest filter and sort asked for; the view catches up on a worker
+        self.requested_sort = None
         self.all_columns = []
         self.selected_columns = []
-        self.filtered_df = pd.DataFrame()
-        self.sorted_df = pd.DataFrame()
         self.filter_criteria = {}
+        self.filter_conditions = [] # (join, Condition) pairs from the filter builder
         self.sort_criteria = {}
         self.saved_configurations = {}
         self.config_file = "column_configurations.json"
+        self.sheet_cache = SheetCache() # Parsed sheets are cached in a columnar format for fast reopening
         self.load_configurations() # Load configurations at startup
 
         self.create_widgets()
+        self.tasks = TaskRunner(self, on_busy=self.on_tasks_busy) # Load, filter, sort and export run on workers
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def create_widgets(self):
         # --- File Selection ---
@@ -86,14 +99,8 @@ class ExcelUtilityApp(tk.Tk):
         data_frame = ttk.LabelFrame(self, text="5. Data Display")
         data_frame.pack(pady=10, padx=10, fill=tk.BOTH, expand=True)
 
-        self.treeview = ttk.Treeview(data_frame, show="headings")
-        self.treeview_x_scrollbar = ttk.Scrollbar(data_frame, orient="horizontal", command=self.treeview.xview)
-        self.treeview_y_scrollbar = ttk.Scrollbar(data_frame, orient="vertical", command=self.treeview.yview)
-        self.treeview.configure(xscrollcommand=self.treeview_x_scrollbar.set, yscrollcommand=self.treeview_y_scrollbar.set)
-
-        self.treeview_x_scrollbar.pack(side="bottom", fill="x")
-        self.treeview_y_scrollbar.pack(side="right", fill="y")
-        self.treeview.pack(side="left", fill="both", expand=True)
+        self.data_grid = VirtualGrid(data_frame) # Only the visible rows are materialized
+        self.data_grid.pack(fill="both", expand=True)
 
         # --- Filtering ---
         filter_frame = ttk.LabelFrame(self, text="6. Filtering")
@@ -104,16 +111,24 @@ class ExcelUtilityApp(tk.Tk):
         self.filter_column_dropdown.pack(side=tk.LEFT, padx=5, pady=5)
 
         ttk.Label(filter_frame, text="Condition:").pack(side=tk.LEFT, padx=5, pady=5)
-        self.filter_condition_dropdown = ttk.Combobox(filter_frame, state="readonly", values=["equals", "contains", "greater than", "less than", "starts with", "ends with"])
+        self.filter_condition_dropdown = ttk.Combobox(filter_frame, state="readonly", values=CONDITIONS)
         self.filter_condition_dropdown.pack(side=tk.LEFT, padx=5, pady=5)
 
         ttk.Label(filter_frame, text="Value:").pack(side=tk.LEFT, padx=5, pady=5)
         self.filter_value_entry = ttk.Entry(filter_frame)
         self.filter_value_entry.pack(side=tk.LEFT, padx=5, pady=5, expand=True, fill=tk.X)
 
+        self.filter_join_dropdown = ttk.Combobox(filter_frame, state="readonly", values=["AND", "OR"], width=5)
+        self.filter_join_dropdown.pack(side=tk.LEFT, padx=5, pady=5)
+        self.filter_join_dropdown.set("AND")
+        ttk.Button(filter_frame, text="Add Condition", command=self.add_filter_condition).pack(side=tk.LEFT, padx=5, pady=5)
+
         ttk.Button(filter_frame, text="Apply Filter", command=self.apply_filter).pack(side=tk.LEFT, padx=5, pady=5)
         ttk.Button(filter_frame, text="Clear Filter", command=self.clear_filter).pack(side=tk.LEFT, padx=5, pady=5)
 
+        self.filter_conditions_label = ttk.Label(filter_frame, text="") # Conditions added so far (AND binds tighter than OR)
+        self.filter_conditions_label.pack(side=tk.LEFT, padx=5, pady=5)
+
         # --- Sorting ---
         sort_frame = ttk.LabelFrame(self, text="7. Sorting")
         sort_frame.pack(pady=10, padx=10, fill=tk.X)
@@ -134,11 +149,13 @@ class ExcelUtilityApp(tk.Tk):
         export_frame.pack(pady=10, padx=10, fill=tk.X)
 
         ttk.Label(export_frame, text="Export Format:").pack(side=tk.LEFT, padx=5, pady=5)
-        self.export_format_dropdown = ttk.Combobox(export_frame, state="readonly", values=["Excel", "CSV", "TXT"]) # Added TXT here
+        self.export_format_dropdown = ttk.Combobox(export_frame, state="readonly", values=list(EXPORT_FORMATS))
         self.export_format_dropdown.pack(side=tk.LEFT, padx=5, pady=5)
         self.export_format_dropdown.set("Excel") # Default to Excel
 
         ttk.Button(export_frame, text="Export Data", command=self.export_data).pack(side=tk.LEFT, padx=5, pady=5)
+        self.cancel_button = ttk.Button(export_frame, text="Cancel", command=self.cancel_tasks, state="disabled")
+        self.cancel_button.pack(side=tk.LEFT, padx=5, pady=5)
 
         # --- Status Bar ---
         self.status_bar = ttk.Label(self, text="Ready", relief=tk.SUNKEN, anchor=tk.W)
@@ -146,7 +163,7 @@ class ExcelUtilityApp(tk.Tk):
 
     # --- Functionalities ---
     def select_excel_file(self):
-        filetypes = (("Excel files", "*.xlsx *.xls"), ("All files", "*.*"))
+        filetypes = (("Data files", "*.xlsx *.xls *.csv *.tsv"), ("Excel files", "*.xlsx *.xls"), ("CSV files", "*.csv *.tsv"), ("All files", "*.*"))
         filepath = filedialog.askopenfilename(title="Select an Excel File", filetypes=filetypes)
         if filepath:
             try:
@@ -160,8 +177,10 @@ class ExcelUtilityApp(tk.Tk):
 
     def load_sheet_names(self):
         try:
-            xls = pd.ExcelFile(self.excel_file_path)
-            sheet_names = xls.sheet_names
+            if self.workbook is not None:
+                self.workbook.close()
+            self.workbook = WorkbookLoader(self.excel_file_path, cache=self.sheet_cache) # One read-only handle reused for every sheet
+            sheet_names = self.workbook.sheet_names
             self.sheet_dropdown['values'] = sheet_names
             if sheet_names:
                 self.sheet_dropdown.set(sheet_names[0]) # Select first sheet by default
@@ -180,7 +199,43 @@ class ExcelUtilityApp(tk.Tk):
         if not self.sheet_name:
             return
         try:
-            self.df = pd.read_excel(self.excel_file_path, sheet_name=self.sheet_name)
+            # Stream the sheet on a worker so the first page shows right away
+            self.tasks.submit("load", self.read_sheet_task, self.workbook, self.sheet_name,
+                              on_progress=self.on_load_progress, on_done=self.on_sheet_loaded, on_error=self.on_load_error)
+        except Exception as e:
+            self.on_load_error(e)
+
+    def read_sheet_task(self, token, progress, workbook, sheet_name): # Runs on a worker thread, no widget access
+        stats = LoadStats()
+
+        def on_chunk(chunk, index):
+            token.check()
+            progress(chunk if index == 0 else None, stats.rows)
+
+        return workbook.read_sheet(sheet_name, stats, on_chunk), stats
+
+    def on_load_progress(self, first_chunk, rows):
+        if first_chunk is not None:
+            self.set_sheet_data(first_chunk, new_sheet=True)
+        self.status_message(f"Loading sheet '{self.sheet_name}': {rows:,} rows...")
+
+    def on_sheet_loaded(self, result):
+        df, stats = result
+        self.set_sheet_data(df, new_sheet=list(df.columns) != self.all_columns)
+        self.status_message(f"Sheet '{self.sheet_name}' loaded: {stats.summary()}")
+
+    def on_load_error(self, e):
+        self.status_message(f"Error loading sheet data: {e}")
+        messagebox.showerror("Error", f"Could not load sheet data for '{self.sheet_name}'.\n{e}")
+
+    def set_sheet_data(self, df, new_sheet=False):
+        self.df = df
+        view = DataView(df) # Its ColumnCache builds lowercase text codes and sort orders lazily
+        if new_sheet:
+            self.tasks.cancel("view")
+            self.view = view
+            self.requested_filter = None
+            self.requested_sort = None
             self.all_columns = list(self.df.columns)
             self.column_listbox.delete(0, tk.END)
             self.filter_column_dropdown['values'] = self.all_columns
@@ -189,12 +244,36 @@ class ExcelUtilityApp(tk.Tk):
                 self.column_listbox.insert(tk.END, col)
             self.selected_columns = []
             self.selected_column_listbox.delete(0, tk.END)
-            self.clear_filter()
-            self.clear_sort()
-            self.status_message(f"Sheet '{self.sheet_name}' loaded.")
-        except Exception as e:
-            self.status_message(f"Error loading sheet data: {e}")
-            messagebox.showerror("Error", f"Could not load sheet data for '{self.sheet_name}'.\n{e}")
+            self.filter_criteria = {}
+            self.filter_conditions = []
+            self.filter_conditions_label.config(text="")
+            self.sort_criteria = {}
+            self.update_data_display()
+        elif self.requested_filter is None and self.requested_sort is None:
+            self.tasks.cancel("view")
+            self.view = view # More rows of the same sheet
+            self.update_data_display()
+        else:
+            # More rows of the same sheet: keep its filter and sort
+            self.update_view(self.on_reload_done, self.on_filter_error)
+
+    def update_view(self, on_done, on_error):
+        # Build the requested filter and sort on a worker, from the latest
+        # rows; submitting cancels an older request still running
+        view, filter_spec, sort_spec = self.view, self.requested_filter, self.requested_sort
+        if view.source is not self.df:
+            view = DataView(self.df)
+        self.tasks.submit("view", lambda token, progress: build_view(view, filter_spec, sort_spec, check=token.check),
+                          on_done=on_done, on_error=on_error)
+
+    def on_reload_done(self, view):
+        self.view = view
+        self.update_data_display()
+
+    def forget_request(self):
+        # A failed request: later ones start from what is shown
+        self.requested_filter = self.view.filter_spec
+        self.requested_sort = self.view.sort_spec
 
     def select_columns(self):
         selected_indices = self.column_listbox.curselection()
@@ -215,65 +294,75 @@ class ExcelUtilityApp(tk.Tk):
             self.selected_column_listbox.insert(tk.END, col)
 
     def update_data_display(self):
-        self.treeview.delete(*self.treeview.get_children())
-        self.treeview["columns"] = self.selected_columns if self.selected_columns else self.all_columns
-        self.treeview.column("#0", width=0, stretch=tk.NO) # Hide index column
-        self.treeview.heading("#0", text="")
-
-        for col in self.treeview["columns"]:
-            self.treeview.heading(col, text=col)
-            self.treeview.column(col, anchor=tk.W, width=100)
-
-        df_to_display = self.sorted_df if not self.sorted_df.empty else (self.filtered_df if not self.filtered_df.empty else self.df)
         display_cols = self.selected_columns if self.selected_columns else self.all_columns
+        view = self.view.copy()
+        view.columns = [col for col in display_cols if col in self.df.columns] # Ensure column exists in the loaded frame
 
-        if not df_to_display.empty:
-            for index, row in df_to_display.iterrows():
-                values = [row[col] for col in display_cols if col in df_to_display.columns] # Ensure column exists in filtered/sorted df
-                self.treeview.insert("", tk.END, values=values)
+        # Rows are read from the source frame lazily as they scroll into view
+        self.data_grid.set_data(view.columns, len(view), view.rows)
         self.status_message("Data display updated.")
 
-    def apply_filter(self):
+    def read_filter_fields(self):
         filter_column = self.filter_column_dropdown.get()
         filter_condition = self.filter_condition_dropdown.get()
         filter_value = self.filter_value_entry.get()
-
         if not filter_column or not filter_condition or filter_value == '':
+            return None
+        return Condition(filter_column, filter_condition, filter_value)
+
+    def add_filter_condition(self):
+        try:
+            condition = self.read_filter_fields()
+        except ValueError as e:
+            self.status_message(f"Error applying filter: {e}")
+            return
+        if condition is None:
             self.status_message("Please select a column, condition, and enter a filter value.")
             return
+        join = self.filter_join_dropdown.get() if self.filter_conditions else ""
+        self.filter_conditions.append((join, condition))
+        self.filter_conditions_label.config(text=" ".join(f"{j} {c}".strip() for j, c in self.filter_conditions))
+        self.filter_value_entry.delete(0, tk.END)
 
+    def apply_filter(self):
         try:
-            original_df = self.sorted_df if not self.sorted_df.empty else self.df # Filter from sorted if sorted, else from original
-            if original_df.empty:
-                original_df = self.df
-
-            if filter_condition == "equals":
-                self.filtered_df = original_df[original_df[filter_column].astype(str).str.lower() == filter_value.lower()]
-            elif filter_condition == "contains":
-                self.filtered_df = original_df[original_df[filter_column].astype(str).str.lower().str.contains(filter_value.lower(), na=False)]
-            elif filter_condition == "starts with":
-                self.filtered_df = original_df[original_df[filter_column].astype(str).str.lower().str.startswith(filter_value.lower(), na=False)]
-            elif filter_condition == "ends with":
-                self.filtered_df = original_df[original_df[filter_column].astype(str).str.lower().str.endswith(filter_value.lower(), na=False)]
-            elif filter_condition == "greater than":
-                self.filtered_df = original_df[original_df[filter_column] > pd.to_numeric(filter_value, errors='coerce')].dropna(subset=[filter_column])
-            elif filter_condition == "less than":
-                self.filtered_df = original_df[original_df[filter_column] < pd.to_numeric(filter_value, errors='coerce')].dropna(subset=[filter_column])
-            else:
-                self.filtered_df = original_df # Fallback, should not happen
-            self.sort_criteria = {} # Clear sort when new filter is applied for correct starting point
-            self.sorted_df = pd.DataFrame()
-            self.update_data_display()
-            self.filter_criteria = {'column': filter_column, 'condition': filter_condition, 'value': filter_value}
-            self.status_message("Filter applied.")
+            condition = self.read_filter_fields()
+        except ValueError as e:
+            self.on_filter_error(e)
+            return
+        items = list(self.filter_conditions) # Builder conditions plus the fields, instead of replacing the old filter
+        if condition is not None:
+            items.append((self.filter_join_dropdown.get(), condition))
+        if not items:
+            self.status_message("Please select a column, condition, and enter a filter value.")
+            return
 
-        except Exception as e:
-            self.status_message(f"Error applying filter: {e}")
-            messagebox.showerror("Error", f"Could not apply filter.\n{e}")
-            self.filtered_df = pd.DataFrame()
+        # The requested sort stays; only the mask over the sheet changes
+        expression = combine(items)
+        self.requested_filter = expression
+        self.update_view(lambda view: self.on_filter_done(view, {'expression': expression}), self.on_filter_error)
+        self.status_message("Applying filter...")
+
+    def on_filter_done(self, view, criteria):
+        self.view = view
+        self.update_data_display()
+        self.filter_criteria = criteria
+        self.status_message("Filter applied.")
+
+    def on_filter_error(self, e):
+        self.forget_request()
+        self.status_message(f"Error applying filter: {e}")
+        messagebox.showerror("Error", f"Could not apply filter.\n{e}")
 
     def clear_filter(self):
-        self.filtered_df = pd.DataFrame()
+        self.filter_conditions = []
+        self.filter_conditions_label.config(text="")
+        self.requested_filter = None
+        self.update_view(self.on_filter_cleared, self.on_filter_error)
+        self.status_message("Clearing filter...")
+
+    def on_filter_cleared(self, view):
+        self.view = view
         self.filter_criteria = {}
         self.update_data_display()
         self.status_message("Filter cleared.")
@@ -286,35 +375,44 @@ class ExcelUtilityApp(tk.Tk):
             self.status_message("Please select a column and sort order.")
             return
 
-        try:
-            df_to_sort = self.filtered_df if not self.filtered_df.empty else self.df
-            if not df_to_sort.empty:
-                ascending = sort_order == "Ascending"
-                self.sorted_df = df_to_sort.sort_values(by=sort_column, ascending=ascending)
-                self.sort_criteria = {'column': sort_column, 'order': sort_order}
-                self.update_data_display()
-                self.status_message(f"Data sorted by '{sort_column}' in {sort_order} order.")
-            else:
-                self.status_message("No data to sort.")
-        except Exception as e:
-            self.status_message(f"Error applying sort: {e}")
-            messagebox.showerror("Error", f"Could not apply sort.\n{e}")
-            self.sorted_df = pd.DataFrame()
+        if self.df.empty:
+            self.status_message("No data to sort.")
+            return
+        # A permutation of the filtered rows, from the sheet's cached sort order
+        self.requested_sort = ((sort_column, sort_order == "Ascending"),)
+        self.update_view(lambda view: self.on_sort_done(view, sort_column, sort_order), self.on_sort_error)
+        self.status_message("Sorting...")
+
+    def on_sort_done(self, view, sort_column, sort_order):
+        self.view = view
+        self.sort_criteria = {'column': sort_column, 'order': sort_order}
+        self.update_data_display()
+        self.status_message(f"Data sorted by '{sort_column}' in {sort_order} order.")
+
+    def on_sort_error(self, e):
+        self.forget_request()
+        self.status_message(f"Error applying sort: {e}")
+        messagebox.showerror("Error", f"Could not apply sort.\n{e}")
 
     def clear_sort(self):
-        self.sorted_df = pd.DataFrame()
+        self.requested_sort = None
+        self.update_view(self.on_sort_cleared, self.on_sort_error)
+        self.status_message("Clearing sort...")
+
+    def on_sort_cleared(self, view):
+        self.view = view
         self.sort_criteria = {}
         self.update_data_display()
         self.status_message("Sort cleared.")
 
     def export_data(self):
         export_format = self.export_format_dropdown.get()
-        if export_format not in ["Excel", "CSV", "TXT"]: # Added TXT here
+        if export_format not in EXPORT_FORMATS:
             self.status_message("Please select a valid export format.")
             return
 
-        export_df = self.sorted_df if not self.sorted_df.empty else (self.filtered_df if not self.filtered_df.empty else self.df)
-        if export_df.empty:
+        view = self.view
+        if len(view) == 0:
             self.status_message("No data to export.")
             return
 
@@ -324,9 +422,10 @@ class ExcelUtilityApp(tk.Tk):
         sort_str = ""
 
         if self.filter_criteria:
-            filter_col_abbrv = "".join([word[0].upper() for word in self.filter_criteria['column'].split()])
-            filter_condition_abbrv = "".join([word[0].upper() for word in self.filter_criteria['condition'].split()])
-            filter_str = f"_F-{filter_col_abbrv}_{filter_condition_abbrv}_{self.filter_criteria['value']}"
+            for condition in self.filter_criteria['expression'].conditions():
+                filter_col_abbrv = "".join([word[0].upper() for word in condition.column.split()])
+                filter_condition_abbrv = "".join([word[0].upper() for word in condition.condition.split()])
+                filter_str += f"_F-{filter_col_abbrv}_{filter_condition_abbrv}_{condition.value}"
 
         if self.sort_criteria:
             sort_col_abbrv = "".join([word[0].upper() for word in self.sort_criteria['column'].split()])
@@ -334,39 +433,38 @@ class ExcelUtilityApp(tk.Tk):
             sort_str = f"_S-{sort_col_abbrv}_{sort_order_abbrv}"
 
         default_filename = f"{filename_base}{filter_str}{sort_str}_{timestamp}"
-        if export_format == "Excel":
-            default_filename += ".xlsx"
-            filetypes = (("Excel files", "*.xlsx"), ("All files", "*.*"))
-            filepath = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=filetypes, initialfile=default_filename, title="Export to Excel")
-            if filepath:
-                try:
-                    export_df[self.selected_columns if self.selected_columns else self.all_columns].to_excel(filepath, index=False)
-                    self.status_message(f"Data exported to '{filepath}' in Excel format.")
-                except Exception as e:
-                    self.status_message(f"Error exporting to Excel: {e}")
-                    messagebox.showerror("Error", f"Could not export to Excel.\n{e}")
-        elif export_format == "CSV":
-            default_filename += ".csv"
-            filetypes = (("CSV files", "*.csv"), ("All files", "*.*"))
-            filepath = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=filetypes, initialfile=default_filename, title="Export to CSV")
-            if filepath:
-                try:
-                    export_df[self.selected_columns if self.selected_columns else self.all_columns].to_csv(filepath, index=False)
-                    self.status_message(f"Data exported to '{filepath}' in CSV format.")
-                except Exception as e:
-                    self.status_message(f"Error exporting to CSV: {e}")
-                    messagebox.showerror("Error", f"Could not export to CSV.\n{e}")
-        elif export_format == "TXT": # Added TXT export here
-            default_filename += ".txt"
-            filetypes = (("Text files", "*.txt"), ("All files", "*.*"))
-            filepath = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=filetypes, initialfile=default_filename, title="Export to TXT")
-            if filepath:
-                try:
-                    export_df[self.selected_columns if self.selected_columns else self.all_columns].to_csv(filepath, index=False, sep='\t') # Tab separated
-                    self.status_message(f"Data exported to '{filepath}' in TXT format.")
-                except Exception as e:
-                    self.status_message(f"Error exporting to TXT: {e}")
-                    messagebox.showerror("Error", f"Could not export to TXT.\n{e}")
+        export_cols = self.selected_columns if self.selected_columns else self.all_columns
+        # TXT is tab separated; Parquet/Feather/zstd need pyarrow
+        extension = EXPORT_FORMATS[export_format]
+        default_filename += extension
+        filetypes = ((f"{export_format} files", f"*{extension}"), ("All files", "*.*"))
+        filepath = filedialog.asksaveasfilename(defaultextension=extension, filetypes=filetypes, initialfile=default_filename, title=f"Export to {export_format}")
+        if filepath:
+            self.start_export(filepath, export_format, view, export_cols)
+
+    def start_export(self, filepath, export_format, view, export_cols):
+        # The view's rows are only materialized here, streamed in chunks in
+        # the chosen format, whatever the file extension
+        self.tasks.submit("export", lambda token, progress: export_frame(view.source, filepath, export_cols, view.index, fmt=export_format, check=token.check, on_progress=progress),
+                          on_done=lambda stats: self.status_message(f"Data exported to '{filepath}' in {export_format} format: {stats.summary()}"),
+                          on_error=lambda e: self.on_export_error(e, export_format),
+                          on_progress=lambda stats: self.status_message(f"Exporting to {export_format}: {stats.summary()}"))
+        self.status_message(f"Exporting to {export_format}...")
+
+    def on_export_error(self, e, export_format):
+        self.status_message(f"Error exporting to {export_format}: {e}")
+        messagebox.showerror("Error", f"Could not export to {export_format}.\n{e}")
+
+    def cancel_tasks(self):
+        self.tasks.cancel()
+        self.status_message("Operation cancelled.")
+
+    def on_tasks_busy(self, busy):
+        self.cancel_button.config(state="normal" if busy else "disabled")
+
+    def on_close(self):
+        self.tasks.shutdown()
+        self.destroy()
 
     def save_column_config(self):
         config_name = self.config_name_entry.get()
@@ -432,8 +530,7 @@ class ExcelUtilityApp(tk.Tk):
             self.status_message(f"Error loading configurations: {e}")
 
     def status_message(self, message):
-        self.status_bar.config(text=message)
-        self.status_bar.update_idletasks() # Force update status bar immediately
+        self.status_bar.config(text=message) # Heavy work runs on workers, so no forced redraw is needed
 
 if __name__ == "__main__":
     app = ExcelUtilityApp()
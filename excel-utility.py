@@ -1,11 +1,31 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, simpledialog
-import pandas as pd
 import os
 import json
-from datetime import datetime
+from virtual_grid import VirtualGrid
+from data_view import DataView, ColumnCache, build_view
+from workbook_loader import WorkbookLoader, LoadStats
+from tasks import TaskRunner, TaskCancelled
+from filter_engine import CONDITIONS, Condition, combine
+from sheet_cache import SheetCache
+from sheet_index import SheetIndex
+from exporter import EXPORT_FORMATS, export_view
+from engine import export_filename
+from compact_types import compact_frame, format_bytes
+from instrumentation import Instrumentation
+from summary import ROWS_ONLY, group_summary
+from sampling import PREVIEW_ROWS, SampleInfo, format_estimate
+from column_store import ColumnStore, open_store
+from sql_query import QueryEngine
 
 class ExcelUtilityApp:
+    # Live filtering waits this long after the last keystroke
+    LIVE_FILTER_DELAY_MS = 250
+    # Load modes: the whole sheet, a preview of PREVIEW_ROWS rows, or the
+    # whole sheet converted to memory-mapped column files (see ColumnStore)
+    LOAD_MODES = {"Full Data": None, "Preview: First Rows": "first", "Preview: Random Sample": "random",
+                  "Out-of-Core (Disk)": "disk"}
+    
     def __init__(self, root):
         self.root = root
         self.root.title("Excel Utility")
@@ -13,11 +33,30 @@ class ExcelUtilityApp:
         
         # Variables to store data
         self.excel_file_path = None
+        self.workbook = None
         self.current_df = None
+        self.column_cache = None
         self.sheets = []
+        self.sheet_meta = {}
         self.selected_sheet = None
         self.columns = []
         self.selected_columns = []
+        self.load_columns = None  # Columns of the active config; loads read only these
+        self.view_pending = False
+        self.loaded_columns = False  # usecols of the finished load behind current_df (None: all)
+        self.view = None
+        self.requested_filter = None
+        self.requested_sort = None
+        self.filter_conditions = []
+        self.sort_keys = []
+        self.live_filter_job = None
+        self.diagnostics_window = None
+        self.summary_window = None
+        self.summary = None
+        self.query_window = None
+        self.query_result = None
+        self.sample_info = None  # Set while current_df is a preview sample
+        self.exact_specs = None  # (filter, sort) to re-apply after Run Exact
         
         # Create frames
         self.create_frames()
@@ -27,11 +66,25 @@ class ExcelUtilityApp:
         if not os.path.exists(self.configs_dir):
             os.makedirs(self.configs_dir)
         
+        # Parsed sheets are cached in a columnar format for fast reopening
+        self.sheet_cache = SheetCache()
+        # Sheet names, headers and row counts of workbooks seen before
+        self.sheet_index = SheetIndex()
+        # Every fully loaded sheet, of any file opened, is a table for SQL Query
+        self.query_engine = QueryEngine(self.sheet_cache)
+        
+        # Opt-in timing of operations (also EXCEL_UTIL_DIAGNOSTICS=1), see Diagnostics
+        self.instrumentation = Instrumentation(enabled=os.environ.get("EXCEL_UTIL_DIAGNOSTICS") == "1")
+        
         # Create widgets
         self.create_widgets()
         
         # Configure grid weights
         self.configure_grid()
+        
+        # Heavy work (load, filter, sort, export) runs on background workers
+        self.tasks = TaskRunner(self.root, on_busy=self.on_tasks_busy)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
     
     def create_frames(self):
         # Top frame for file selection and sheet selection
@@ -66,6 +119,20 @@ class ExcelUtilityApp:
         self.sheet_combobox.grid(row=1, column=1, padx=5, pady=5)
         self.sheet_combobox.bind("<<ComboboxSelected>>", self.on_sheet_selected)
         
+        # Compact load: categoricals for repetitive text, smallest numeric types
+        self.compact_var = tk.BooleanVar(value=False)
+        self.compact_check = ttk.Checkbutton(self.top_frame, text="Compact Load", variable=self.compact_var, command=self.on_compact_toggled)
+        self.compact_check.grid(row=1, column=2, padx=5, pady=5)
+        
+        # Preview loads: filters and sorts run on a sample, with estimated counts
+        self.load_mode_combobox = ttk.Combobox(self.top_frame, values=list(self.LOAD_MODES), state="readonly", width=22)
+        self.load_mode_combobox.set("Full Data")
+        self.load_mode_combobox.grid(row=1, column=3, padx=5, pady=5)
+        self.load_mode_combobox.bind("<<ComboboxSelected>>", self.on_load_mode_changed)
+        
+        self.run_exact_button = ttk.Button(self.top_frame, text="Run Exact", command=self.run_exact, state="disabled")
+        self.run_exact_button.grid(row=1, column=4, padx=5, pady=5)
+        
         # Column selection widgets
         self.columns_listbox_label = ttk.Label(self.middle_frame, text="Available Columns:")
         self.columns_listbox_label.grid(row=0, column=0, padx=5, pady=5)
@@ -111,7 +178,7 @@ class ExcelUtilityApp:
         self.filter_condition_label = ttk.Label(self.filter_frame, text="Condition:")
         self.filter_condition_label.grid(row=0, column=2, padx=5, pady=5)
         
-        self.filter_condition_combobox = ttk.Combobox(self.filter_frame, values=["equals", "contains", "greater than", "less than", "starts with", "ends with"], state="disabled")
+        self.filter_condition_combobox = ttk.Combobox(self.filter_frame, values=CONDITIONS, state="disabled")
         self.filter_condition_combobox.grid(row=0, column=3, padx=5, pady=5)
         
         self.filter_value_label = ttk.Label(self.filter_frame, text="Value:")
@@ -145,28 +212,69 @@ class ExcelUtilityApp:
         self.clear_sort_button = ttk.Button(self.filter_frame, text="Clear Sort", command=self.clear_sort, state="disabled")
         self.clear_sort_button.grid(row=1, column=5, padx=5, pady=5)
         
-        # Data display treeview
-        self.tree_frame = ttk.Frame(self.bottom_frame)
-        self.tree_frame.pack(fill="both", expand=True, padx=5, pady=5)
+        # Multi-key sort: "Then By" queues the current key, Apply Sort adds the last one
+        self.then_by_button = ttk.Button(self.filter_frame, text="Then By", command=self.add_sort_key, state="disabled")
+        self.then_by_button.grid(row=1, column=6, padx=5, pady=5)
+        
+        self.sort_keys_label = ttk.Label(self.filter_frame, text="")
+        self.sort_keys_label.grid(row=1, column=7, padx=5, pady=5, sticky="w")
+        
+        # Filter builder: conditions joined with AND/OR (AND binds tighter)
+        self.filter_join_label = ttk.Label(self.filter_frame, text="Join:")
+        self.filter_join_label.grid(row=2, column=0, padx=5, pady=5)
+        
+        self.filter_join_combobox = ttk.Combobox(self.filter_frame, values=["AND", "OR"], state="disabled", width=6)
+        self.filter_join_combobox.set("AND")
+        self.filter_join_combobox.grid(row=2, column=1, padx=5, pady=5)
+        
+        self.add_condition_button = ttk.Button(self.filter_frame, text="Add Condition", command=self.add_filter_condition, state="disabled")
+        self.add_condition_button.grid(row=2, column=2, padx=5, pady=5)
+        
+        self.conditions_listbox = tk.Listbox(self.filter_frame, height=3)
+        self.conditions_listbox.grid(row=2, column=3, columnspan=3, padx=5, pady=5, sticky="ew")
+        
+        self.remove_condition_button = ttk.Button(self.filter_frame, text="Remove Condition", command=self.remove_filter_condition, state="disabled")
+        self.remove_condition_button.grid(row=2, column=6, padx=5, pady=5)
         
-        # Create scrollbars
-        self.tree_y_scroll = ttk.Scrollbar(self.tree_frame, orient="vertical")
-        self.tree_y_scroll.pack(side="right", fill="y")
+        # Live filtering re-evaluates the filter shortly after typing stops
+        self.live_filter_var = tk.BooleanVar(value=False)
+        self.live_filter_check = ttk.Checkbutton(self.filter_frame, text="Live Filter", variable=self.live_filter_var, command=self.schedule_live_filter, state="disabled")
+        self.live_filter_check.grid(row=2, column=7, padx=5, pady=5)
         
-        self.tree_x_scroll = ttk.Scrollbar(self.tree_frame, orient="horizontal")
-        self.tree_x_scroll.pack(side="bottom", fill="x")
+        self.filter_value_entry.bind("<KeyRelease>", self.schedule_live_filter)
+        self.filter_column_combobox.bind("<<ComboboxSelected>>", self.schedule_live_filter)
+        self.filter_condition_combobox.bind("<<ComboboxSelected>>", self.schedule_live_filter)
         
-        # Create treeview
-        self.tree = ttk.Treeview(self.tree_frame, yscrollcommand=self.tree_y_scroll.set, xscrollcommand=self.tree_x_scroll.set)
-        self.tree.pack(fill="both", expand=True)
+        # Data display grid (only the visible rows are materialized)
+        self.data_grid = VirtualGrid(self.bottom_frame)
+        self.data_grid.pack(fill="both", expand=True, padx=5, pady=5)
         
-        # Configure scrollbars
-        self.tree_y_scroll.config(command=self.tree.yview)
-        self.tree_x_scroll.config(command=self.tree.xview)
+        # Export and cancel buttons
+        self.action_frame = ttk.Frame(self.bottom_frame)
+        self.action_frame.pack(pady=5)
         
-        # Export button
-        self.export_button = ttk.Button(self.bottom_frame, text="Export Filtered Data", command=self.export_data, state="disabled")
-        self.export_button.pack(pady=5)
+        self.export_format_combobox = ttk.Combobox(self.action_frame, values=list(EXPORT_FORMATS), state="readonly", width=12)
+        self.export_format_combobox.set("Excel")
+        self.export_format_combobox.pack(side=tk.LEFT, padx=5)
+        
+        self.export_button = ttk.Button(self.action_frame, text="Export Filtered Data", command=self.export_data, state="disabled")
+        self.export_button.pack(side=tk.LEFT, padx=5)
+        
+        self.cancel_button = ttk.Button(self.action_frame, text="Cancel", command=self.cancel_tasks, state="disabled")
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+        
+        self.summary_button = ttk.Button(self.action_frame, text="Summary", command=self.show_summary, state="disabled")
+        self.summary_button.pack(side=tk.LEFT, padx=5)
+        
+        self.query_button = ttk.Button(self.action_frame, text="SQL Query", command=self.show_query)
+        self.query_button.pack(side=tk.LEFT, padx=5)
+        
+        self.diagnostics_button = ttk.Button(self.action_frame, text="Diagnostics", command=self.show_diagnostics)
+        self.diagnostics_button.pack(side=tk.LEFT, padx=5)
+        
+        # Status bar
+        self.status_label = ttk.Label(self.root, text="Ready", relief=tk.SUNKEN, anchor=tk.W)
+        self.status_label.grid(row=4, column=0, padx=10, pady=(0, 5), sticky="ew")
     
     def configure_grid(self):
         self.root.columnconfigure(0, weight=1)
@@ -180,14 +288,21 @@ class ExcelUtilityApp:
             self.filter_frame.columnconfigure(i, weight=1)
     
     def select_file(self):
-        file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx;*.xls")])
+        file_path = filedialog.askopenfilename(filetypes=[("Data files", "*.xlsx;*.xls;*.csv;*.tsv"), ("Excel files", "*.xlsx;*.xls"), ("CSV files", "*.csv;*.tsv")])
         if file_path:
+            operation = self.instrumentation.start("select_file", file=os.path.basename(file_path))
             self.excel_file_path = file_path
             self.file_label.config(text=os.path.basename(file_path))
             
             try:
-                # Get sheet names
-                self.sheets = pd.ExcelFile(file_path).sheet_names
+                # Only workbook metadata is read here; the workbook itself is
+                # opened on the first data load and then reused
+                if self.workbook is not None:
+                    self.workbook.close()
+                    self.workbook = None
+                self.sheet_meta = {sheet['name']: sheet for sheet in self.sheet_index.lookup(file_path)}
+                self.sheets = list(self.sheet_meta)
+                operation.set(sheets=len(self.sheets))
                 self.sheet_combobox.config(values=self.sheets, state="readonly")
                 
                 # Reset other controls
@@ -201,33 +316,198 @@ class ExcelUtilityApp:
                     self.on_sheet_selected(None)
             
             except Exception as e:
+                operation.finish("error", error=str(e))
                 messagebox.showerror("Error", f"Error opening Excel file: {str(e)}")
+            else:
+                operation.finish()
     
     def on_sheet_selected(self, event):
         selected_sheet = self.sheet_combobox.get()
         if selected_sheet:
             self.selected_sheet = selected_sheet
+            operation = self.instrumentation.start("on_sheet_selected", sheet=selected_sheet)
             
             try:
-                # Read the selected sheet
-                self.current_df = pd.read_excel(self.excel_file_path, sheet_name=selected_sheet)
-                
-                # Update columns list
-                self.columns = list(self.current_df.columns)
-                
-                # Update columns listbox
+                # Clear columns, selected columns and treeview
+                self.current_df = None
+                self.loaded_columns = False
+                self.columns = []
                 self.columns_listbox.delete(0, tk.END)
-                for col in self.columns:
-                    self.columns_listbox.insert(tk.END, col)
-                
-                # Clear selected columns and treeview
                 self.selected_columns = []
                 self.selected_columns_listbox.delete(0, tk.END)
                 self.clear_treeview()
+                self.tasks.cancel("load")
+                self.instrumentation.cancel("load")
+                self.view_pending = False
+                self.sample_info = None
+                self.exact_specs = None
+                self.run_exact_button.config(state="disabled")
+                
+                # Columns come from the sheet index; data loads on View Data
+                meta = self.sheet_meta.get(selected_sheet, {})
+                self.columns = list(meta.get('header', []))
+                for col in self.columns:
+                    self.columns_listbox.insert(tk.END, col)
+                
+                # Pre-select the active config's columns
+                if self.load_columns:
+                    for col in self.load_columns:
+                        if col in self.columns:
+                            self.selected_columns.append(col)
+                            self.selected_columns_listbox.insert(tk.END, col)
+                
+                rows = meta.get('rows')
+                operation.set(rows=rows, columns=len(self.columns))
+                size = f"~{rows:,} rows" if rows is not None else "unknown rows"
+                self.status_message(f"Sheet '{selected_sheet}': {size}, {len(self.columns)} columns. Select columns and click View Data to load.")
             
             except Exception as e:
+                operation.finish("error", error=str(e))
                 messagebox.showerror("Error", f"Error reading sheet: {str(e)}")
+            else:
+                operation.finish()
+    
+    def load_sheet(self, usecols=None):
+        # Stream the sheet on a worker; the first chunk is usable right away
+        self.loaded_columns = False
+        self.tasks.cancel("view")
+        self.instrumentation.cancel("view")
+        preview = self.LOAD_MODES[self.load_mode_combobox.get()]
+        total_rows = self.sheet_meta.get(self.selected_sheet, {}).get('rows')
+        operation = self.instrumentation.start("load_sheet", kind="load", sheet=self.selected_sheet,
+                                               columns=len(usecols) if usecols else "all", compact=self.compact_var.get(), preview=preview)
+        self.tasks.submit("load", operation.wrap(self.read_sheet_task), self.workbook, self.excel_file_path, self.selected_sheet, usecols, self.compact_var.get(), preview, total_rows,
+                          on_progress=self.on_load_progress, on_done=lambda result: self.on_sheet_loaded(result, usecols), on_error=self.on_load_error)
+        self.status_message(f"Loading '{self.selected_sheet}'...")
+    
+    def on_compact_toggled(self):
+        # Reload the current sheet (usually from the cache) with the new
+        # setting; an open view follows with its filter and sort
+        if self.selected_sheet and self.current_df is not None:
+            self.load_sheet(list(self.current_df.columns))
     
+    def on_load_mode_changed(self, event=None):
+        self.on_compact_toggled()
+    
+    def read_sheet_task(self, token, progress, workbook, path, sheet_name, usecols, compact, preview, total_rows):
+        # Runs on a worker thread, so no widget access here
+        opened = workbook is None
+        if opened:
+            workbook = WorkbookLoader(path, cache=self.sheet_cache)
+        
+        try:
+            stats = LoadStats()
+            header = workbook.header(sheet_name)
+            
+            def on_chunk(chunk, index):
+                token.check()
+                progress(chunk if index == 0 else None, stats.rows, header)
+            
+            # Falls back to reading every column if usecols don't match the header
+            sample_info = None
+            if preview is None:
+                df = workbook.read_sheet(sheet_name, stats, on_chunk, usecols)
+            elif preview == "disk":
+                # Converted once, then reopened from disk on later loads
+                df = open_store(workbook, sheet_name, usecols, stats, on_chunk)
+            else:
+                df, total = workbook.read_sample(sheet_name, PREVIEW_ROWS, preview, stats, on_chunk, usecols)
+                # Otherwise the row count from the sheet index, if known
+                sample_info = SampleInfo(preview, len(df), total if total is not None else total_rows)
+                if sample_info.complete:
+                    sample_info = None
+            memory = None
+            if compact and not isinstance(df, ColumnStore):
+                token.check()
+                df, before, after = compact_frame(df)
+                memory = (before, after)
+        except TaskCancelled:
+            if opened:
+                workbook.close()
+            raise
+        return df, stats, header, memory, workbook, path, sample_info
+    
+    def on_load_progress(self, first_chunk, rows, header):
+        if first_chunk is not None:
+            # Show the first page while the rest of the sheet loads
+            self.set_sheet_data(first_chunk, header)
+            if self.view_pending:
+                self.view_pending = False
+                self.view_data()
+        self.status_message(f"Loading '{self.selected_sheet}': {rows:,} rows...")
+    
+    def on_sheet_loaded(self, result, usecols=None):
+        df, stats, header, memory, workbook, path, sample_info = result
+        self.loaded_columns = list(usecols) if usecols else None
+        # Keep the workbook the task opened for later loads of this file
+        if workbook is not self.workbook:
+            if self.workbook is None and path == self.excel_file_path:
+                self.workbook = workbook
+            else:
+                workbook.close()
+        self.sample_info = sample_info
+        self.run_exact_button.config(state="normal" if sample_info is not None else "disabled")
+        exact_specs, self.exact_specs = self.exact_specs, None
+        if exact_specs is not None and self.view is not None:
+            # Run Exact: apply the preview's filter and sort to the full sheet
+            self.requested_filter, self.requested_sort = exact_specs
+        self.set_sheet_data(df, header, "exact run" if exact_specs is not None else "reload")
+        
+        message = f"Loaded '{self.selected_sheet}': {stats.summary()}"
+        if sample_info is not None:
+            message = f"Preview of '{self.selected_sheet}': {sample_info.describe()} ({stats.summary()})"
+        if len(df.columns) < len(header):
+            message += f", {len(df.columns)} of {len(header)} columns"
+        if memory is not None:
+            message += f", compacted {format_bytes(memory[0])} -> {format_bytes(memory[1])}"
+        if isinstance(df, ColumnStore):
+            message += ", memory-mapped from disk"
+        self.status_message(message)
+        self.instrumentation.finish("load", rows=len(df), columns=len(df.columns), from_cache=stats.from_cache)
+        
+        # Previews aren't registered, so queries always see whole sheets
+        if sample_info is None:
+            self.query_engine.register(self.excel_file_path, self.selected_sheet, df)
+            self.update_query_tables()
+        
+        if self.view_pending:
+            self.view_pending = False
+            self.view_data()
+    
+    def on_load_error(self, error):
+        self.exact_specs = None
+        self.instrumentation.finish("load", "error", error=str(error))
+        messagebox.showerror("Error", f"Error reading sheet: {str(error)}")
+    
+    def set_sheet_data(self, df, header=None, action="reload"):
+        self.current_df = df
+        # Normalized text columns are built lazily, once per loaded sheet
+        self.column_cache = ColumnCache(df)
+        
+        # Update columns list and listbox when the header changes (the
+        # frame may hold only some of the header's columns)
+        columns = list(header) if header else list(df.columns)
+        if columns != self.columns:
+            self.columns = columns
+            self.columns_listbox.delete(0, tk.END)
+            for col in self.columns:
+                self.columns_listbox.insert(tk.END, col)
+        
+        # Refresh an open view so it covers the rows loaded so far
+        if self.view is not None:
+            self.refresh_view(action)
+    
+    def refresh_view(self, action="reload"):
+        # Same columns, filter and sort over the current frame
+        if self.requested_filter is None and self.requested_sort is None:
+            self.tasks.cancel("view")
+            self.instrumentation.cancel("view")
+            self.view = DataView(self.current_df, self.view.columns, self.column_cache)
+            self.show_view()
+            self.update_summary()
+        else:
+            self.update_view(action)
+
     def add_column(self):
         selected_indices = self.columns_listbox.curselection()
         for i in selected_indices:
@@ -247,26 +527,38 @@ class ExcelUtilityApp:
             self.selected_columns_listbox.delete(i)
     
     def view_data(self):
+        if self.selected_columns and self.selected_sheet:
+            # The sheet isn't loaded yet, or was read with a column projection
+            # that lacks some selected columns: load only the selected
+            # columns, then view
+            if self.current_df is None or any(col not in self.current_df.columns for col in self.selected_columns):
+                if self.tasks.is_running("load"):
+                    # Already loading; the view opens when data arrives
+                    self.clear_treeview()
+                    self.view_pending = True
+                    return
+                if self.loaded_columns is not False and (self.loaded_columns is None or all(col in self.loaded_columns for col in self.selected_columns)):
+                    # A finished load already asked for these columns: loading
+                    # again wouldn't find them either
+                    missing = [col for col in self.selected_columns if col not in self.current_df.columns]
+                    messagebox.showerror("Error", f"Columns not found in sheet '{self.selected_sheet}': {', '.join(missing)}")
+                    return
+                # The open view's columns may not be in the new load
+                self.clear_treeview()
+                self.view_pending = True
+                self.load_sheet(list(self.selected_columns))
+                return
+        
         if not self.current_df is None and self.selected_columns:
+            operation = self.instrumentation.start("view_data", columns=len(self.selected_columns))
             try:
                 # Clear current treeview
                 self.clear_treeview()
                 
-                # Get dataframe with selected columns
-                display_df = self.current_df[self.selected_columns].copy()
-                
-                # Configure treeview columns
-                self.tree["columns"] = self.selected_columns
-                self.tree.column("#0", width=0, stretch=tk.NO)  # Hide first column
-                
-                for col in self.selected_columns:
-                    self.tree.column(col, anchor=tk.W, width=100)
-                    self.tree.heading(col, text=col, anchor=tk.W)
-                
-                # Insert data
-                for i, row in display_df.iterrows():
-                    values = [row[col] for col in self.selected_columns]
-                    self.tree.insert("", tk.END, text=str(i), values=values)
+                # Create a fresh view over the selected columns of the full sheet
+                self.view = DataView(self.current_df, self.selected_columns, self.column_cache)
+                self.show_view()
+                operation.set(rows=len(self.view))
                 
                 # Enable filter and sort comboboxes
                 self.filter_column_combobox.config(values=self.selected_columns, state="readonly")
@@ -274,257 +566,593 @@ class ExcelUtilityApp:
                 self.filter_value_entry.config(state="normal")
                 self.apply_filter_button.config(state="normal")
                 self.clear_filter_button.config(state="normal")
+                self.filter_join_combobox.config(state="readonly")
+                self.add_condition_button.config(state="normal")
+                self.remove_condition_button.config(state="normal")
+                self.live_filter_check.config(state="normal")
                 
                 self.sort_column_combobox.config(values=self.selected_columns, state="readonly")
                 self.sort_order_combobox.config(state="readonly")
                 self.apply_sort_button.config(state="normal")
                 self.clear_sort_button.config(state="normal")
+                self.then_by_button.config(state="normal")
                 
                 self.export_button.config(state="normal")
+                self.summary_button.config(state="normal")
+                self.update_summary()
                 
             except Exception as e:
+                operation.finish("error", error=str(e))
                 messagebox.showerror("Error", f"Error displaying data: {str(e)}")
+            else:
+                operation.finish()
     
     def apply_filter(self):
-        if self.current_df is None or not self.selected_columns:
+        if self.view is None:
             return
         
-        filter_column = self.filter_column_combobox.get()
-        filter_condition = self.filter_condition_combobox.get()
-        filter_value = self.filter_value_entry.get()
+        # Combine the builder's conditions with the one in the filter fields
+        items = list(self.filter_conditions)
+        if self.filter_fields_complete():
+            try:
+                items.append((self.filter_join_combobox.get(), self.current_condition()))
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
         
-        if not filter_column or not filter_condition or not filter_value:
+        if not items:
+            messagebox.showinfo("Info", "Please complete all filter fields")
+            return
+        
+        # Filter in the background (the active sort is kept)
+        self.requested_filter = combine(items)
+        self.update_view("filter", "apply_filter")
+    
+    def filter_fields_complete(self):
+        return bool(self.filter_column_combobox.get() and self.filter_condition_combobox.get() and self.filter_value_entry.get())
+    
+    def current_condition(self):
+        return Condition(self.filter_column_combobox.get(), self.filter_condition_combobox.get(), self.filter_value_entry.get())
+    
+    def add_filter_condition(self):
+        if not self.filter_fields_complete():
             messagebox.showinfo("Info", "Please complete all filter fields")
             return
         
         try:
-            # Get dataframe with selected columns
-            display_df = self.current_df[self.selected_columns].copy()
-            
-            # Apply filter based on condition
-            if filter_condition == "equals":
-                try:
-                    # Try to convert to numeric if possible
-                    numeric_value = float(filter_value)
-                    filtered_df = display_df[display_df[filter_column] == numeric_value]
-                except ValueError:
-                    # If not numeric, use string comparison (case insensitive)
-                    filtered_df = display_df[display_df[filter_column].astype(str).str.lower() == filter_value.lower()]
-            
-            elif filter_condition == "contains":
-                filtered_df = display_df[display_df[filter_column].astype(str).str.contains(filter_value, case=False, na=False)]
-            
-            elif filter_condition == "greater than":
-                try:
-                    numeric_value = float(filter_value)
-                    filtered_df = display_df[display_df[filter_column] > numeric_value]
-                except ValueError:
-                    messagebox.showerror("Error", "Value must be numeric for 'greater than' condition")
-                    return
-            
-            elif filter_condition == "less than":
-                try:
-                    numeric_value = float(filter_value)
-                    filtered_df = display_df[display_df[filter_column] < numeric_value]
-                except ValueError:
-                    messagebox.showerror("Error", "Value must be numeric for 'less than' condition")
-                    return
-            
-            elif filter_condition == "starts with":
-                filtered_df = display_df[display_df[filter_column].astype(str).str.lower().str.startswith(filter_value.lower(), na=False)]
-            
-            elif filter_condition == "ends with":
-                filtered_df = display_df[display_df[filter_column].astype(str).str.lower().str.endswith(filter_value.lower(), na=False)]
-            
-            # Update treeview with filtered data
-            self.clear_treeview()
-            
-            for i, row in filtered_df.iterrows():
-                values = [row[col] for col in self.selected_columns]
-                self.tree.insert("", tk.END, text=str(i), values=values)
-            
-            # Show count of filtered rows
-            messagebox.showinfo("Filter Applied", f"Filter applied. {len(filtered_df)} rows match the criteria.")
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Error applying filter: {str(e)}")
+            condition = self.current_condition()
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        
+        join = self.filter_join_combobox.get() if self.filter_conditions else ""
+        self.filter_conditions.append((join, condition))
+        self.conditions_listbox.insert(tk.END, f"{join} {condition}".strip())
+        self.filter_value_entry.delete(0, tk.END)
+    
+    def schedule_live_filter(self, event=None):
+        if not self.live_filter_var.get() or self.view is None:
+            return
+        
+        # Debounce: only the last change within the delay triggers a filter
+        self.cancel_live_filter()
+        self.live_filter_job = self.root.after(self.LIVE_FILTER_DELAY_MS, self.live_filter)
+    
+    def cancel_live_filter(self):
+        if self.live_filter_job is not None:
+            self.root.after_cancel(self.live_filter_job)
+            self.live_filter_job = None
+    
+    def live_filter(self):
+        self.live_filter_job = None
+        if self.view is None:
+            return
+        
+        items = list(self.filter_conditions)
+        if self.filter_fields_complete():
+            try:
+                items.append((self.filter_join_combobox.get(), self.current_condition()))
+            except ValueError as e:
+                # Typing is still in progress, so no dialog here
+                self.status_message(str(e))
+                return
+        elif self.filter_value_entry.get():
+            return
+        
+        # An empty entry and no builder conditions clears the filter
+        self.requested_filter = combine(items)
+        self.update_view("live filter")
+    
+    def remove_filter_condition(self):
+        for i in reversed(self.conditions_listbox.curselection()):
+            self.conditions_listbox.delete(i)
+            del self.filter_conditions[i]
+        
+        # The first remaining condition has no join
+        if self.filter_conditions and self.filter_conditions[0][0]:
+            self.filter_conditions[0] = ("", self.filter_conditions[0][1])
+            self.conditions_listbox.delete(0)
+            self.conditions_listbox.insert(0, str(self.filter_conditions[0][1]))
     
     def clear_filter(self):
-        if self.current_df is None or not self.selected_columns:
+        if self.view is None:
             return
         
-        # Reset filter fields
+        # Reset filter fields and builder conditions
+        self.cancel_live_filter()
         self.filter_column_combobox.set("")
         self.filter_condition_combobox.set("")
         self.filter_value_entry.delete(0, tk.END)
+        self.filter_conditions = []
+        self.conditions_listbox.delete(0, tk.END)
         
-        # Reload data
-        self.view_data()
+        # Show all rows again
+        self.requested_filter = None
+        self.update_view("clear filter")
+    
+    def current_sort_key(self):
+        sort_column = self.sort_column_combobox.get()
+        sort_order = self.sort_order_combobox.get()
+        if not sort_column or not sort_order:
+            return None
+        return (sort_column, sort_order == "Ascending")
+    
+    def add_sort_key(self):
+        key = self.current_sort_key()
+        if key is None:
+            messagebox.showinfo("Info", "Please select a column and sort order")
+            return
+        
+        self.sort_keys.append(key)
+        self.sort_column_combobox.set("")
+        self.sort_order_combobox.set("")
+        self.update_sort_keys_label()
+    
+    def update_sort_keys_label(self):
+        text = ", ".join(f"{col} {'asc' if ascending else 'desc'}" for col, ascending in self.sort_keys)
+        self.sort_keys_label.config(text=f"Sort by: {text}, then..." if text else "")
     
     def apply_sort(self):
-        if self.current_df is None or not self.selected_columns:
+        if self.view is None:
             return
         
-        sort_column = self.sort_column_combobox.get()
-        sort_order = self.sort_order_combobox.get()
+        keys = list(self.sort_keys)
+        key = self.current_sort_key()
+        if key is not None:
+            keys.append(key)
         
-        if not sort_column or not sort_order:
+        if not keys:
             messagebox.showinfo("Info", "Please select a column and sort order")
             return
         
-        try:
-            # Get current data from treeview (which might be filtered)
-            current_data = []
-            for item in self.tree.get_children():
-                item_values = self.tree.item(item)["values"]
-                current_data.append(item_values)
-            
-            # Create DataFrame from current treeview data
-            if current_data:
-                current_df = pd.DataFrame(current_data, columns=self.selected_columns)
-                
-                # Apply sorting to the current data (which might be filtered)
-                ascending = True if sort_order == "Ascending" else False
-                sorted_df = current_df.sort_values(by=sort_column, ascending=ascending)
-                
-                # Update treeview with sorted data
-                self.clear_treeview()
-                
-                for i, row in sorted_df.iterrows():
-                    values = [row[col] for col in self.selected_columns]
-                    self.tree.insert("", tk.END, text=str(i), values=values)
-            else:
-                messagebox.showinfo("Info", "No data to sort")
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Error applying sort: {str(e)}")
+        if not len(self.view):
+            messagebox.showinfo("Info", "No data to sort")
+            return
+        
+        # Sort the current view (which might be filtered) using the cached
+        # per-column orders; earlier keys take priority
+        self.requested_sort = tuple(keys)
+        self.update_view("sort", "apply_sort")
     
     def clear_sort(self):
-        if self.current_df is None or not self.selected_columns:
+        if self.view is None:
             return
         
-        # Reset sort fields
+        # Reset sort fields and queued keys
         self.sort_column_combobox.set("")
         self.sort_order_combobox.set("")
+        self.sort_keys = []
+        self.update_sort_keys_label()
         
-        # Reload data
-        self.view_data()
+        # Back to sheet order
+        self.requested_sort = None
+        self.update_view("clear sort")
+    
+    def run_exact(self):
+        # Load the full sheet in the background, then re-apply the preview's
+        # filter and sort to it
+        if self.sample_info is None or self.current_df is None:
+            return
+        self.exact_specs = (self.view.filter_spec, self.view.sort_spec) if self.view is not None else (None, None)
+        self.load_mode_combobox.set("Full Data")
+        self.run_exact_button.config(state="disabled")
+        self.load_sheet(list(self.current_df.columns))
+    
+    def update_view(self, action, operation=None):
+        # Build the new view on a worker; a newer request drops this one's result
+        base, filter_spec, sort_spec = self.view, self.requested_filter, self.requested_sort
+        if base.source is not self.current_df:
+            # More rows were loaded since the view was built: start from those
+            base = DataView(self.current_df, base.columns, self.column_cache)
+        timing = self.instrumentation.start(operation or action.replace(" ", "_"), kind="view", source_rows=len(base))
+        self.tasks.submit("view", timing.wrap(lambda token, progress: build_view(base, filter_spec, sort_spec, token.check)),
+                          on_done=lambda view: self.on_view_ready(view, action),
+                          on_error=lambda e: self.on_view_error(e, action))
+        self.status_message(f"Applying {action}...")
+    
+    def on_view_ready(self, view, action):
+        self.view = view
+        self.show_view()
+        self.instrumentation.finish("view", rows=len(view))
+        if view.filter_spec is not None and self.sample_info is not None:
+            # Counts on a preview are scaled up to the sheet with bounds
+            message = format_estimate(len(view), self.sample_info) + ". Run Exact for exact results."
+        elif view.filter_spec is not None:
+            message = f"{len(view):,} rows match the filter."
+        else:
+            message = f"{len(view):,} rows shown."
+        if action != "reload":
+            self.status_message(message)  # Else the load's message stays
+        self.update_summary()
+        
+        if action == "filter" and not self.live_filter_var.get():
+            # Show count of filtered rows
+            if self.sample_info is not None:
+                messagebox.showinfo("Filter Applied (Preview)", message)
+            else:
+                messagebox.showinfo("Filter Applied", f"Filter applied. {len(view)} rows match the criteria.")
+        elif action == "exact run":
+            messagebox.showinfo("Exact Results", message)
+    
+    def on_view_error(self, error, action):
+        self.instrumentation.finish("view", "error", error=str(error))
+        # Forget the failed request so later updates start from the shown view
+        self.requested_filter = self.view.filter_spec
+        self.requested_sort = self.view.sort_spec
+        self.status_message(f"Error applying {action}: {error}")
+        if action == "live filter":
+            # Don't interrupt typing with a dialog; the status bar shows it
+            return
+        if isinstance(error, ValueError):
+            messagebox.showerror("Error", str(error))
+        else:
+            messagebox.showerror("Error", f"Error applying {action}: {str(error)}")
+    
+    def show_view(self):
+        # The grid reads rows from the view lazily as they scroll into view
+        self.data_grid.set_data(self.view.columns, len(self.view), self.view.rows)
     
     def clear_treeview(self):
-        # Clear all items from treeview
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        # Clear all rows from the grid
+        self.cancel_live_filter()
+        self.tasks.cancel("view")
+        self.instrumentation.cancel("view")
+        self.view = None
+        self.requested_filter = None
+        self.requested_sort = None
+        self.sort_keys = []
+        self.update_sort_keys_label()
+        self.data_grid.clear()
+        self.update_summary()
     
-    def export_data(self):
-        if not self.tree.get_children():
+    def export_data(self, view=None, name_suffix=""):
+        # Exports the main view unless given another one (e.g. a summary)
+        view = self.view if view is None else view
+        if view is None or not len(view):
             messagebox.showinfo("Info", "No data to export")
             return
         
+        if self.sample_info is not None and view is self.view:
+            if not messagebox.askyesno("Preview", f"Only a preview is loaded ({self.sample_info.describe()}). "
+                                       "Export the preview rows anyway? Use Run Exact first to export every row."):
+                return
+        
         try:
-            # Generate default filename based on filters
-            default_filename = self.generate_export_filename()
+            # Generate default filename based on filters, with the chosen format's extension
+            export_format = self.export_format_combobox.get()
+            extension = EXPORT_FORMATS[export_format]
+            default_filename = self.generate_export_filename() + name_suffix + extension
             
             # Ask for save location
             file_path = filedialog.asksaveasfilename(
-                defaultextension=".xlsx",
-                filetypes=[("Excel files", "*.xlsx"), ("CSV files", "*.csv"), ("All files", "*.*")],
+                defaultextension=extension,
+                filetypes=[(f"{export_format} files", f"*{extension}"), ("All files", "*.*")],
                 initialfile=default_filename
             )
             
             if not file_path:
                 return
             
-            # Get data from treeview
-            data = []
-            for item in self.tree.get_children():
-                values = self.tree.item(item)["values"]
-                data.append(values)
-            
-            # Create DataFrame
-            export_df = pd.DataFrame(data, columns=self.selected_columns)
-            
-            # Export based on file extension
-            if file_path.endswith('.csv'):
-                export_df.to_csv(file_path, index=False)
-            else:
-                export_df.to_excel(file_path, index=False)
-            
-            messagebox.showinfo("Success", f"Data exported successfully to {file_path}")
+            # Write the file on a worker thread
+            operation = self.instrumentation.start("export_data", kind="export", format=export_format, source_rows=len(view))
+            self.tasks.submit("export", operation.wrap(self.write_export_task), view, file_path,
+                              on_done=lambda stats: self.on_export_done(file_path, stats),
+                              on_progress=self.on_export_progress, on_error=self.on_export_error)
+            self.status_message(f"Exporting {len(view):,} rows...")
             
         except Exception as e:
             messagebox.showerror("Error", f"Error exporting data: {str(e)}")
     
-    def generate_export_filename(self):
-        """Generate a short descriptive filename based on current filters"""
-        base_name = os.path.splitext(os.path.basename(self.excel_file_path))[0] if self.excel_file_path else "export"
-        sheet_name = self.selected_sheet if self.selected_sheet else ""
+    def write_export_task(self, token, progress, view, file_path):
+        # Stream the filtered and sorted rows in chunks; the format follows the extension
+        return export_view(view, file_path, check=token.check, on_progress=progress)
+    
+    def on_export_progress(self, stats):
+        self.status_message(f"Exporting: {stats.summary()}")
+    
+    def on_export_done(self, file_path, stats):
+        self.instrumentation.finish("export", rows=stats.rows)
+        self.status_message(f"Exported {stats.summary()} to {file_path}")
+        messagebox.showinfo("Success", f"Data exported successfully to {file_path}")
+    
+    def on_export_error(self, error):
+        self.instrumentation.finish("export", "error", error=str(error))
+        messagebox.showerror("Error", f"Error exporting data: {str(error)}")
+    
+    def cancel_tasks(self):
+        self.tasks.cancel()
+        self.instrumentation.cancel()
+        self.status_message("Operation cancelled.")
+    
+    def on_tasks_busy(self, busy):
+        self.cancel_button.config(state="normal" if busy else "disabled")
+    
+    def on_close(self):
+        self.tasks.shutdown()
+        self.query_engine.close()
+        self.root.destroy()
+    
+    def status_message(self, message):
+        self.status_label.config(text=message)
+    
+    def show_summary(self):
+        if self.summary_window is not None:
+            self.summary_window.lift()
+            return
         
-        # Get filter info
-        filter_col = self.filter_column_combobox.get()
-        filter_cond = self.filter_condition_combobox.get()
-        filter_val = self.filter_value_entry.get()
+        window = tk.Toplevel(self.root)
+        window.title("Summary")
+        window.geometry("900x400")
+        self.summary_window = window
         
-        # Get sort info
-        sort_col = self.sort_column_combobox.get()
-        sort_order = self.sort_order_combobox.get()
+        controls = ttk.Frame(window)
+        controls.pack(fill=tk.X, padx=10, pady=5)
         
-        filename_parts = [base_name]
+        ttk.Label(controls, text="Group By:").pack(side=tk.LEFT)
+        self.summary_group_combobox = ttk.Combobox(controls, state="readonly", width=18)
+        self.summary_group_combobox.pack(side=tk.LEFT, padx=5)
         
-        # Add sheet info if available
-        if sheet_name:
-            # Shorten sheet name if too long
-            if len(sheet_name) > 10:
-                sheet_name = sheet_name[:8] + ".."
-            filename_parts.append(sheet_name)
+        ttk.Label(controls, text="Measure:").pack(side=tk.LEFT)
+        self.summary_measure_combobox = ttk.Combobox(controls, state="readonly", width=18)
+        self.summary_measure_combobox.pack(side=tk.LEFT, padx=5)
         
-        # Add filter info if available
-        if filter_col and filter_cond and filter_val:
-            # Shorten column name if too long
-            if len(filter_col) > 8:
-                filter_col = filter_col[:6] + ".."
-            
-            # Shorten condition
-            cond_map = {
-                "equals": "eq",
-                "contains": "cont",
-                "greater than": "gt",
-                "less than": "lt",
-                "starts with": "sw",
-                "ends with": "ew"
-            }
-            short_cond = cond_map.get(filter_cond, filter_cond[:2])
-            
-            # Shorten value if too long
-            if len(filter_val) > 8:
-                filter_val = filter_val[:6] + ".."
-            
-            filter_str = f"{filter_col}-{short_cond}-{filter_val}"
-            filename_parts.append(filter_str)
-        
-        # Add sort info if available
-        if sort_col and sort_order:
-            # Shorten column name
-            if len(sort_col) > 8:
-                sort_col = sort_col[:6] + ".."
-            
-            # Shorten order
-            short_order = "asc" if sort_order == "Ascending" else "desc"
-            
-            sort_str = f"{sort_col}-{short_order}"
-            filename_parts.append(sort_str)
+        self.summary_group_combobox.bind("<<ComboboxSelected>>", lambda e: self.update_summary())
+        self.summary_measure_combobox.bind("<<ComboboxSelected>>", lambda e: self.update_summary())
+        
+        ttk.Button(controls, text="Summarize", command=self.update_summary).pack(side=tk.LEFT, padx=5)
+        self.export_summary_button = ttk.Button(controls, text="Export Summary", command=self.export_summary, state="disabled")
+        self.export_summary_button.pack(side=tk.LEFT, padx=5)
         
-        # Join parts with underscores
-        result = "_".join(filename_parts)
+        self.summary_grid = VirtualGrid(window)
+        self.summary_grid.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
         
-        # Sanitize filename (remove invalid characters)
-        result = ''.join(c for c in result if c.isalnum() or c in ' -_.')
+        self.summary_label = ttk.Label(window, text="Choose a column to group by.", anchor=tk.W)
+        self.summary_label.pack(fill=tk.X, padx=10, pady=(0, 5))
         
-        # Add date stamp for uniqueness
-        from datetime import datetime
-        date_stamp = datetime.now().strftime("%m%d")
-        result += f"_{date_stamp}"
+        def on_close():
+            self.tasks.cancel("summary")
+            self.summary_window = None
+            self.summary = None
+            window.destroy()
         
-        return result
+        window.protocol("WM_DELETE_WINDOW", on_close)
+        self.update_summary()
+    
+    def update_summary(self):
+        # Recompute the open summary panel for the current view (filter)
+        if self.summary_window is None:
+            return
+        
+        columns = self.view.columns if self.view is not None else []
+        self.summary_group_combobox.config(values=columns)
+        self.summary_measure_combobox.config(values=[ROWS_ONLY] + list(columns))
+        if self.summary_group_combobox.get() not in columns:
+            self.summary_group_combobox.set("")
+        if self.summary_measure_combobox.get() not in columns:
+            self.summary_measure_combobox.set(ROWS_ONLY)
+        
+        group_column = self.summary_group_combobox.get()
+        if self.view is None or not group_column:
+            self.tasks.cancel("summary")
+            self.summary = None
+            self.summary_grid.clear()
+            self.export_summary_button.config(state="disabled")
+            return
+        
+        # Aggregates are vectorized over the view's mask and cached per
+        # filter, group and measure, so revisiting a combination is instant
+        view, measure = self.view, self.summary_measure_combobox.get()
+        operation = self.instrumentation.start("summary", kind="summary", group=group_column, measure=measure, source_rows=len(view.source))
+        self.tasks.submit("summary", operation.wrap(lambda token, progress: group_summary(view, group_column, measure, token.check)),
+                          on_done=lambda summary: self.on_summary_ready(summary, view, group_column, measure),
+                          on_error=self.on_summary_error)
+        self.summary_label.config(text=f"Summarizing by {group_column}...")
+    
+    def on_summary_ready(self, summary, view, group_column, measure):
+        self.instrumentation.finish("summary", rows=len(summary))
+        self.summary = (summary, group_column, measure)
+        # Rounded for display only; exports keep full precision
+        self.summary_grid.set_frame(summary.round(2))
+        self.export_summary_button.config(state="normal")
+        matched = "all" if view.mask is None else f"{int(view.mask.sum()):,} matching"
+        self.summary_label.config(text=f"{len(summary):,} groups of {group_column} over {matched} rows.")
+    
+    def on_summary_error(self, error):
+        self.instrumentation.finish("summary", "error", error=str(error))
+        self.summary = None
+        self.summary_grid.clear()
+        self.export_summary_button.config(state="disabled")
+        self.summary_label.config(text=f"Error summarizing: {error}")
+    
+    def export_summary(self):
+        if self.summary is None:
+            return
+        summary, group_column, measure = self.summary
+        suffix = f"_by-{group_column[:8]}" + (f"-{measure[:8]}" if measure != ROWS_ONLY else "")
+        self.export_data(DataView(summary), suffix)
+    
+    def show_query(self):
+        if self.query_window is not None:
+            self.query_window.lift()
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("SQL Query")
+        window.geometry("900x550")
+        self.query_window = window
+        
+        tables_frame = ttk.Frame(window)
+        tables_frame.pack(fill=tk.X, padx=10, pady=5)
+        ttk.Label(tables_frame, text="Tables (double-click to insert):").pack(side=tk.LEFT, anchor=tk.N)
+        self.query_tables_listbox = tk.Listbox(tables_frame, height=4)
+        self.query_tables_listbox.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        
+        self.query_text = tk.Text(window, height=6, wrap=tk.WORD)
+        self.query_text.pack(fill=tk.X, padx=10, pady=5)
+        
+        def on_table_double_click(event):
+            selection = self.query_tables_listbox.curselection()
+            if selection:
+                self.query_text.insert(tk.INSERT, self.query_tables_listbox.get(selection[0]).split(" ", 1)[0])
+        
+        self.query_tables_listbox.bind("<Double-Button-1>", on_table_double_click)
+        
+        controls = ttk.Frame(window)
+        controls.pack(fill=tk.X, padx=10)
+        ttk.Button(controls, text="Run Query", command=self.run_query).pack(side=tk.LEFT)
+        self.export_query_button = ttk.Button(controls, text="Export Results", command=self.export_query, state="disabled")
+        self.export_query_button.pack(side=tk.LEFT, padx=5)
+        
+        self.query_grid = VirtualGrid(window)
+        self.query_grid.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        
+        self.query_label = ttk.Label(window, text="Load a sheet, then query it with SQL (SELECT only).", anchor=tk.W)
+        self.query_label.pack(fill=tk.X, padx=10, pady=(0, 5))
+        
+        def on_close():
+            self.tasks.cancel("query")
+            self.query_window = None
+            self.query_result = None
+            window.destroy()
+        
+        window.protocol("WM_DELETE_WINDOW", on_close)
+        self.update_query_tables()
+        
+        # Start from a query over the current sheet
+        tables = list(self.query_engine.tables)
+        if tables:
+            self.query_text.insert("1.0", f"SELECT * FROM {tables[-1]} LIMIT 100")
+    
+    def update_query_tables(self):
+        if self.query_window is None:
+            return
+        self.query_tables_listbox.delete(0, tk.END)
+        for table in self.query_engine.tables.values():
+            self.query_tables_listbox.insert(tk.END, f"{table.describe()}: {', '.join(table.columns)}")
+    
+    def run_query(self):
+        sql = self.query_text.get("1.0", tk.END).strip()
+        if not sql:
+            return
+        # Tables are copied into SQLite on first use, then the query runs
+        # there; a new query cancels the running one
+        operation = self.instrumentation.start("sql_query", kind="query")
+        self.tasks.submit("query", operation.wrap(lambda token, progress: self.query_engine.run(sql, token.check)),
+                          on_done=self.on_query_ready, on_error=self.on_query_error)
+        self.query_label.config(text="Running query...")
+    
+    def on_query_ready(self, result):
+        self.instrumentation.finish("query", rows=len(result), columns=len(result.columns))
+        self.query_result = DataView(result)
+        self.query_grid.set_data(self.query_result.columns, len(self.query_result), self.query_result.rows)
+        self.export_query_button.config(state="normal" if len(result) else "disabled")
+        self.query_label.config(text=f"{len(result):,} rows, {len(result.columns)} columns.")
+    
+    def on_query_error(self, error):
+        self.instrumentation.finish("query", "error", error=str(error))
+        self.query_result = None
+        self.query_grid.clear()
+        self.export_query_button.config(state="disabled")
+        self.query_label.config(text=f"Error running query: {error}")
+    
+    def export_query(self):
+        if self.query_result is not None:
+            self.export_data(self.query_result, "_SQL")
+    
+    def show_diagnostics(self):
+        # One panel at a time
+        if self.diagnostics_window is not None:
+            self.diagnostics_window.lift()
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Diagnostics")
+        window.geometry("760x360")
+        self.diagnostics_window = window
+        
+        controls = ttk.Frame(window)
+        controls.pack(fill=tk.X, padx=10, pady=5)
+        
+        enabled_var = tk.BooleanVar(value=self.instrumentation.enabled)
+        ttk.Checkbutton(controls, text="Record operation timings", variable=enabled_var,
+                        command=lambda: self.instrumentation.set_enabled(enabled_var.get())).pack(side=tk.LEFT)
+        
+        def on_profile():
+            self.instrumentation.capture_next()
+            note_label.config(text="The next operation will be profiled.")
+        
+        ttk.Button(controls, text="Profile Next Operation", command=on_profile).pack(side=tk.LEFT, padx=10)
+        
+        columns = ("time", "operation", "status", "seconds", "rows", "memory", "peak")
+        headings = ("Time", "Operation", "Status", "Seconds", "Rows", "Memory +/- MB", "Peak + MB")
+        tree = ttk.Treeview(window, columns=columns, show="headings", height=12)
+        for column, heading in zip(columns, headings):
+            tree.heading(column, text=heading)
+            tree.column(column, width=90, anchor=tk.W if column in ("time", "operation", "status") else tk.E)
+        tree.column("operation", width=140)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        
+        note_label = ttk.Label(window, text=f"Log: {os.path.abspath(self.instrumentation.log_file)}", anchor=tk.W)
+        note_label.pack(fill=tk.X, padx=10, pady=(0, 5))
+        
+        def add_record(record):
+            rows = record.get("rows")
+            tree.insert("", 0, values=(
+                record["time"][11:], record["operation"], record["status"], f"{record['seconds']:.3f}",
+                f"{rows:,}" if isinstance(rows, int) else "",
+                record.get("rss_delta_mb", ""), record.get("peak_delta_mb", "")))
+            if "profile" in record:
+                note_label.config(text=f"Profile of {record['operation']}: {os.path.abspath(record['profile'])}")
+        
+        for record in self.instrumentation.history:
+            add_record(record)
+        self.instrumentation.add_listener(add_record)
+        
+        def on_close():
+            self.instrumentation.remove_listener(add_record)
+            self.diagnostics_window = None
+            window.destroy()
+        
+        window.protocol("WM_DELETE_WINDOW", on_close)
+        ttk.Button(window, text="Close", command=on_close).pack(pady=5)
+    
+    def generate_export_filename(self):
+        """Generate a short descriptive filename based on current filters"""
+        sheet_name = self.selected_sheet if self.selected_sheet else ""
+        
+        # Get filter info (every condition of the applied filter)
+        if self.view is not None and self.view.filter_spec is not None:
+            filters = [(c.column, c.condition, c.value) for c in self.view.filter_spec.conditions()]
+        else:
+            filters = [(self.filter_column_combobox.get(), self.filter_condition_combobox.get(), self.filter_value_entry.get())]
+        
+        # Get sort info (every key of the applied sort)
+        if self.view is not None and self.view.sort_spec is not None:
+            sorts = list(self.view.sort_spec)
+        else:
+            sorts = [key for key in [self.current_sort_key()] if key is not None]
+        
+        return export_filename(self.excel_file_path, sheet_name, filters, sorts)
     
     def save_column_config(self):
         if not self.selected_columns:
@@ -630,6 +1258,9 @@ class ExcelUtilityApp:
                     
                     config_window.destroy()
                     
+                    # Later sheet loads only parse this config's columns
+                    self.load_columns = list(self.selected_columns) or None
+                    
                     # If columns were loaded, view the data
                     if self.selected_columns:
                         self.view_data()
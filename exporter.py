@@ -0,0 +1,216 @@
+import gzip
+import io
+import itertools
+import os
+import time
+
+import numpy as np
+import openpyxl
+
+from column_store import ColumnStore
+from perf_stats import peak_rss_mb
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+EXPORT_CHUNK_SIZE = 50000
+WRITE_BUFFER_SIZE = 1024 * 1024
+EXCEL_MAX_ROWS = 1048576
+
+# Export formats offered by the apps: name -> file extension
+EXPORT_FORMATS = {
+    "Excel": ".xlsx",
+    "CSV": ".csv",
+    "CSV (gzip)": ".csv.gz",
+    "CSV (zstd)": ".csv.zst",
+    "TXT": ".txt",
+    "Parquet": ".parquet",
+    "Feather": ".feather",
+}
+FORMAT_ALIASES = {".tsv": "TXT", ".arrow": "Feather", ".pq": "Parquet"}
+
+# Field separator and compression of the text formats
+TEXT_FORMATS = {
+    "CSV": (",", None),
+    "CSV (gzip)": (",", "gzip"),
+    "CSV (zstd)": (",", "zstd"),
+    "TXT": ("\t", None),
+}
+
+
+class ExportStats:
+    """Rows written, throughput and peak memory of one export"""
+
+    def __init__(self, total):
+        self.total = total
+        self.rows = 0
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add(self, rows):
+        self.rows += rows
+        self.elapsed = time.perf_counter() - self.start
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        text = f"{self.rows:,} of {self.total:,} rows in {self.elapsed:.2f}s ({self.rows_per_sec:,.0f} rows/s"
+        peak = peak_rss_mb()
+        if peak is not None:
+            text += f", peak memory {peak:,.0f} MB"
+        return text + ")"
+
+
+def iter_chunks(source, columns=None, index=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield source rows (positions in index, default all) as small frames.
+    At least one (possibly empty) frame is yielded so headers get written."""
+    positions = [source.columns.get_loc(col) for col in (columns if columns is not None else source.columns)]
+    if index is None:
+        index = np.arange(len(source))
+    for start in range(0, max(len(index), 1), chunk_size):
+        yield source.iloc[index[start:start + chunk_size], positions]
+
+
+def export_format(path):
+    """Name of the export format for a file path (Excel if unknown)"""
+    lower = path.lower()
+    extensions = [(ext, name) for name, ext in EXPORT_FORMATS.items()] + list(FORMAT_ALIASES.items())
+    # Longest extension first so .csv.gz isn't taken for .gz or .csv
+    for ext, name in sorted(extensions, key=lambda item: -len(item[0])):
+        if lower.endswith(ext):
+            return name
+    return "Excel"
+
+
+def export_frame(source, path, columns=None, index=None, fmt=None, chunk_size=EXPORT_CHUNK_SIZE, check=None, on_progress=None):
+    """Write rows of source to path chunk by chunk and return ExportStats.
+
+    Only one chunk is materialized at a time, so exporting doesn't copy the
+    whole result. fmt is a key of EXPORT_FORMATS and defaults to the one
+    matching the file extension: Excel goes through a write-only workbook,
+    the CSV/TXT formats through buffered (optionally compressed) text
+    writes, and Parquet/Feather through pyarrow writers, one row group or
+    record batch per chunk. check() is called between chunks to allow
+    cancelling (the partial file is removed) and on_progress(stats) after
+    each chunk.
+    """
+    total = len(source) if index is None else len(index)
+    columns = list(source.columns) if columns is None else list(columns)
+    chunks = iter_chunks(source, columns, index, chunk_size)
+    return export_chunks(chunks, path, columns, total, fmt, source, check, on_progress)
+
+
+def export_chunks(chunks, path, columns, total, fmt=None, schema_frame=None, check=None, on_progress=None):
+    """Write an iterable of frames (with the given columns) to one file.
+
+    The writer behind export_frame, also used to merge several results.
+    Parquet/Feather types are inferred from schema_frame (default: the
+    first chunk) so every chunk converts to the same schema.
+    """
+    stats = ExportStats(total)
+    fmt = export_format(path) if fmt is None else fmt
+
+    try:
+        if fmt in TEXT_FORMATS:
+            sep, compression = TEXT_FORMATS[fmt]
+            with _open_text(path, compression) as f:
+                _write_text(chunks, f, sep, stats, check, on_progress)
+        elif fmt in ("Parquet", "Feather"):
+            if not HAS_PYARROW:
+                raise ValueError(f"{fmt} export requires the pyarrow package")
+            chunks = iter(chunks)
+            if schema_frame is None:
+                schema_frame = next(chunks)
+                chunks = itertools.chain([schema_frame], chunks)
+            _write_arrow(chunks, path, fmt, _arrow_schema(schema_frame, columns), stats, check, on_progress)
+        else:
+            if total + 1 > EXCEL_MAX_ROWS:
+                raise ValueError(f"{total:,} rows don't fit in an Excel sheet (max {EXCEL_MAX_ROWS - 1:,}); export to CSV instead")
+            _write_xlsx(chunks, path, columns, stats, check, on_progress)
+    except BaseException:
+        # Don't leave a truncated file behind after an error or cancel
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        raise
+    return stats
+
+
+def export_view(view, path, **kwargs):
+    """Export a DataView's filtered and sorted rows (see export_frame)"""
+    return export_frame(view.source, path, view.columns, view.index, **kwargs)
+
+
+def _open_text(path, compression):
+    if compression == "gzip":
+        return gzip.open(path, "wt", newline="", encoding="utf-8", compresslevel=6)
+    if compression == "zstd":
+        if not HAS_PYARROW:
+            raise ValueError("zstd compressed export requires the pyarrow package")
+        return io.TextIOWrapper(pa.output_stream(path, compression="zstd", buffer_size=WRITE_BUFFER_SIZE), encoding="utf-8", newline="")
+    return open(path, "w", newline="", encoding="utf-8", buffering=WRITE_BUFFER_SIZE)
+
+
+def _write_text(chunks, f, sep, stats, check, on_progress):
+    header = True
+    for chunk in chunks:
+        if check is not None:
+            check()
+        chunk.to_csv(f, sep=sep, index=False, header=header)
+        header = False
+        stats.add(len(chunk))
+        if on_progress is not None:
+            on_progress(stats)
+
+
+def _arrow_schema(source, columns):
+    # Inferred from the whole columns so every chunk converts to the same types
+    if isinstance(source, ColumnStore):
+        frame = source.schema_frame(columns)
+    else:
+        frame = source.iloc[:, [source.columns.get_loc(col) for col in columns]]
+    try:
+        return pa.Schema.from_pandas(frame, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        raise ValueError(f"Columns with mixed value types can't be exported to Parquet/Feather: {e}")
+
+
+def _write_arrow(chunks, path, fmt, schema, stats, check, on_progress):
+    if fmt == "Parquet":
+        writer = pq.ParquetWriter(path, schema)
+    else:
+        # Feather v2 is the Arrow IPC file format
+        writer = pa.ipc.new_file(path, schema)
+    with writer:
+        for chunk in chunks:
+            if check is not None:
+                check()
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            stats.add(len(chunk))
+            if on_progress is not None:
+                on_progress(stats)
+
+
+def _write_xlsx(chunks, path, columns, stats, check, on_progress):
+    # Write-only workbooks stream rows to disk instead of keeping cells in memory
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append([str(col) for col in columns])
+    for chunk in chunks:
+        if check is not None:
+            check()
+        # Blank cells for NaN/NaT/None, like DataFrame.to_excel
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            sheet.append(row)
+        stats.add(len(chunk))
+        if on_progress is not None:
+            on_progress(stats)
+    workbook.save(path)
@@ -0,0 +1,424 @@
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+CONDITIONS = ["equals", "contains", "greater than", "less than", "starts with", "ends with"]
+NUMERIC_CONDITIONS = ("greater than", "less than")
+
+# Rows sampled to estimate the selectivity of numeric predicates
+SAMPLE_SIZE = 2048
+
+# Recent filter masks kept per sheet
+MASK_CACHE_SIZE = 16
+
+# Characters that make a "contains" value a pattern rather than plain text
+_REGEX_CHARS = set(".^$*+?{}[]\\|()")
+
+
+class Condition:
+    """One (column, condition, value) predicate, using the six GUI conditions.
+
+    "contains" takes a regular expression, matched case-insensitively
+    anywhere in the text, as the original string filters did.
+    """
+
+    def __init__(self, column, condition, value):
+        if condition not in CONDITIONS:
+            raise ValueError(f"Unknown filter condition '{condition}'")
+        self.column = column
+        self.condition = condition
+        self.value = str(value)
+
+        # Comparisons are numeric; equals is numeric when the value parses
+        self.number = None
+        if condition in NUMERIC_CONDITIONS or condition == "equals":
+            try:
+                self.number = float(self.value)
+            except ValueError:
+                if condition in NUMERIC_CONDITIONS:
+                    raise ValueError(f"Value must be numeric for '{condition}' condition")
+        elif condition == "contains":
+            try:
+                re.compile(self.value, re.IGNORECASE)
+            except re.error as e:
+                raise ValueError(f"Invalid pattern for 'contains' condition: {e}")
+
+    @property
+    def key(self):
+        return ("cond", self.column, self.condition, self.value)
+
+    def conditions(self):
+        return [self]
+
+    def __eq__(self, other):
+        return isinstance(other, (Condition, And, Or)) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"{self.column} {self.condition} {self.value}"
+
+    @property
+    def is_text(self):
+        return self.number is None
+
+    def estimate(self, cache):
+        """Return (selectivity, relative cost per row) for query planning"""
+        if self.is_text:
+            # Exact: sum the row counts of the distinct values that match
+            text = cache.text(self.column)
+            total = len(text.codes)
+            matched = text.counts()[text.hits(self.condition, self.value)].sum()
+            return (matched / total if total else 0.0), 1.0
+
+        values = cache.numeric(self.column)
+        if not len(values):
+            return 0.0, 1.0
+        step = max(1, len(values) // SAMPLE_SIZE)
+        return float(self._compare(values[::step]).mean()), 1.0
+
+    def evaluate(self, cache, rows=None):
+        """Return a boolean mask over rows (all source rows if rows is None)"""
+        if self.is_text:
+            return cache.text(self.column).mask(self.condition, self.value, rows)
+        values = cache.numeric(self.column)
+        return self._compare(values if rows is None else values[rows])
+
+    def implies(self, other):
+        """True if every row matching self also matches the Condition other"""
+        if self.column != other.column:
+            return False
+        if self.key == other.key:
+            return True
+
+        if not self.is_text and not other.is_text:
+            a, b = self.number, other.number
+            if other.condition == "greater than":
+                return (self.condition == "greater than" and a >= b) or (self.condition == "equals" and a > b)
+            if other.condition == "less than":
+                return (self.condition == "less than" and a <= b) or (self.condition == "equals" and a < b)
+            return self.condition == "equals" and a == b
+
+        if self.is_text and other.is_text:
+            new, old = self.value.lower(), other.value.lower()
+            if other.condition == "contains":
+                # Only plain text is known to narrow: "a.c" doesn't contain "a"
+                plain = not _REGEX_CHARS.intersection(old)
+                if self.condition == "contains":
+                    plain = plain and not _REGEX_CHARS.intersection(new)
+                return plain and old in new
+            if other.condition == "starts with":
+                return self.condition in ("starts with", "equals") and new.startswith(old)
+            if other.condition == "ends with":
+                return self.condition in ("ends with", "equals") and new.endswith(old)
+            return self.condition == "equals" and new == old
+        return False
+
+    def _compare(self, values):
+        if self.condition == "greater than":
+            return values > self.number
+        elif self.condition == "less than":
+            return values < self.number
+        return values == self.number
+
+
+class _Group:
+    joiner = ""
+
+    def __init__(self, children):
+        self.children = list(children)
+
+    @property
+    def key(self):
+        return (self.joiner,) + tuple(child.key for child in self.children)
+
+    def conditions(self):
+        return [cond for child in self.children for cond in child.conditions()]
+
+    def __eq__(self, other):
+        return isinstance(other, (Condition, And, Or)) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return "(" + f" {self.joiner} ".join(repr(child) for child in self.children) + ")"
+
+
+class And(_Group):
+    """All children must match; children run most selective and cheapest first"""
+
+    joiner = "AND"
+
+    def estimate(self, cache):
+        selectivity, cost = 1.0, 0.0
+        for child in self.children:
+            child_selectivity, child_cost = child.estimate(cache)
+            # Later children only see the rows that survived earlier ones
+            cost += selectivity * child_cost
+            selectivity *= child_selectivity
+        return selectivity, cost
+
+    def evaluate(self, cache, rows=None):
+        plan = plan_children(self.children, cache, rank_and)
+        result = plan[0].evaluate(cache, rows)
+        alive = np.flatnonzero(result)
+        for child in plan[1:]:
+            if not alive.size:
+                break
+            # Short-circuit: only rows still alive are tested
+            candidates = alive if rows is None else rows[alive]
+            alive = alive[child.evaluate(cache, candidates)]
+        mask = np.zeros(len(result), dtype=bool)
+        mask[alive] = True
+        return mask
+
+
+class Or(_Group):
+    """Any child may match; children run most likely to match first"""
+
+    joiner = "OR"
+
+    def estimate(self, cache):
+        miss, cost = 1.0, 0.0
+        for child in self.children:
+            child_selectivity, child_cost = child.estimate(cache)
+            # Later children only see the rows not matched yet
+            cost += miss * child_cost
+            miss *= 1.0 - child_selectivity
+        return 1.0 - miss, cost
+
+    def evaluate(self, cache, rows=None):
+        plan = plan_children(self.children, cache, rank_or)
+        mask = np.array(plan[0].evaluate(cache, rows), dtype=bool)
+        pending = np.flatnonzero(~mask)
+        for child in plan[1:]:
+            if not pending.size:
+                break
+            # Short-circuit: rows already matched are not tested again
+            candidates = pending if rows is None else rows[pending]
+            hit = child.evaluate(cache, candidates)
+            mask[pending[hit]] = True
+            pending = pending[~hit]
+        return mask
+
+
+def rank_and(selectivity, cost):
+    # Cost per row eliminated: cheap predicates that reject a lot go first
+    return cost / max(1.0 - selectivity, 1e-9)
+
+
+def rank_or(selectivity, cost):
+    # Cost per row accepted: cheap predicates that accept a lot go first
+    return cost / max(selectivity, 1e-9)
+
+
+def plan_children(children, cache, rank):
+    """Order children by estimated rank (stable for ties)"""
+    if len(children) < 2:
+        return list(children)
+    ranked = [(rank(*child.estimate(cache)), i, child) for i, child in enumerate(children)]
+    return [child for _, _, child in sorted(ranked, key=lambda item: item[:2])]
+
+
+def implies(new, old):
+    """True if every row matching expression new also matches expression old.
+
+    Conservative: False only means the relationship couldn't be proven.
+    """
+    if isinstance(old, And):
+        return all(implies(new, child) for child in old.children)
+    if isinstance(new, Or):
+        return all(implies(child, old) for child in new.children)
+    if isinstance(new, And):
+        return any(implies(child, old) for child in new.children)
+    if isinstance(old, Or):
+        return any(implies(new, child) for child in old.children)
+    return new.implies(old)
+
+
+class MaskCache:
+    """LRU of recent filter masks for one sheet.
+
+    Besides exact hits, it finds cached results that a new expression
+    refines (e.g. "contains ki" after "contains k"), so the new filter only
+    has to scan the rows that matched before.
+    """
+
+    def __init__(self, size=MASK_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, expression):
+        with self._lock:
+            entry = self._entries.get(expression)
+            if entry is None:
+                return None
+            self._entries.move_to_end(expression)
+            return entry[0]
+
+    def put(self, expression, mask):
+        mask.flags.writeable = False  # Shared between views; never modified
+        with self._lock:
+            self._entries[expression] = (mask, int(np.count_nonzero(mask)))
+            self._entries.move_to_end(expression)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def narrowest_superset(self, expression):
+        """Return the cached mask with the fewest rows that expression refines"""
+        with self._lock:
+            entries = list(self._entries.items())
+        best = None
+        for cached, (mask, count) in entries:
+            if (best is None or count < best[1]) and implies(expression, cached):
+                best = (mask, count)
+        return None if best is None else best[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def evaluate(expression, cache):
+    """Evaluate a filter expression into a boolean mask over all source rows.
+
+    If cache has a MaskCache (cache.masks), recent results are reused and
+    refinements of a cached filter are evaluated over its matching rows only.
+    """
+    masks = getattr(cache, "masks", None)
+    if masks is None:
+        return np.asarray(expression.evaluate(cache), dtype=bool)
+
+    mask = masks.get(expression)
+    if mask is not None:
+        return mask
+
+    base = masks.narrowest_superset(expression)
+    if base is None:
+        mask = np.asarray(expression.evaluate(cache), dtype=bool)
+    else:
+        rows = np.flatnonzero(base)
+        mask = np.zeros(len(base), dtype=bool)
+        mask[rows[expression.evaluate(cache, rows)]] = True
+
+    masks.put(expression, mask)
+    return mask
+
+
+def combine(items):
+    """Build an expression from [(join, condition), ...] as entered in a
+    filter builder, where join is "AND" or "OR" (ignored for the first item).
+    AND binds tighter than OR, so A AND B OR C means (A AND B) OR C.
+    """
+    groups = [[]]
+    for i, (join, condition) in enumerate(items):
+        if i and join.upper() == "OR":
+            groups.append([])
+        groups[-1].append(condition)
+    terms = [group[0] if len(group) == 1 else And(group) for group in groups if group]
+    if not terms:
+        return None
+    return terms[0] if len(terms) == 1 else Or(terms)
+
+
+_OPERATORS = {
+    "=": "equals", "==": "equals", "equals": "equals",
+    "contains": "contains",
+    ">": "greater than", "greater than": "greater than",
+    "<": "less than", "less than": "less than",
+    "starts with": "starts with", "ends with": "ends with",
+}
+
+_TOKEN = re.compile(
+    r'\s*(?:(?P<lparen>\()|(?P<rparen>\))|(?P<quoted>"[^"]*"|\'[^\']*\')'
+    r'|(?P<op>==|=|>|<|(?:greater|less) than\b|(?:starts|ends) with\b|contains\b|equals\b)'
+    r'|(?P<word>[^\s()=<>"\']+))',
+    re.IGNORECASE,
+)
+
+
+def parse_filter(text):
+    """Parse text like 'Brand = Kia AND Year > 2015 AND Fuel_Type contains hyb'.
+
+    Operators are =, >, < or the GUI condition names; values with spaces can
+    be quoted; AND, OR and parentheses combine conditions.
+    """
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"Cannot parse filter near: {text[pos:]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "quoted":
+            tokens.append(("value", value[1:-1]))
+        elif kind == "op":
+            tokens.append(("op", _OPERATORS[" ".join(value.lower().split())]))
+        elif kind == "word" and value.upper() in ("AND", "OR"):
+            tokens.append(("join", value.upper()))
+        elif kind == "word":
+            tokens.append(("value", value))
+        else:
+            tokens.append((kind, value))
+
+    expression, rest = _parse_or(tokens)
+    if rest:
+        raise ValueError(f"Unexpected {rest[0][1]!r} in filter")
+    return expression
+
+
+def _parse_or(tokens):
+    terms = []
+    expression, tokens = _parse_and(tokens)
+    terms.append(expression)
+    while tokens and tokens[0] == ("join", "OR"):
+        expression, tokens = _parse_and(tokens[1:])
+        terms.append(expression)
+    return (terms[0] if len(terms) == 1 else Or(terms)), tokens
+
+
+def _parse_and(tokens):
+    terms = []
+    expression, tokens = _parse_term(tokens)
+    terms.append(expression)
+    while tokens and tokens[0] == ("join", "AND"):
+        expression, tokens = _parse_term(tokens[1:])
+        terms.append(expression)
+    return (terms[0] if len(terms) == 1 else And(terms)), tokens
+
+
+def _parse_term(tokens):
+    if tokens and tokens[0][0] == "lparen":
+        expression, tokens = _parse_or(tokens[1:])
+        if not tokens or tokens[0][0] != "rparen":
+            raise ValueError("Missing ')' in filter")
+        return expression, tokens[1:]
+
+    # column words, operator, value words
+    column = []
+    while tokens and tokens[0][0] == "value":
+        column.append(tokens[0][1])
+        tokens = tokens[1:]
+    if not column or not tokens or tokens[0][0] != "op":
+        raise ValueError("Expected '<column> <condition> <value>' in filter")
+    condition = tokens[0][1]
+    tokens = tokens[1:]
+    value = []
+    if tokens and tokens[0][0] == "join":
+        # A value that is literally "and"/"or", e.g. Model contains or
+        value.append(tokens[0][1].lower())
+        tokens = tokens[1:]
+    while tokens and tokens[0][0] == "value":
+        value.append(tokens[0][1])
+        tokens = tokens[1:]
+    if not value:
+        raise ValueError(f"Missing value for '{' '.join(column)} {condition}'")
+    return Condition(" ".join(column), condition, " ".join(value)), tokens
@@ -0,0 +1,254 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from perf_stats import RssSampler, current_rss_mb
+
+DEFAULT_LOG_DIR = "logs"
+LOG_FILE_NAME = "operations.log"
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 3
+HISTORY_SIZE = 200
+PROFILE_TOP = 40
+
+
+class Instrumentation:
+    """Opt-in timing of user operations.
+
+    Each operation records its wall time, row count and memory (RSS after,
+    change and peak change while it ran) as one JSON line in a rotating log
+    and in a short in-memory history for the diagnostics panel. A "start"
+    line is logged too, so an operation that never finishes still shows up.
+    Operations running on a TaskRunner are registered under their task
+    kind: starting another one of the same kind supersedes it, like the
+    task itself, and results can be reported by kind.
+
+    capture_next() profiles the next operation with cProfile (on the Tk
+    thread and, through Operation.wrap, on its worker) and tracemalloc,
+    writing the reports next to the log.
+    """
+
+    def __init__(self, log_dir=DEFAULT_LOG_DIR, enabled=False, history_size=HISTORY_SIZE):
+        self.log_dir = log_dir
+        self.log_file = os.path.join(log_dir, LOG_FILE_NAME)
+        self.history = deque(maxlen=history_size)
+        self.listeners = []
+        self.capture_pending = False
+        self.running = {}
+        self._logger = None
+        self._lock = threading.Lock()
+        self.enabled = False
+        if enabled:
+            self.set_enabled(True)
+
+    def set_enabled(self, enabled):
+        if enabled and self._logger is None:
+            os.makedirs(self.log_dir, exist_ok=True)
+            handler = RotatingFileHandler(self.log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger = logging.getLogger(f"excel_utility.operations.{id(self)}")
+            self._logger.setLevel(logging.INFO)
+            self._logger.propagate = False
+            self._logger.addHandler(handler)
+        self.enabled = enabled
+
+    def capture_next(self):
+        """Profile the next operation that starts"""
+        self.capture_pending = True
+
+    def start(self, name, kind=None, **fields):
+        """Begin timing an operation; finish() it, or use it as a context manager"""
+        if not self.enabled and not self.capture_pending:
+            return _INACTIVE
+        profile = self.capture_pending
+        self.capture_pending = False
+        if kind is not None:
+            self.cancel(kind, status="superseded")
+        operation = Operation(self, name, kind, fields, profile)
+        if kind is not None:
+            self.running[kind] = operation
+        self._write(operation.start_record())
+        return operation
+
+    def finish(self, kind, status="ok", **fields):
+        """Finish the running operation of a task kind, if any"""
+        operation = self.running.get(kind)
+        if operation is not None:
+            operation.finish(status, **fields)
+
+    def cancel(self, kind=None, status="cancelled"):
+        """Finish running operations of one task kind (or all) as cancelled"""
+        kinds = list(self.running) if kind is None else [kind]
+        for k in kinds:
+            operation = self.running.get(k)
+            if operation is not None:
+                operation.finish(status)
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def _record(self, operation, record):
+        if self.running.get(operation.kind) is operation:
+            del self.running[operation.kind]
+        self.history.append(record)
+        self._write(record)
+        for listener in list(self.listeners):
+            listener(record)
+
+    def _write(self, record):
+        if self._logger is not None and self.enabled:
+            with self._lock:
+                self._logger.info(json.dumps(record, default=str))
+
+
+class Operation:
+    def __init__(self, instrumentation, name, kind, fields, profile):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.kind = kind
+        self.fields = dict(fields)
+        self.finished = False
+        self.started = datetime.now()
+        self.rss = RssSampler(interval=0.02)
+        self.rss.__enter__()
+        self.capturing = profile
+        self.profilers = []
+        self.active_profilers = []
+        self.main_profiler = None
+        if profile:
+            tracemalloc.start()
+            self.main_profiler = self._enable_profiler()
+        self.start_time = time.perf_counter()
+
+    def start_record(self):
+        return {"time": self.started.isoformat(timespec="milliseconds"), "event": "start",
+                "operation": self.name, **self.fields}
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def wrap(self, func):
+        """Wrap a worker task so the profiler also covers the worker thread"""
+        if not self.capturing:
+            return func
+
+        def run(*args):
+            profiler = self._enable_profiler()
+            if profiler is not None:
+                self.active_profilers.append(profiler)
+            try:
+                return func(*args)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                    self.active_profilers.remove(profiler)
+        return run
+
+    def finish(self, status="ok", **fields):
+        if self.finished:
+            return
+        self.finished = True
+        elapsed = time.perf_counter() - self.start_time
+        self.rss.__exit__(None, None, None)
+        self.fields.update(fields)
+
+        record = {"time": datetime.now().isoformat(timespec="milliseconds"), "event": "end",
+                  "operation": self.name, "status": status, "seconds": round(elapsed, 4)}
+        record.update(self.fields)
+        if self.rss.baseline is not None:
+            after = current_rss_mb()
+            record["rss_mb"] = round(after, 1)
+            record["rss_delta_mb"] = round(after - self.rss.baseline, 1)
+            record["peak_delta_mb"] = round(self.rss.peak - self.rss.baseline, 1)
+        if self.capturing:
+            record["profile"] = self._save_profile()
+        self.instrumentation._record(self, record)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.finish("error", error=str(exc))
+        else:
+            self.finish()
+        return False
+
+    def _enable_profiler(self):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ profiles every thread from one profiler, and
+            # allows only one at a time
+            return None
+        self.profilers.append(profiler)
+        return profiler
+
+    def _save_profile(self):
+        """Write the cProfile and tracemalloc reports; returns the report path"""
+        # Only the starting thread's profiler is disabled here; a worker
+        # still running (the operation was cancelled) is left out
+        if self.main_profiler is not None:
+            self.main_profiler.disable()
+        profilers = [p for p in self.profilers if p not in self.active_profilers]
+        snapshot = tracemalloc.take_snapshot()
+        traced, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        log_dir = self.instrumentation.log_dir
+        os.makedirs(log_dir, exist_ok=True)
+        base = os.path.join(log_dir, f"profile_{self.started:%Y%m%d_%H%M%S}_{self.name}")
+
+        text = io.StringIO()
+        if profilers:
+            stats = pstats.Stats(*profilers, stream=text)
+            stats.dump_stats(base + ".prof")
+            stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+        else:
+            text.write("No profile: another profiler was active\n")
+
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(f"{self.name}: cProfile, top {PROFILE_TOP} by cumulative time\n")
+            f.write(text.getvalue())
+            f.write(f"\ntracemalloc: {traced / 1024 / 1024:.1f} MB still allocated, peak {peak / 1024 / 1024:.1f} MB\n")
+            for stat in snapshot.statistics("lineno")[:PROFILE_TOP]:
+                f.write(f"{stat}\n")
+        return base + ".txt"
+
+
+class _InactiveOperation:
+    """Stand-in returned while instrumentation is off"""
+
+    capturing = False
+
+    def set(self, **fields):
+        pass
+
+    def wrap(self, func):
+        return func
+
+    def finish(self, status="ok", **fields):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_INACTIVE = _InactiveOperation()
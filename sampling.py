@@ -0,0 +1,130 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+PREVIEW_ROWS = 100000
+# Two-sided 95% confidence
+Z_95 = 1.96
+# Rows kept from past chunks before the reservoir is rebuilt, per sample row
+MAX_RETAINED_RATIO = 4
+
+
+class SampleInfo:
+    """How a preview frame was drawn from its sheet.
+
+    method is "first" (the first rows) or "random" (a uniform reservoir
+    sample); total is the sheet's row count, or None if unknown.
+    """
+
+    def __init__(self, method, size, total=None):
+        self.method = method
+        self.size = size
+        self.total = total
+
+    @property
+    def complete(self):
+        """True when the sample is in fact the whole sheet"""
+        return self.total is not None and self.size >= self.total
+
+    def describe(self):
+        kind = "random rows" if self.method == "random" else "first rows"
+        of = f" of {self.total:,}" if self.total is not None else ""
+        return f"{self.size:,} {kind}{of}"
+
+
+def reservoir_sample(chunks, size, seed=None):
+    """Uniform random sample of size rows from an iterable of DataFrames.
+
+    Returns (sample in source row order, total rows seen). Vectorized
+    Algorithm R: each chunk's rows draw their reservoir slots at once, and
+    only the rows that enter the reservoir are kept.
+    """
+    rng = np.random.default_rng(seed)
+    pieces = []
+    slot_piece = np.zeros(size, dtype=np.int64)
+    slot_row = np.zeros(size, dtype=np.int64)
+    slot_source = np.zeros(size, dtype=np.int64)
+    retained = 0
+    seen = 0
+
+    for chunk in chunks:
+        count = len(chunk)
+        positions = np.arange(seen, seen + count)
+        # The first rows fill the reservoir; row i then replaces slot j,
+        # drawn from [0, i], if j < size
+        targets = positions.copy()
+        free = max(min(size - seen, count), 0)
+        if free < count:
+            drawn = rng.integers(0, positions[free:] + 1)
+            targets[free:] = np.where(drawn < size, drawn, -1)
+        keep = np.flatnonzero(targets >= 0)
+        if len(keep):
+            # Rows drawing the same slot replace each other in turn: only
+            # the last one stays, as in the sequential algorithm (numpy
+            # doesn't define which of repeated indices an assignment keeps)
+            _, last = np.unique(targets[keep][::-1], return_index=True)
+            keep = np.sort(keep[len(keep) - 1 - last])
+            slots = targets[keep]
+            pieces.append(chunk.iloc[keep])
+            slot_piece[slots] = len(pieces) - 1
+            slot_row[slots] = np.arange(len(keep))
+            slot_source[slots] = positions[keep]
+            retained += len(keep)
+        seen += count
+
+        # Rows replaced since are still held by their pieces: rebuild
+        if retained > MAX_RETAINED_RATIO * size:
+            pieces = [_gather(pieces, slot_piece, slot_row, min(seen, size))]
+            slot_piece[:] = 0
+            slot_row[:] = np.arange(size)
+            retained = size
+
+    filled = min(seen, size)
+    if not filled:
+        return (pieces[0] if pieces else pd.DataFrame()), seen
+    sample = _gather(pieces, slot_piece, slot_row, filled)
+    return sample.iloc[np.argsort(slot_source[:filled], kind="stable")].reset_index(drop=True), seen
+
+
+def _gather(pieces, slot_piece, slot_row, filled):
+    offsets = np.cumsum([0] + [len(piece) for piece in pieces[:-1]])
+    combined = pd.concat(pieces, ignore_index=True) if len(pieces) > 1 else pieces[0].reset_index(drop=True)
+    return combined.iloc[offsets[slot_piece[:filled]] + slot_row[:filled]].reset_index(drop=True)
+
+
+def estimate_count(matches, info, z=Z_95):
+    """Estimated matching rows in the whole sheet with confidence bounds.
+
+    Returns (estimate, low, high) from the Wilson score interval for the
+    sample's match rate, narrowed by the finite population correction and
+    clamped to what the sample itself proves. None if the sheet's row
+    count is unknown.
+    """
+    n, total = info.size, info.total
+    if total is None or n == 0:
+        return None
+    if n >= total:
+        return matches, matches, matches
+
+    rate = matches / n
+    denominator = 1 + z * z / n
+    center = (rate + z * z / (2 * n)) / denominator
+    half = z * math.sqrt(rate * (1 - rate) / n + z * z / (4 * n * n)) / denominator
+    half *= math.sqrt((total - n) / (total - 1))
+
+    low = max(matches, math.floor((center - half) * total))
+    high = min(total - (n - matches), math.ceil((center + half) * total))
+    return round(rate * total), low, high
+
+
+def format_estimate(matches, info):
+    """Status text for a filter run on a preview sample"""
+    estimate = estimate_count(matches, info)
+    text = f"{matches:,} of {info.describe()} match"
+    if estimate is not None:
+        value, low, high = estimate
+        text += f"; estimated {value:,} in the sheet (95% CI {low:,} - {high:,})"
+        if info.method == "first":
+            text += ", if the first rows are representative"
+    return text
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import threading
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (needed by DataFrame.to_feather)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+DEFAULT_CACHE_DIR = "sheet_cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Part of every key, so sheets parsed by older versions (CSV dates read as
+# dates, say) are parsed again
+CACHE_VERSION = 2
+
+
+class SheetCache:
+    """On-disk cache of parsed sheets in a columnar binary format.
+
+    Entries are keyed by the workbook's absolute path, size, mtime and the
+    sheet name (plus the column list for projected reads), so editing or
+    replacing the workbook misses the cache. Sheets
+    are stored as Feather (Arrow IPC) when pyarrow is installed and as pickle
+    otherwise or when a column can't be represented in Arrow. The cache is
+    capped at max_bytes and evicts least recently used entries, using the
+    file mtime as the last-use time.
+
+    Several processes (batch workers) may share one cache directory, so an
+    entry can disappear at any time; that is treated as a miss.
+    """
+
+    FORMATS = (".feather", ".pkl")
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, path, sheet_name, columns=None):
+        stat = os.stat(path)
+        raw = f"v{CACHE_VERSION}|{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}|{sheet_name}"
+        if columns is not None:
+            raw += "|" + "\x1f".join(str(col) for col in columns)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, path, sheet_name, columns=None):
+        """Return the cached DataFrame for a sheet, or None on a miss.
+
+        With columns, only those columns are returned: from an entry stored
+        for that projection, or else read from the full sheet's entry. The
+        columns must exist in the sheet.
+        """
+        keys = [self.key(path, sheet_name)] if columns is None else [self.key(path, sheet_name, columns), self.key(path, sheet_name)]
+        for key in keys:
+            for ext in self.FORMATS:
+                entry = os.path.join(self.cache_dir, key + ext)
+                if not os.path.exists(entry):
+                    continue
+                try:
+                    if ext == ".feather":
+                        df = pd.read_feather(entry, columns=columns)
+                    else:
+                        df = pd.read_pickle(entry)
+                        df = df if columns is None else df[list(columns)]
+                except Exception:
+                    # Corrupt or unreadable entry: drop it and reparse the sheet
+                    self._remove(entry)
+                    return None
+                try:
+                    os.utime(entry)  # Mark as recently used
+                except FileNotFoundError:
+                    pass  # Evicted by another process meanwhile
+                return df
+        return None
+
+    def put(self, path, sheet_name, df, columns=None):
+        key = self.key(path, sheet_name, columns)
+        entry = os.path.join(self.cache_dir, key)
+        # Unique per writer, as other processes may write the same entry
+        tmp = f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        # Write to a temp file first so readers never see a partial entry
+        ext = ".pkl"
+        if HAS_PYARROW:
+            try:
+                df.to_feather(tmp)
+                ext = ".feather"
+            except Exception:
+                self._remove(tmp)
+        if ext == ".pkl":
+            df.to_pickle(tmp)
+        os.replace(tmp, entry + ext)
+
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits max_bytes"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if os.path.splitext(name)[1] in self.FORMATS:
+                full = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(full)
+                except FileNotFoundError:
+                    continue  # Removed by another process since listdir
+                entries.append((stat.st_mtime, stat.st_size, full))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, full in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(full)
+            total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,242 @@
+import json
+import os
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+from openpyxl.styles.stylesheet import Stylesheet
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel
+
+from workbook_loader import WorkbookLoader, make_column_names
+
+DEFAULT_INDEX_FILE = "sheet_index.json"
+MAX_ENTRIES = 200
+# Part of every key, so entries scanned by older versions aren't used
+INDEX_VERSION = 3
+
+_CELL_REF = re.compile(r"([A-Z]+)(\d+)")
+
+
+class SheetIndex:
+    """Small persistent index of workbook metadata.
+
+    For each workbook (keyed by absolute path, size and mtime) it keeps the
+    sheet names and, per sheet, the header row and the row and column
+    counts, so opening a known workbook needs no parsing at all. New
+    workbooks are scanned without loading any data: for .xlsx/.xlsm only
+    the workbook manifest, the start of each sheet (its dimension and first
+    row), the cell styles (to tell dates from numbers, as openpyxl does)
+    and as many shared strings as the headers use are read. Other
+    formats fall back to WorkbookLoader, without row counts.
+    """
+
+    def __init__(self, index_file=DEFAULT_INDEX_FILE, max_entries=MAX_ENTRIES):
+        self.index_file = index_file
+        self.max_entries = max_entries
+        self.entries = {}
+        if os.path.exists(index_file):
+            try:
+                with open(index_file, 'r') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                # Unreadable index: start over, it is only a cache
+                self.entries = {}
+
+    def key(self, path):
+        stat = os.stat(path)
+        return f"v{INDEX_VERSION}|{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+    def lookup(self, path):
+        """Return [{'name', 'header', 'rows', 'columns'}, ...] for a workbook"""
+        key = self.key(path)
+        if key not in self.entries:
+            # Drop entries of older versions of the same file
+            prefix = f"v{INDEX_VERSION}|{os.path.abspath(path)}|"
+            for old in [k for k in self.entries if k.startswith(prefix)]:
+                del self.entries[old]
+            self.entries[key] = scan_workbook(path)
+            while len(self.entries) > self.max_entries:
+                del self.entries[next(iter(self.entries))]
+            self.save()
+        return self.entries[key]
+
+    def save(self):
+        tmp = self.index_file + ".tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp, self.index_file)
+        except OSError:
+            pass
+
+
+def scan_workbook(path):
+    """Sheet metadata of one workbook (see SheetIndex)"""
+    if os.path.splitext(path)[1].lower() in (".xlsx", ".xlsm"):
+        try:
+            return _scan_xlsx(path)
+        except (KeyError, ValueError, zipfile.BadZipFile, ET.ParseError):
+            pass  # Unusual package layout: let openpyxl/pandas deal with it
+
+    loader = WorkbookLoader(path)
+    try:
+        sheets = []
+        for name in loader.sheet_names:
+            header = loader.header(name)
+            sheets.append({'name': name, 'header': header, 'rows': None, 'columns': len(header)})
+        return sheets
+    finally:
+        loader.close()
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _column_number(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord("A") + 1
+    return number
+
+
+def _scan_xlsx(path):
+    with zipfile.ZipFile(path) as archive:
+        # Relationship ids -> part names, relative to the workbook part
+        targets = {}
+        shared_strings_part = None
+        styles_part = None
+        for rel in ET.fromstring(archive.read("xl/_rels/workbook.xml.rels")):
+            target = rel.get("Target")
+            part = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+            targets[rel.get("Id")] = part
+            if rel.get("Type", "").endswith("/sharedStrings"):
+                shared_strings_part = part
+            elif rel.get("Type", "").endswith("/styles"):
+                styles_part = part
+
+        sheets = []
+        epoch = CALENDAR_WINDOWS_1900
+        for element in ET.fromstring(archive.read("xl/workbook.xml")).iter():
+            if _local(element.tag) == "workbookPr" and element.get("date1904") in ("1", "true"):
+                epoch = CALENDAR_MAC_1904
+            if _local(element.tag) != "sheet":
+                continue
+            rel_id = next(value for name, value in element.attrib.items() if _local(name) == "id")
+            sheets.append((element.get("name"), targets[rel_id]))
+
+        scanned = [(name,) + _scan_sheet(archive, part) for name, part in sheets]
+
+        # Only the shared strings the headers refer to are read
+        wanted = {value for _, _, cells, _ in scanned for kind, value in cells.values() if kind == "s"}
+        strings = _read_shared_strings(archive, shared_strings_part, max(wanted)) if wanted else []
+        styled = any(styles for _, _, _, styles in scanned)
+        date_styles, timedelta_styles = _read_date_styles(archive, styles_part) if styled else (set(), set())
+
+    result = []
+    for name, dimension, cells, styles in scanned:
+        width = max([dimension[0]] + list(cells))
+        header = []
+        for column in range(1, width + 1):
+            kind, value = cells.get(column, (None, None))
+            style = styles.get(column)
+            if kind == "n" and value is not None and style in date_styles:
+                # Header names must match the loader's: openpyxl turns
+                # date-formatted numbers into datetimes
+                try:
+                    value = from_excel(value, epoch, timedelta=style in timedelta_styles)
+                except (OverflowError, ValueError):
+                    value = "#VALUE!"
+            header.append(strings[value] if kind == "s" else value)
+        # Sheet row 1 is the header, as for the loader, so the data rows
+        # are those after it
+        rows = dimension[1] - 1 if dimension[1] is not None else None
+        result.append({'name': name, 'header': make_column_names(header) if width else [],
+                       'rows': max(rows, 0) if rows is not None else None, 'columns': width})
+    return result
+
+
+def _scan_sheet(archive, part):
+    """(dimension (columns, last row), row 1 cells {column: (kind, value)},
+    their style ids {column: id}), reading the sheet only up to the end of
+    row 1 (or the start of the first row after it, if row 1 is empty)"""
+    dimension = (0, None)
+    cells = {}
+    styles = {}
+    in_header = False
+    cell = None
+    with archive.open(part) as stream:
+        for event, element in ET.iterparse(stream, events=("start", "end")):
+            tag = _local(element.tag)
+            if event == "start":
+                if tag == "row":
+                    if int(element.get("r", 1)) != 1:
+                        break  # Data starts lower down: the header is blank
+                    in_header = True
+                elif tag == "c" and in_header:
+                    cell = element
+                continue
+
+            if tag == "dimension":
+                ref = element.get("ref", "")
+                last = _CELL_REF.fullmatch(ref.split(":")[-1].replace("$", ""))
+                if ":" in ref and last:
+                    dimension = (_column_number(last.group(1)), int(last.group(2)))
+            elif tag == "c" and cell is not None:
+                column = _CELL_REF.fullmatch(cell.get("r", "")) if cell.get("r") else None
+                number = _column_number(column.group(1)) if column else len(cells) + 1
+                cells[number] = _cell_value(cell)
+                if cell.get("s"):
+                    styles[number] = int(cell.get("s"))
+                cell = None
+            elif tag == "row":
+                break
+            elif tag == "sheetData":
+                break  # No rows at all
+    return dimension, cells, styles
+
+
+def _cell_value(cell):
+    kind = cell.get("t", "n")
+    if kind == "inlineStr":
+        return ("str", "".join(t.text or "" for t in cell.iter() if _local(t.tag) == "t"))
+    value = next((v.text for v in cell if _local(v.tag) == "v"), None)
+    if value is None:
+        return ("n", None)
+    if kind == "s":
+        return ("s", int(value))
+    if kind == "b":
+        return ("b", value == "1")
+    if kind in ("str", "e"):
+        return (kind, value)
+    # Numbers as openpyxl returns them: int unless written as a float
+    if any(ch in value for ch in ".eE"):
+        return ("n", float(value))
+    return ("n", int(value))
+
+
+def _read_date_styles(archive, part):
+    """Style ids with a date (and of those, a duration) number format"""
+    if part is None or part not in archive.namelist():
+        return set(), set()
+    stylesheet = Stylesheet.from_tree(ET.fromstring(archive.read(part)))
+    if not stylesheet.cell_styles:
+        return set(), set()  # openpyxl ignores such a stylesheet too
+    return stylesheet.date_formats, stylesheet.timedelta_formats
+
+
+def _read_shared_strings(archive, part, last_index):
+    """Shared strings 0..last_index; the rest of the table is not parsed"""
+    strings = []
+    if part is None:
+        return strings
+    with archive.open(part) as stream:
+        for event, element in ET.iterparse(stream, events=("end",)):
+            if _local(element.tag) != "si":
+                continue
+            strings.append("".join(t.text or "" for t in element.iter() if _local(t.tag) == "t"))
+            element.clear()
+            if len(strings) > last_index:
+                break
+    return strings
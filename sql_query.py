@@ -0,0 +1,179 @@
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import weakref
+
+import pandas as pd
+
+from column_store import ColumnStore, open_store
+from exporter import EXPORT_CHUNK_SIZE, iter_chunks
+from tasks import TaskCancelled
+from workbook_loader import WorkbookLoader
+
+# Rows fetched from a result at a time, with a cancel check in between
+FETCH_ROWS = 50000
+# SQLite virtual machine steps between cancel checks during a query
+PROGRESS_STEPS = 100000
+# What a user query may do: read tables and call functions, nothing else
+READ_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+# SQLite page cache per connection (negative: KiB), so big tables stay on disk
+CACHE_KIB = 64 * 1024
+
+
+class QueryEngine:
+    """Runs SQL over loaded sheets in a temporary SQLite database on disk.
+
+    Each sheet registered with register() becomes a table named after its
+    file and sheet. Registering is free: only a weak reference to the
+    loaded frame (or ColumnStore) is kept, and a table is copied into SQLite
+    in chunks the first time a query names it. If the source is gone by
+    then, the sheet is read again, usually from the SheetCache, or reopened
+    from its column store. The database lives in a temporary file with a
+    bounded page cache, so sheets opened out-of-core never have to fit in
+    memory. Queries are read-only; filters, grouping, joins and sorts run
+    inside SQLite.
+
+    Safe to use from worker threads: one query or copy runs at a time.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.tables = {}  # table -> SqlTable
+        self._directory = tempfile.mkdtemp(prefix="excel-util-sql-")
+        self._connection = sqlite3.connect(os.path.join(self._directory, "tables.db"), check_same_thread=False)
+        # A scratch database: nothing to recover after a crash
+        self._connection.execute("PRAGMA journal_mode=OFF")
+        self._connection.execute("PRAGMA synchronous=OFF")
+        self._connection.execute(f"PRAGMA cache_size=-{CACHE_KIB}")
+        self._lock = threading.Lock()
+
+    def register(self, path, sheet_name, source):
+        """Make a loaded sheet (DataFrame or ColumnStore) queryable; returns
+        its table name. Registering the same sheet again replaces it."""
+        for table in self.tables.values():
+            if table.path == path and table.sheet_name == sheet_name:
+                break
+        else:
+            table = SqlTable(self._unique_name(table_name(path, sheet_name)), path, sheet_name)
+            self.tables[table.name] = table
+        table.set_source(source)
+        return table.name
+
+    def run(self, sql, check=None):
+        """Run one read-only statement and return its result as a DataFrame.
+
+        check, if given, is called while copying tables and during the query
+        (through SQLite's progress handler) so a cancelled task stops early.
+        """
+        with self._lock:
+            # A list: the Tk thread may register sheets meanwhile
+            for table in list(self.tables.values()):
+                if table.stale and re.search(rf"\b{re.escape(table.name)}\b", sql, re.IGNORECASE):
+                    self._copy_table(table, check)
+
+            def progress():
+                try:
+                    if check is not None:
+                        check()
+                except TaskCancelled:
+                    return 1  # Interrupts the query
+                return 0
+
+            self._connection.set_authorizer(_read_only)
+            self._connection.set_progress_handler(progress, PROGRESS_STEPS)
+            try:
+                chunks = []
+                for chunk in pd.read_sql_query(sql, self._connection, chunksize=FETCH_ROWS):
+                    if check is not None:
+                        check()
+                    chunks.append(chunk)
+            except (sqlite3.DatabaseError, pd.errors.DatabaseError) as e:
+                if check is not None:
+                    check()  # An interrupted query is a cancellation, not an error
+                raise ValueError(f"Query failed: {e}")
+            finally:
+                self._connection.set_authorizer(None)
+                self._connection.set_progress_handler(None, PROGRESS_STEPS)
+        if not chunks:
+            return pd.DataFrame()
+        return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+            shutil.rmtree(self._directory, ignore_errors=True)
+
+    def _copy_table(self, table, check):
+        reference = table.source
+        source = reference()
+        if source is None:
+            # Released (another sheet was loaded since): read it again, a
+            # column store without loading it into memory
+            loader = WorkbookLoader(table.path, cache=self.cache)
+            try:
+                if table.on_disk:
+                    source = open_store(loader, table.sheet_name, table.columns)
+                else:
+                    source = loader.read_sheet(table.sheet_name, usecols=table.columns)
+            finally:
+                loader.close()
+
+        self._connection.execute(f'DROP TABLE IF EXISTS "{table.name}"')
+        exists = False
+        for chunk in iter_chunks(source, chunk_size=EXPORT_CHUNK_SIZE):
+            if check is not None:
+                check()
+            chunk.to_sql(table.name, self._connection, if_exists="append" if exists else "fail", index=False)
+            exists = True
+        if not exists:
+            source.iloc[:0].to_sql(table.name, self._connection, index=False)
+        self._connection.commit()
+        # Unless the sheet was registered again while it was copied
+        if table.source is reference:
+            table.stale = False
+
+    def _unique_name(self, name):
+        unique, number = name, 1
+        while unique.lower() in (existing.lower() for existing in self.tables):
+            number += 1
+            unique = f"{name}_{number}"
+        return unique
+
+
+class SqlTable:
+    """A registered sheet: where it comes from and whether SQLite has it yet"""
+
+    def __init__(self, name, path, sheet_name):
+        self.name = name
+        self.path = path
+        self.sheet_name = sheet_name
+        self.columns = []
+        self.on_disk = False
+        self.source = lambda: None
+        self.stale = True
+
+    def set_source(self, source):
+        self.columns = list(source.columns)
+        self.on_disk = isinstance(source, ColumnStore)
+        self.source = weakref.ref(source)
+        self.stale = True
+
+    def describe(self):
+        return f"{self.name} ({len(self.columns)} columns)"
+
+
+def table_name(path, sheet_name):
+    """SQL identifier for a sheet: file and sheet name with other characters
+    replaced (just the file name for CSV/TSV, whose sheet is the file)"""
+    stem = re.sub(r"\W+", "_", os.path.splitext(os.path.basename(path))[0])
+    sheet = re.sub(r"\W+", "_", str(sheet_name))
+    name = stem if sheet == stem else f"{stem}_{sheet}"
+    name = name.strip("_") or "sheet"
+    return f"t_{name}" if name[0].isdigit() else name
+
+
+def _read_only(action, arg1, arg2, database, trigger):
+    return sqlite3.SQLITE_OK if action in READ_ACTIONS else sqlite3.SQLITE_DENY
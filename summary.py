@@ -0,0 +1,122 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+SUMMARY_CACHE_SIZE = 32
+# Measure choice meaning "just count the rows of each group"
+ROWS_ONLY = "(rows)"
+QUANTILES = [("25%", 0.25), ("median", 0.5), ("75%", 0.75)]
+
+
+class SummaryCache:
+    """LRU of group summaries for one sheet, keyed by (filter, group, measure)"""
+
+    def __init__(self, size=SUMMARY_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            frame = self._entries.get(key)
+            if frame is not None:
+                self._entries.move_to_end(key)
+            return frame
+
+    def put(self, key, frame):
+        with self._lock:
+            self._entries[key] = frame
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+def group_summary(view, group_column, measure=None, check=None):
+    """Aggregate the view's matching rows by one column.
+
+    Returns a frame with one row per group value (in sort order, blanks
+    last) holding the row count and, for a measure column, the count of
+    numeric values and their sum, mean, min, quartiles and max. Everything
+    is computed with whole-array numpy operations on the filter mask and
+    the cached group codes, numeric values and sort orders of the sheet's
+    ColumnCache; the sort of the view doesn't matter. Results are cached
+    per filter, group column and measure.
+    """
+    if measure == ROWS_ONLY:
+        measure = None
+    cache = view.cache
+    # A mask set without a filter expression can't be identified again
+    key = (view.filter_spec, group_column, measure)
+    cacheable = view.mask is None or view.filter_spec is not None
+    if cacheable:
+        frame = cache.summaries.get(key)
+        if frame is not None:
+            return frame
+
+    codes, labels = cache.groups(group_column)
+    group_count = len(labels)
+    group_codes = codes if view.mask is None else codes[view.mask]
+    result = {group_column: labels, "rows": np.bincount(group_codes, minlength=group_count)}
+
+    if measure is not None:
+        if check is not None:
+            check()
+        result.update(_measure_stats(cache, measure, view.mask, codes, group_count))
+
+    frame = pd.DataFrame(result)
+    # Groups without any matching row
+    frame = frame[frame["rows"] > 0].reset_index(drop=True)
+    if cacheable:
+        cache.summaries.put(key, frame)
+    return frame
+
+
+def _measure_stats(cache, measure, mask, codes, group_count):
+    values = cache.numeric(measure)
+    valid = ~np.isnan(values)
+    if not valid.any():
+        raise ValueError(f"Column '{measure}' has no numeric values to summarize")
+    if mask is not None:
+        valid &= mask
+
+    # Rows in value order (the cached sort order for numeric columns),
+    # restricted to matching numbers and then stably grouped: every group's
+    # values form one ordered run, so min, max and quantiles are lookups
+    if pd.api.types.is_numeric_dtype(cache.source[measure].dtype):
+        rows = cache.order(measure)
+    else:
+        rows = np.argsort(values, kind="stable")
+    rows = rows[valid[rows]]
+    rows = rows[np.argsort(codes[rows], kind="stable")]
+    ordered = values[rows]
+    ordered_codes = codes[rows]
+
+    counts = np.bincount(ordered_codes, minlength=group_count)
+    sums = np.bincount(ordered_codes, weights=ordered, minlength=group_count)
+    starts = np.cumsum(counts) - counts
+    has_values = counts > 0
+    last = max(len(ordered) - 1, 0)
+
+    def at(position):
+        # Linear interpolation between neighbours, as pandas' quantile does
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        if not len(ordered):
+            return np.full(group_count, np.nan)
+        low_values = ordered[np.clip(low, 0, last)]
+        high_values = ordered[np.clip(high, 0, last)]
+        return np.where(has_values, low_values + (high_values - low_values) * (position - low), np.nan)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        stats = {
+            f"{measure} count": counts,
+            f"{measure} sum": sums,
+            f"{measure} mean": np.where(has_values, sums / counts, np.nan),
+            f"{measure} min": at(starts.astype(np.float64)),
+        }
+        for label, quantile in QUANTILES:
+            stats[f"{measure} {label}"] = at(starts + quantile * (counts - 1))
+        stats[f"{measure} max"] = at((starts + counts - 1).astype(np.float64))
+    return stats
@@ -0,0 +1,112 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskCancelled(Exception):
+    """Raised inside a worker when its task has been cancelled"""
+
+
+class TaskToken:
+    """Cancellation flag shared between the Tk thread and one worker"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise TaskCancelled()
+
+
+class TaskRunner:
+    """Runs heavy work on a thread pool and delivers results on the Tk thread.
+
+    Workers never touch widgets. Progress, results and errors are queued and
+    drained by an after() loop on the Tk thread. Tasks are grouped by kind
+    ("load", "view", "export", ...): submitting a new task of a kind cancels
+    the previous one, and any result it still produces is dropped as stale.
+    """
+
+    def __init__(self, widget, max_workers=2, poll_ms=30, on_busy=None):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self.on_busy = on_busy
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="excel-util")
+        self.results = queue.Queue()
+        self.generations = {}
+        self.tokens = {}
+        self.widget.after(self.poll_ms, self._poll)
+
+    def submit(self, kind, func, *args, on_done=None, on_error=None, on_progress=None):
+        """Run func(token, progress, *args) on the pool and return its token"""
+        self.cancel(kind)
+        generation = self.generations.get(kind, 0) + 1
+        self.generations[kind] = generation
+        token = TaskToken()
+        self.tokens[kind] = token
+
+        def progress(*values):
+            self.results.put((kind, generation, on_progress, values, False))
+
+        def run():
+            try:
+                result = func(token, progress, *args)
+            except TaskCancelled:
+                self.results.put((kind, generation, None, (), True))
+            except Exception as e:
+                self.results.put((kind, generation, on_error, (e,), True))
+            else:
+                self.results.put((kind, generation, on_done, (result,), True))
+
+        self.executor.submit(run)
+        self._notify_busy()
+        return token
+
+    def cancel(self, kind=None):
+        """Cancel one kind of task (or all); their pending results are dropped"""
+        kinds = list(self.tokens) if kind is None else [kind]
+        for k in kinds:
+            token = self.tokens.pop(k, None)
+            if token is not None:
+                token.cancel()
+                self.generations[k] = self.generations.get(k, 0) + 1
+        self._notify_busy()
+
+    @property
+    def busy(self):
+        return bool(self.tokens)
+
+    def is_running(self, kind):
+        return kind in self.tokens
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _poll(self):
+        # Reschedule first so a failing callback can't stop the loop
+        self.widget.after(self.poll_ms, self._poll)
+        try:
+            while True:
+                kind, generation, callback, values, finished = self.results.get_nowait()
+                # Drop anything from a task that was cancelled or superseded
+                if self.generations.get(kind) != generation:
+                    continue
+                if finished:
+                    self.tokens.pop(kind, None)
+                    self._notify_busy()
+                if callback is not None:
+                    callback(*values)
+        except queue.Empty:
+            pass
+
+    def _notify_busy(self):
+        if self.on_busy is not None:
+            self.on_busy(self.busy)
@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from column_store import build_store, open_store, prune_stores
+from data_view import DataView, build_view
+from filter_engine import parse_filter
+from workbook_loader import LoadStats, WorkbookLoader
+
+FRAME = pd.DataFrame({
+    "Brand": ["Kia", "Ford", None, "BMW", "Kia", "Audi"],
+    "Year": [2016, 2010, 2020, 2018, 2015, 2012],
+    "Price": [9.5, np.nan, 12.0, 30.0, 5.25, 8.0],
+    "Sold": pd.to_datetime(["2024-01-02", None, "2023-05-06", "2022-07-08", "2024-03-04", "2021-01-01"]),
+})
+
+
+def as_values(frame):
+    return frame.astype(object).where(frame.notna(), None).values.tolist()
+
+
+def chunks(frame, size):
+    return (frame.iloc[start:start + size] for start in range(0, len(frame), size))
+
+
+def test_store_gives_back_the_frame(tmp_path):
+    store = build_store(str(tmp_path / "store"), chunks(FRAME, 4))
+    assert len(store) == len(FRAME)
+    assert list(store.columns) == list(FRAME.columns)
+    assert as_values(store.take(np.arange(len(FRAME)))) == as_values(FRAME)
+    assert store.iloc[[3, 1], [0, 1]].values.tolist() == [["BMW", 2018], ["Ford", 2010]]
+    assert store.take([0])["Year"].dtype == np.int64
+    assert np.isnan(store.numeric("Price")[1])
+
+
+def test_a_column_changing_kind_falls_back_to_text(tmp_path):
+    frame = pd.DataFrame({"Code": [1, 2, 3, "N/A", 5, None]}, dtype=object)
+    parts = [frame.iloc[:3].astype({"Code": "int64"}), frame.iloc[3:]]
+    store = build_store(str(tmp_path / "store"), iter(parts))
+    assert store.take(np.arange(6))["Code"].tolist() == [1, 2, 3, "N/A", 5, None]
+
+
+def test_views_over_a_store_match_the_frame(tmp_path):
+    store = build_store(str(tmp_path / "store"), chunks(FRAME, 4))
+    for text, keys in (("Brand = kia OR Price > 10", (("Brand", True), ("Year", False))),
+                       ("Year > 2011", (("Sold", False),))):
+        expected = build_view(DataView(FRAME), parse_filter(text), keys)
+        actual = build_view(DataView(store), parse_filter(text), keys)
+        assert actual.index.tolist() == expected.index.tolist()
+
+
+def test_open_store_converts_once_then_reopens(tmp_path):
+    path = tmp_path / "cars.csv"
+    FRAME.drop(columns="Sold").to_csv(path, index=False)
+    loader = WorkbookLoader(str(path))
+    store_dir = str(tmp_path / "stores")
+    first = open_store(loader, "cars", ["Price", "Brand"], store_dir=store_dir)
+    assert list(first.columns) == ["Brand", "Price"]
+
+    stats = LoadStats()
+    again = open_store(loader, "cars", ["Brand", "Price"], stats, store_dir=store_dir)
+    assert stats.from_cache and stats.rows == len(FRAME)
+    assert again.directory == first.directory
+
+
+def test_prune_stores_keeps_the_newest_within_the_limit(tmp_path):
+    store_dir = tmp_path / "stores"
+    paths = []
+    for i in range(3):
+        store = build_store(str(store_dir / f"s{i}"), chunks(FRAME, 4))
+        os.utime(store.directory, (i, i))
+        paths.append(store.directory)
+    size = sum(os.path.getsize(os.path.join(paths[0], name)) for name in os.listdir(paths[0]))
+    prune_stores(str(store_dir), size, keep=paths[2])
+    assert [os.path.exists(path) for path in paths] == [False, False, True]
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from compact_types import compact_frame
+from data_view import ColumnCache, DataView, build_view
+from filter_engine import parse_filter
+
+FRAME = pd.DataFrame({
+    "Brand": ["Kia", "Ford", "Kia", "BMW", None, "Audi", "Ford", "Kia", "BMW", "Ford"],
+    "Year": [2016, 2010, 2020, 2018, 2015, np.nan, 2021, 2016, 2010, 2010],
+    "Price": [9.5, 7.0, 12.0, 30.0, 5.0, 25.0, 7.0, 8.0, 31.0, 6.5],
+})
+
+
+def reference(frame, keys, mask=None):
+    """Source row positions as a stable pandas multi-key sort gives them"""
+    rows = frame if mask is None else frame[mask]
+    columns = [column for column, _ in keys]
+    ascending = [asc for _, asc in keys]
+    return rows.sort_values(columns, ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+
+
+@pytest.mark.parametrize("keys", [
+    (("Brand", True),),
+    (("Year", False),),
+    (("Brand", True), ("Year", False)),
+    (("Year", True), ("Brand", False), ("Price", True)),
+])
+def test_multi_key_sort_matches_pandas(keys):
+    view = DataView(FRAME)
+    view.set_sort(keys)
+    assert view.index.tolist() == reference(FRAME, keys).tolist()
+
+
+def test_sort_is_the_same_for_compact_frames():
+    compact, _, _ = compact_frame(FRAME)
+    keys = (("Brand", False), ("Year", True))
+    view = DataView(compact)
+    view.set_sort(keys)
+    assert view.index.tolist() == reference(FRAME, keys).tolist()
+
+
+def test_filtered_sort_keeps_only_matching_rows():
+    view = build_view(DataView(FRAME), parse_filter("Price < 20"), (("Brand", True), ("Price", False)))
+    assert view.index.tolist() == reference(FRAME, (("Brand", True), ("Price", False)), FRAME["Price"] < 20).tolist()
+    assert view.rows(0, 2) == [("Ford", 2010, 7.0), ("Ford", 2021, 7.0)]
+
+
+def test_mixed_type_columns_sort_numbers_first_and_blanks_last():
+    frame = pd.DataFrame({"Code": [10, "b", None, 2, "a", 2.5]})
+    view = DataView(frame)
+    view.set_sort((("Code", True),))
+    assert frame["Code"].iloc[view.index].tolist()[:5] == [2, 2.5, 10, "a", "b"]
+    view.set_sort((("Code", False),))
+    assert frame["Code"].iloc[view.index].tolist()[:5] == ["b", "a", 10, 2.5, 2]
+    assert frame["Code"].iloc[view.index[-1]] is None
+
+
+def test_ranks_are_dense_with_blanks_last_both_ways():
+    cache = ColumnCache(FRAME)
+    assert cache.ranks("Year").tolist() == [2, 0, 4, 3, 1, 6, 5, 2, 0, 0]
+    assert cache.ranks("Year", ascending=False).tolist() == [3, 5, 1, 2, 4, 6, 0, 3, 5, 5]
+
+
+def test_build_view_leaves_its_base_alone():
+    base = DataView(FRAME, ["Brand"])
+    view = build_view(base, parse_filter("Brand = Ford"), None)
+    assert len(view) == 3 and len(base) == len(FRAME)
+    assert build_view(view, None, None).index.tolist() == list(range(len(FRAME)))
+    assert view.frame()["Brand"].tolist() == ["Ford"] * 3
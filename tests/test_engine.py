@@ -0,0 +1,94 @@
+import importlib.util
+import os
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from engine import parse_sort, run_job, run_jobs
+
+CLI_PATH = os.path.join(os.path.dirname(__file__), "..", "excel-util-cli.py")
+
+
+def load_cli():
+    spec = importlib.util.spec_from_file_location("excel_util_cli", CLI_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def cars(tmp_path):
+    path = tmp_path / "cars.csv"
+    path.write_text("Brand,Year,Price\nKia,2016,9\nFord,2010,7\nKia,2020,12\nBMW,2018,30\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("text,keys", [
+    ("Brand", (("Brand", True),)),
+    ("Brand, Price desc", (("Brand", True), ("Price", False))),
+    ("Brand:asc,Price:descending", (("Brand", True), ("Price", False))),
+    ("", None),
+])
+def test_parse_sort(text, keys):
+    assert parse_sort(text) == keys
+
+
+def test_parse_sort_rejects_unknown_orders():
+    with pytest.raises(ValueError):
+        parse_sort("Price:up")
+
+
+def test_run_job_filters_sorts_and_exports(cars, tmp_path):
+    out = str(tmp_path / "kia.csv")
+    result = run_job(cars, columns=["Price", "Nope"], filter_text="Brand = kia", sort_text="Year desc", out=out)
+    assert result.ok and result.rows == 2
+    assert result.missing_columns == ["Nope"]
+    assert pd.read_csv(out).to_dict("list") == {"Price": [12, 9]}
+
+
+def test_run_job_names_files_in_a_directory(cars, tmp_path):
+    result = run_job(cars, filter_text="Year > 2015", out=str(tmp_path), fmt="CSV")
+    assert os.path.dirname(result.out) == str(tmp_path)
+    assert os.path.basename(result.out).startswith("cars_cars_Year-gt-2015")
+    assert len(pd.read_csv(result.out)) == 3
+
+
+def test_run_jobs_merges_and_reports_failures(cars, tmp_path):
+    merged = str(tmp_path / "merged.csv")
+    lines = []
+    results = run_jobs([cars, str(tmp_path / "missing.csv"), cars], log=lines.append, merge=merged, sort_text="Price")
+    assert [result.ok for result in results] == [True, False, True]
+    assert pd.read_csv(merged)["Price"].tolist() == [7, 9, 12, 30] * 2
+    assert all(result.out == merged for result in results if result.ok)
+    # Temporary part files are never shown
+    assert not any("excel-util-parts-" in line for line in lines)
+
+
+def test_run_jobs_writes_no_merge_when_every_job_fails(tmp_path):
+    merged = tmp_path / "merged.csv"
+    results = run_jobs([str(tmp_path / "a.csv"), str(tmp_path / "b.csv")], merge=str(merged))
+    assert not any(result.ok for result in results)
+    assert not merged.exists()
+
+
+def test_cli_exports_a_header_only_sheet(tmp_path, capsys):
+    workbook = openpyxl.Workbook()
+    workbook.active.append(["A", "B"])
+    path = str(tmp_path / "header.xlsx")
+    workbook.save(path)
+    out = tmp_path / "out.csv"
+    assert load_cli().main(["run", "--file", path, "--columns", "A", "--out", str(out), "--no-cache"]) == 0
+    assert out.read_text().strip() == "A"
+
+
+def test_cli_creates_a_new_output_directory(cars, tmp_path, capsys):
+    out = tmp_path / "extracts"
+    assert load_cli().main(["run", "--file", cars, "--format", "CSV", "--out", str(out), "--no-cache"]) == 0
+    assert len(os.listdir(out)) == 1
+
+
+def test_cli_exit_status(cars, tmp_path, capsys):
+    cli = load_cli()
+    assert cli.main(["run", "--file", str(tmp_path / "missing.csv"), "--out", str(tmp_path), "--no-cache"]) == 1
+    assert cli.main(["run", "--file", cars, cars, "--out", str(tmp_path / "one.csv"), "--no-cache"]) == 2
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from column_store import build_store
+from exporter import EXPORT_FORMATS, HAS_PYARROW, export_format, export_frame
+
+if HAS_PYARROW:
+    import pyarrow as pa
+
+FRAME = pd.DataFrame({
+    "Brand": ["Kia", "Ford", None, "BMW", "Audi"],
+    "Year": [2016, 2010, 2020, 2018, 2015],
+    "Price": [9.5, np.nan, 12.0, 30.0, 5.25],
+})
+INDEX = np.array([3, 0, 2, 4])
+COLUMNS = ["Price", "Brand"]
+
+ARROW_FORMATS = {"Parquet", "Feather", "CSV (zstd)"}
+
+
+def read_back(path, fmt):
+    if fmt == "Excel":
+        return pd.read_excel(path)
+    if fmt == "Parquet":
+        return pd.read_parquet(path)
+    if fmt == "Feather":
+        return pd.read_feather(path)
+    if fmt == "CSV (zstd)":
+        # Written through pyarrow, which also reads it without zstandard
+        with pa.input_stream(path, compression="zstd") as f:
+            return pd.read_csv(f)
+    return pd.read_csv(path, sep="\t" if fmt == "TXT" else ",", compression="gzip" if fmt == "CSV (gzip)" else None)
+
+
+def as_values(frame):
+    return frame.astype(object).where(frame.notna(), None).values.tolist()
+
+
+@pytest.mark.parametrize("fmt", list(EXPORT_FORMATS))
+def test_round_trip_keeps_selected_rows_and_columns(tmp_path, fmt):
+    if fmt in ARROW_FORMATS and not HAS_PYARROW:
+        pytest.skip("needs pyarrow")
+    path = str(tmp_path / f"out{EXPORT_FORMATS[fmt]}")
+    assert export_format(path) == fmt
+    stats = export_frame(FRAME, path, COLUMNS, INDEX, chunk_size=3)
+    assert stats.rows == len(INDEX)
+
+    result = read_back(path, fmt)
+    assert list(result.columns) == COLUMNS
+    assert as_values(result) == as_values(FRAME.iloc[INDEX][COLUMNS])
+
+
+@pytest.mark.parametrize("fmt", ["CSV", "Excel", "Parquet"])
+def test_empty_export_still_writes_the_header(tmp_path, fmt):
+    if fmt == "Parquet" and not HAS_PYARROW:
+        pytest.skip("needs pyarrow")
+    path = str(tmp_path / f"out{EXPORT_FORMATS[fmt]}")
+    export_frame(FRAME, path, COLUMNS, np.array([], dtype=np.int64))
+    assert list(read_back(path, fmt).columns) == COLUMNS
+
+
+@pytest.mark.skipif(not HAS_PYARROW, reason="needs pyarrow")
+def test_column_store_exports_like_its_frame(tmp_path):
+    store = build_store(str(tmp_path / "store"), iter([FRAME.iloc[:2], FRAME.iloc[2:]]))
+    for source, name in ((FRAME, "frame.parquet"), (store, "store.parquet")):
+        export_frame(source, str(tmp_path / name), COLUMNS, INDEX, chunk_size=2)
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "store.parquet"), pd.read_parquet(tmp_path / "frame.parquet"))
+
+
+def test_cancelled_export_leaves_no_file(tmp_path):
+    path = tmp_path / "out.csv"
+
+    def cancel():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        export_frame(FRAME, str(path), check=cancel)
+    assert not path.exists()
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_view import ColumnCache
+from filter_engine import And, Condition, MaskCache, Or, combine, evaluate, implies, parse_filter, plan_children
+
+FRAME = pd.DataFrame({
+    "Brand": ["Kia", "Ford", "kia", "BMW", None, "Kiato", "Ford", "Audi"],
+    "Model": ["Rio", "Focus", "Soul", "X5", "Rio", "Rio", "Ka", "A4"],
+    "Year": [2016, 2010, 2020, 2018, 2015, None, 2021, 2012],
+})
+
+
+def reference(expression):
+    """The expression evaluated row by row with plain pandas"""
+    if isinstance(expression, And):
+        return np.logical_and.reduce([reference(child) for child in expression.children])
+    if isinstance(expression, Or):
+        return np.logical_or.reduce([reference(child) for child in expression.children])
+    column = FRAME[expression.column]
+    if expression.condition == "greater than":
+        return (pd.to_numeric(column, errors="coerce") > expression.number).to_numpy()
+    if expression.condition == "less than":
+        return (pd.to_numeric(column, errors="coerce") < expression.number).to_numpy()
+    if expression.number is not None:
+        return (pd.to_numeric(column, errors="coerce") == expression.number).to_numpy()
+    text = column.astype(object).where(column.notna(), None)
+    value = expression.value.lower()
+    checks = {
+        "equals": lambda s: s.lower() == value,
+        "contains": lambda s: pd.Series([s]).str.contains(expression.value, case=False).iloc[0],
+        "starts with": lambda s: s.lower().startswith(value),
+        "ends with": lambda s: s.lower().endswith(value),
+    }
+    return np.array([s is not None and bool(checks[expression.condition](s)) for s in text])
+
+
+@pytest.mark.parametrize("text", [
+    "Brand = Kia",
+    "Brand contains ki AND Year > 2015",
+    "Brand = Ford OR Model starts with r",
+    "(Brand = Ford OR Brand = kia) AND Year < 2021",
+    "Model ends with o OR Year = 2012 AND Brand contains u",
+    "Brand contains ^k.a$",
+])
+def test_evaluate_matches_row_by_row_reference(text):
+    expression = parse_filter(text)
+    assert np.array_equal(evaluate(expression, ColumnCache(FRAME)), reference(expression))
+
+
+def test_parse_filter_precedence_and_quoting():
+    expression = parse_filter('Brand = Kia AND Year > 2015 OR Model = "Range Rover"')
+    assert isinstance(expression, Or)
+    first, second = expression.children
+    assert isinstance(first, And) and [c.column for c in first.children] == ["Brand", "Year"]
+    assert (second.column, second.condition, second.value) == ("Model", "equals", "Range Rover")
+    condition = parse_filter("Fuel Type starts with hyb")
+    assert (condition.column, condition.condition, condition.value) == ("Fuel Type", "starts with", "hyb")
+
+
+@pytest.mark.parametrize("text", ["Brand Kia", "(Brand = Kia", "Brand = Kia)", "Year > new", "Brand contains ("])
+def test_parse_filter_errors(text):
+    with pytest.raises(ValueError):
+        parse_filter(text)
+
+
+def test_combine_binds_and_tighter_than_or():
+    a, b, c = Condition("Brand", "equals", "Kia"), Condition("Year", "greater than", 2015), Condition("Model", "equals", "Ka")
+    expression = combine([("", a), ("AND", b), ("OR", c)])
+    assert expression == Or([And([a, b]), c])
+    assert combine([]) is None
+
+
+def test_and_plans_the_most_selective_child_first():
+    broad = Condition("Year", "greater than", 2000)
+    narrow = Condition("Brand", "equals", "BMW")
+    assert plan_children([broad, narrow], ColumnCache(FRAME), lambda s, c: c / max(1 - s, 1e-9)) == [narrow, broad]
+
+
+@pytest.mark.parametrize("new,old,expected", [
+    (("contains", "kia"), ("contains", "ki"), True),
+    (("equals", "kia"), ("starts with", "ki"), True),
+    (("starts with", "kia"), ("starts with", "ki"), True),
+    (("ends with", "ia"), ("starts with", "k"), False),
+    (("contains", "k.a"), ("contains", "k"), False),
+    (("contains", "kia"), ("contains", "k.a"), False),
+    (("greater than", 2016), ("greater than", 2015), True),
+    (("equals", 2016), ("less than", 2017), True),
+    (("less than", 2016), ("less than", 2015), False),
+])
+def test_condition_implies(new, old, expected):
+    column = "Brand" if isinstance(new[1], str) else "Year"
+    assert Condition(column, *new).implies(Condition(column, *old)) is expected
+
+
+def test_implies_through_groups():
+    kia, ki = Condition("Brand", "contains", "kia"), Condition("Brand", "contains", "ki")
+    recent = Condition("Year", "greater than", 2015)
+    assert implies(And([kia, recent]), ki)
+    assert implies(kia, Or([ki, recent]))
+    assert not implies(Or([kia, recent]), ki)
+
+
+def test_mask_cache_refines_the_narrowest_cached_superset():
+    cache = ColumnCache(FRAME)
+    broad = parse_filter("Brand contains a")
+    narrow = parse_filter("Brand contains ki")
+    evaluate(broad, cache)
+    evaluate(narrow, cache)
+    refined = parse_filter("Brand contains kia")
+    assert cache.masks.narrowest_superset(refined) is cache.masks.get(narrow)
+    assert np.array_equal(evaluate(refined, cache), reference(refined))
+    assert evaluate(refined, cache) is cache.masks.get(refined)
+
+
+def test_mask_cache_is_bounded():
+    masks = MaskCache(size=2)
+    expressions = [Condition("Year", "greater than", year) for year in (2010, 2011, 2012)]
+    for expression in expressions:
+        masks.put(expression, np.zeros(3, dtype=bool))
+    assert masks.get(expressions[0]) is None
+    assert masks.get(expressions[2]) is not None
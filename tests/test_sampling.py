@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sampling import SampleInfo, estimate_count, reservoir_sample
+
+
+def chunks(rows, size):
+    frame = pd.DataFrame({"row": np.arange(rows)})
+    return (frame.iloc[start:start + size] for start in range(0, rows, size))
+
+
+def test_sample_is_in_source_order_without_repeats():
+    sample, total = reservoir_sample(chunks(1000, 64), 50, seed=1)
+    rows = sample["row"].tolist()
+    assert total == 1000
+    assert len(rows) == 50
+    assert rows == sorted(set(rows))
+
+
+def test_short_sources_are_returned_whole():
+    sample, total = reservoir_sample(chunks(30, 7), 50, seed=1)
+    assert total == 30
+    assert sample["row"].tolist() == list(range(30))
+
+
+def test_every_row_is_equally_likely():
+    # Chunks much larger than the sample, so rows of one chunk often draw
+    # the same slot
+    rows, size, trials = 60, 6, 2000
+    hits = np.zeros(rows)
+    for seed in range(trials):
+        sample, _ = reservoir_sample(chunks(rows, 25), size, seed=seed)
+        hits[sample["row"].to_numpy()] += 1
+    expected = trials * size / rows
+    spread = np.sqrt(expected * (1 - size / rows))
+    assert np.abs(hits - expected).max() < 5 * spread
+    # Chi-square with rows - 1 degrees of freedom, far beyond its 99.9% point
+    assert ((hits - expected) ** 2 / expected).sum() < 110
+
+
+@pytest.mark.parametrize("matches,size,total", [(0, 100, 1000), (40, 100, 1000), (100, 100, 1000), (30, 100, 100)])
+def test_estimate_bounds_hold_the_estimate(matches, size, total):
+    estimate, low, high = estimate_count(matches, SampleInfo("random", size, total))
+    assert low <= estimate <= high
+    assert matches <= low and high <= total - (size - matches)
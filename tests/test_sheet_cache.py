@@ -0,0 +1,37 @@
+import os
+
+import pandas as pd
+
+from sheet_cache import SheetCache
+
+
+def test_round_trip_and_projection(tmp_path):
+    source = tmp_path / "data.csv"
+    source.write_text("x")
+    cache = SheetCache(str(tmp_path / "cache"))
+    frame = pd.DataFrame({"A": [1, 2], "B": ["x", None]})
+    assert cache.get(str(source), "data") is None
+    cache.put(str(source), "data", frame)
+    pd.testing.assert_frame_equal(cache.get(str(source), "data"), frame)
+    assert list(cache.get(str(source), "data", ["B"]).columns) == ["B"]
+
+    source.write_text("changed")
+    assert cache.get(str(source), "data") is None
+
+
+def test_evict_skips_entries_removed_meanwhile(tmp_path, monkeypatch):
+    cache = SheetCache(str(tmp_path / "cache"), max_bytes=0)
+    for name in ("a.feather", "b.feather"):
+        (tmp_path / "cache" / name).write_bytes(b"x" * 10)
+
+    listdir = os.listdir
+
+    def listdir_then_remove(path):
+        names = listdir(path)
+        os.remove(os.path.join(path, "a.feather"))  # Another worker evicts it
+        return names
+
+    monkeypatch.setattr(os, "listdir", listdir_then_remove)
+    cache.evict()
+    monkeypatch.setattr(os, "listdir", listdir)
+    assert os.listdir(cache.cache_dir) == []
@@ -0,0 +1,70 @@
+import datetime
+
+import openpyxl
+import pytest
+
+from sheet_index import SheetIndex, scan_workbook
+from workbook_loader import WorkbookLoader
+
+
+def save(tmp_path, fill):
+    workbook = openpyxl.Workbook()
+    fill(workbook.active)
+    path = str(tmp_path / "book.xlsx")
+    workbook.save(path)
+    return path
+
+
+def loaded(path):
+    loader = WorkbookLoader(path)
+    try:
+        return loader.read_sheet(loader.sheet_names[0])
+    finally:
+        loader.close()
+
+
+def plain(sheet):
+    sheet.append(["Brand", "Year", None, "Brand"])
+    for row in range(5):
+        sheet.append(["Kia", 2010 + row, row, "x"])
+
+
+def offset(sheet):
+    sheet["C3"], sheet["D3"] = "x", "y"
+    for row in (4, 5):
+        sheet.cell(row, 3, row)
+        sheet.cell(row, 4, row * 2)
+
+
+def dated(sheet):
+    sheet.append(["Name", datetime.datetime(2024, 1, 31), 1.5])
+    sheet.append(["a", 1, 2])
+
+
+@pytest.mark.parametrize("fill", [plain, offset, dated])
+def test_scan_matches_the_loaded_frame(tmp_path, fill):
+    path = save(tmp_path, fill)
+    sheet, = scan_workbook(path)
+    frame = loaded(path)
+    assert sheet["header"] == list(frame.columns)
+    assert sheet["rows"] == len(frame)
+    assert sheet["columns"] == frame.shape[1]
+
+
+def test_header_only_sheet(tmp_path):
+    path = save(tmp_path, lambda sheet: sheet.append(["A", "B"]))
+    sheet, = scan_workbook(path)
+    assert sheet["header"] == ["A", "B"]
+    assert sheet["rows"] == 0
+
+
+def test_index_persists_and_rescans_changed_files(tmp_path):
+    path = save(tmp_path, plain)
+    index_file = str(tmp_path / "index.json")
+    assert SheetIndex(index_file).lookup(path)[0]["rows"] == 5
+
+    reopened = SheetIndex(index_file)
+    assert len(reopened.entries) == 1
+    save(tmp_path, offset)
+    assert reopened.lookup(path)[0]["header"] == ["Unnamed: 0", "Unnamed: 1", "Unnamed: 2", "Unnamed: 3"]
+    assert len(reopened.entries) == 1
@@ -0,0 +1,94 @@
+import gc
+import os
+
+import pandas as pd
+import pytest
+
+from column_store import build_store
+from sql_query import QueryEngine, table_name
+from tasks import TaskCancelled, TaskToken
+
+CARS = pd.DataFrame({
+    "Brand": ["Kia", "Ford", "Kia", "BMW"],
+    "Year": [2016, 2010, 2020, 2018],
+    "Price": [9.5, 7.0, 12.0, 30.0],
+})
+
+
+@pytest.fixture
+def engine():
+    engine = QueryEngine()
+    yield engine
+    engine.close()
+
+
+@pytest.mark.parametrize("path,sheet,name", [
+    ("/data/car price.xlsx", "Sheet 1", "car_price_Sheet_1"),
+    ("/data/cars.csv", "cars", "cars"),
+    ("/data/2024.csv", "2024", "t_2024"),
+])
+def test_table_name(path, sheet, name):
+    assert table_name(path, sheet) == name
+
+
+def test_queries_run_inside_sqlite(engine):
+    name = engine.register("/data/cars.csv", "cars", CARS)
+    result = engine.run(f"SELECT Brand, COUNT(*) AS n, MAX(Price) AS top FROM {name} GROUP BY Brand ORDER BY n DESC, Brand")
+    assert result.to_dict("list") == {"Brand": ["Kia", "BMW", "Ford"], "n": [2, 1, 1], "top": [12.0, 30.0, 7.0]}
+
+
+def test_registering_again_replaces_the_table(engine):
+    name = engine.register("/data/cars.csv", "cars", CARS)
+    engine.run(f"SELECT * FROM {name}")
+    newer = CARS.iloc[:1]
+    assert engine.register("/data/cars.csv", "cars", newer) == name
+    assert len(engine.run(f"SELECT * FROM {name}")) == 1
+    assert engine.register("/other/cars.csv", "cars", CARS) == "cars_2"
+
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM cars",
+    "DROP TABLE cars",
+    "INSERT INTO cars VALUES ('x', 1, 2)",
+    "PRAGMA table_info(cars)",
+    "ATTACH DATABASE 'other.db' AS other",
+    "SELECT * FROM missing",
+])
+def test_only_reads_are_allowed(engine, sql):
+    engine.register("/data/cars.csv", "cars", CARS)
+    engine.run("SELECT * FROM cars")
+    with pytest.raises(ValueError, match="Query failed"):
+        engine.run(sql)
+    assert len(engine.run("SELECT * FROM cars")) == len(CARS)
+
+
+def test_column_store_tables(engine, tmp_path):
+    store = build_store(str(tmp_path / "store"), iter([CARS.iloc[:2], CARS.iloc[2:]]))
+    name = engine.register("/data/cars.csv", "cars", store)
+    assert engine.run(f"SELECT SUM(Year) AS total FROM {name}")["total"].tolist() == [CARS["Year"].sum()]
+
+
+def test_a_released_sheet_is_read_again(engine, tmp_path):
+    path = tmp_path / "cars.csv"
+    CARS.to_csv(path, index=False)
+    frame = CARS.copy()
+    name = engine.register(str(path), "cars", frame)
+    del frame
+    gc.collect()
+    assert len(engine.run(f"SELECT * FROM {name}")) == len(CARS)
+
+
+def test_cancel_interrupts_a_query(engine):
+    token = TaskToken()
+    token.cancel()
+    with pytest.raises(TaskCancelled):
+        engine.run("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT COUNT(*) FROM c", token.check)
+
+
+def test_close_removes_the_database(tmp_path):
+    engine = QueryEngine()
+    engine.register("/data/cars.csv", "cars", CARS)
+    engine.run("SELECT * FROM cars")
+    directory = engine._directory
+    engine.close()
+    assert not os.path.exists(directory)
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from column_store import build_store
+from compact_types import compact_frame
+from data_view import ColumnCache
+from filter_engine import Condition, evaluate
+
+# Blank cells in every form a load can produce them
+VALUES = ["Kia", None, "kia", np.nan, "", "Banana", "NaN", "nan", "Kia", None] * 3
+
+FILTERS = [
+    ("contains", "nan"),
+    ("equals", ""),
+    ("contains", ""),
+    ("equals", "kia"),
+    ("starts with", "ba"),
+    ("ends with", "an"),
+]
+
+
+def load_modes(tmp_path):
+    plain = pd.DataFrame({"Text": pd.Series(VALUES, dtype=object)})
+    compact, _, _ = compact_frame(plain)
+    assert isinstance(compact["Text"].dtype, pd.CategoricalDtype)
+    store = build_store(str(tmp_path / "store"), iter([plain.iloc[:10], plain.iloc[10:]]))
+    return {"normal": plain, "compact": compact, "column store": store}
+
+
+@pytest.mark.parametrize("condition,value", FILTERS)
+def test_text_filter_does_not_depend_on_load_mode(tmp_path, condition, value):
+    masks = {mode: evaluate(Condition("Text", condition, value), ColumnCache(source))
+             for mode, source in load_modes(tmp_path).items()}
+    expected = masks.pop("normal")
+    for mode, mask in masks.items():
+        assert np.array_equal(mask, expected), mode
+
+
+def test_blank_cells_match_no_text_condition(tmp_path):
+    blank = np.array([value is None or value is np.nan or value == "" for value in VALUES])
+    for source in load_modes(tmp_path).values():
+        cache = ColumnCache(source)
+        for condition, value in FILTERS:
+            assert not evaluate(Condition("Text", condition, value), cache)[blank].any()
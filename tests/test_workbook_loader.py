@@ -0,0 +1,82 @@
+import openpyxl
+import pandas as pd
+import pytest
+
+from column_store import open_store
+from workbook_loader import WorkbookLoader, make_column_names
+
+
+@pytest.fixture(params=["xlsx", "csv"])
+def header_only(request, tmp_path):
+    path = tmp_path / f"header.{request.param}"
+    if request.param == "xlsx":
+        workbook = openpyxl.Workbook()
+        workbook.active.append(["A", "B"])
+        workbook.save(path)
+    else:
+        path.write_text("A,B\n")
+    loader = WorkbookLoader(str(path))
+    yield loader, loader.sheet_names[0]
+    loader.close()
+
+
+def test_header_only_sheet_keeps_its_columns(header_only):
+    loader, sheet = header_only
+    assert list(loader.read_sheet(sheet).columns) == ["A", "B"]
+    assert list(loader.read_sheet(sheet, usecols=["B"]).columns) == ["B"]
+
+
+@pytest.mark.parametrize("method", ["first", "random"])
+def test_header_only_sample_keeps_its_columns(header_only, method):
+    loader, sheet = header_only
+    sample, total = loader.read_sample(sheet, 10, method=method)
+    assert list(sample.columns) == ["A", "B"]
+    assert total == 0
+
+
+def test_chunks_match_pandas(tmp_path):
+    path = tmp_path / "book.xlsx"
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Brand", None, "Brand", "Year"])
+    for row in range(12):
+        sheet.append(["Kia", row, None if row % 3 else "x", 2000 + row])
+    sheet.append([None, None, None, None])  # Trailing blank row
+    workbook.save(path)
+
+    loader = WorkbookLoader(str(path), chunk_size=5)
+    try:
+        frame = loader.read_sheet("Sheet")
+        expected = pd.read_excel(path)
+        assert list(frame.columns) == list(expected.columns)
+        # Blanks as None or NaN alike
+        assert frame.astype(object).where(frame.notna(), None).values.tolist() == \
+            expected.astype(object).where(expected.notna(), None).values.tolist()
+        projected = loader.read_sheet("Sheet", usecols=["Year", "Brand"])
+        assert list(projected.columns) == ["Brand", "Year"]
+        assert [len(chunk) for chunk in loader.iter_chunks("Sheet")] == [5, 5, 2]
+    finally:
+        loader.close()
+
+
+def test_make_column_names():
+    assert make_column_names(["A", None, "A", 5, "A"]) == ["A", "Unnamed: 1", "A.1", "5", "A.2"]
+
+
+def test_header_only_column_store_keeps_its_columns(header_only, tmp_path):
+    loader, sheet = header_only
+    store = open_store(loader, sheet, store_dir=str(tmp_path / "stores"))
+    assert list(store.columns) == ["A", "B"]
+    assert len(store) == 0
+
+
+def test_csv_types_do_not_depend_on_load_mode(tmp_path):
+    path = tmp_path / "dates.csv"
+    path.write_text("Day,Time,Stamp,Count\n2024-01-31,10:00:00,2024-01-31 10:00:00,1\n2024-02-01,11:30:00,2024-02-01 11:00:00,2\n")
+    loader = WorkbookLoader(str(path))
+    full = loader.read_sheet("dates")
+    preview, _ = loader.read_sample("dates", 1)
+    streamed = next(loader.iter_chunks("dates", stream=True))
+    for frame in (preview, streamed):
+        assert frame.dtypes.tolist() == full.dtypes.tolist()
+    assert full.iloc[0].tolist() == ["2024-01-31", "10:00:00", "2024-01-31 10:00:00", 1]
@@ -0,0 +1,162 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualGrid(ttk.Frame):
+    """Treeview that only materializes the rows currently scrolled into view.
+
+    The grid never owns the data. Callers hand it a row count and a
+    fetch(start, stop) callable returning row value tuples; the grid keeps a
+    pool of Treeview items sized to the viewport and rewrites their values as
+    the user scrolls, so display time does not grow with the number of rows.
+    """
+
+    DEFAULT_ROW_HEIGHT = 20
+    DEFAULT_HEADER_HEIGHT = 24
+
+    def __init__(self, master, overscan=50, column_width=100, **kwargs):
+        super().__init__(master, **kwargs)
+        self.overscan = overscan
+        self.column_width = column_width
+
+        self.columns = []
+        self.row_count = 0
+        self.fetch = None
+        self.offset = 0
+        self.visible_rows = 1
+
+        # Rows fetched around the viewport so small scrolls don't refetch
+        self._block_start = 0
+        self._block = []
+        self._items = []
+
+        # Vertical scrollbar is driven by row count, not by the Treeview
+        self.y_scroll = ttk.Scrollbar(self, orient="vertical", command=self.on_yscroll)
+        self.y_scroll.pack(side="right", fill="y")
+
+        self.x_scroll = ttk.Scrollbar(self, orient="horizontal")
+        self.x_scroll.pack(side="bottom", fill="x")
+
+        self.tree = ttk.Treeview(self, show="headings", xscrollcommand=self.x_scroll.set)
+        self.tree.pack(fill="both", expand=True)
+        self.x_scroll.config(command=self.tree.xview)
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll_rows(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_rows(3))
+        self.tree.bind("<Prior>", lambda e: self.scroll_rows(-self.visible_rows))
+        self.tree.bind("<Next>", lambda e: self.scroll_rows(self.visible_rows))
+        self.tree.bind("<Control-Home>", lambda e: self.scroll_to(0))
+        self.tree.bind("<Control-End>", lambda e: self.scroll_to(self.row_count))
+
+    def set_data(self, columns, row_count, fetch):
+        """Point the grid at a new row source and jump back to the top"""
+        self.columns = list(columns)
+        self.row_count = row_count
+        self.fetch = fetch
+        self.offset = 0
+        self._invalidate()
+
+        self.tree["columns"] = self.columns
+        for col in self.columns:
+            self.tree.column(col, anchor=tk.W, width=self.column_width)
+            self.tree.heading(col, text=col, anchor=tk.W)
+
+        self.render()
+
+    def set_frame(self, df, columns=None):
+        """Display a DataFrame without copying it; rows are sliced on demand"""
+        columns = list(df.columns) if columns is None else list(columns)
+        positions = [df.columns.get_loc(col) for col in columns]
+
+        def fetch(start, stop):
+            return list(df.iloc[start:stop, positions].itertuples(index=False, name=None))
+
+        self.set_data(columns, len(df), fetch)
+
+    def clear(self):
+        self.columns = []
+        self.row_count = 0
+        self.fetch = None
+        self.offset = 0
+        self._invalidate()
+        self.tree.delete(*self.tree.get_children())
+        self._items = []
+        self.tree["columns"] = ()
+        self.update_scrollbar()
+
+    def scroll_rows(self, delta):
+        self.scroll_to(self.offset + delta)
+        return "break"
+
+    def scroll_to(self, row):
+        row = self._clamp(row)
+        if row != self.offset:
+            self.offset = row
+            self.render()
+        return "break"
+
+    def on_yscroll(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * self.row_count))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= self.visible_rows
+            self.scroll_rows(step)
+
+    def on_mousewheel(self, event):
+        return self.scroll_rows(-3 if event.delta > 0 else 3)
+
+    def on_resize(self, event):
+        row_height = self.DEFAULT_ROW_HEIGHT
+        top = self.DEFAULT_HEADER_HEIGHT
+        if self._items:
+            bbox = self.tree.bbox(self._items[0])
+            if bbox:
+                top, row_height = bbox[1], bbox[3]
+        visible_rows = max(1, (event.height - top) // max(1, row_height))
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.offset = self._clamp(self.offset)
+            self.render()
+
+    def render(self):
+        stop = min(self.offset + self.visible_rows, self.row_count)
+        rows = self._get_rows(self.offset, stop)
+
+        # Grow or shrink the item pool to match the viewport
+        while len(self._items) < len(rows):
+            self._items.append(self.tree.insert("", tk.END, values=()))
+        while len(self._items) > len(rows):
+            self.tree.delete(self._items.pop())
+
+        for iid, values in zip(self._items, rows):
+            self.tree.item(iid, values=values)
+
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        if self.row_count <= 0:
+            self.y_scroll.set(0.0, 1.0)
+            return
+        first = self.offset / self.row_count
+        last = min(self.offset + self.visible_rows, self.row_count) / self.row_count
+        self.y_scroll.set(first, last)
+
+    def _get_rows(self, start, stop):
+        if self.fetch is None or start >= stop:
+            return []
+        block_stop = self._block_start + len(self._block)
+        if start < self._block_start or stop > block_stop:
+            self._block_start = max(0, start - self.overscan)
+            self._block = self.fetch(self._block_start, min(self.row_count, stop + self.overscan))
+        return self._block[start - self._block_start:stop - self._block_start]
+
+    def _invalidate(self):
+        self._block_start = 0
+        self._block = []
+
+    def _clamp(self, row):
+        return max(0, min(row, self.row_count - self.visible_rows))
@@ -0,0 +1,354 @@
+import csv
+import os
+import time
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from perf_stats import peak_rss_mb
+from sampling import reservoir_sample
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+DEFAULT_CHUNK_SIZE = 5000
+# Delimited text files, read as a single pseudo-sheet
+CSV_SEPARATORS = {".csv": ",", ".tsv": "\t", ".tab": "\t"}
+# Text files from this size on are memory-mapped unless told otherwise
+MMAP_MIN_BYTES = 64 * 1024 * 1024
+CSV_BLOCK_SIZE = 4 * 1024 * 1024
+# Rows per chunk when a text file is streamed instead of read in one pass
+CSV_STREAM_ROWS = 200000
+
+
+class LoadStats:
+    """Row count, throughput and peak memory of one sheet load"""
+
+    def __init__(self):
+        self.rows = 0
+        self.from_cache = False
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add(self, rows):
+        self.rows += rows
+        self.elapsed = time.perf_counter() - self.start
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        source = "cache" if self.from_cache else "workbook"
+        text = f"{self.rows:,} rows from {source} in {self.elapsed:.2f}s ({self.rows_per_sec:,.0f} rows/s"
+        peak = peak_rss_mb()
+        if peak is not None:
+            text += f", peak memory {peak:,.0f} MB"
+        return text + ")"
+
+
+class WorkbookLoader:
+    """Keeps one open workbook and streams its sheets in row chunks.
+
+    .xlsx/.xlsm files are opened once with openpyxl in read-only mode, so
+    listing sheets is cheap and rows are parsed lazily as chunks are
+    requested. Other formats (.xls) fall back to a single pandas ExcelFile
+    handle and are returned as one chunk.
+
+    CSV/TSV files have one pseudo-sheet named after the file. They are
+    parsed in one pass by pyarrow's multi-threaded CSV reader (pandas' C
+    parser without pyarrow), memory-mapped when memory_map is True or, by
+    default, when the file is at least MMAP_MIN_BYTES.
+
+    With a SheetCache, read_sheet() serves previously parsed sheets from the
+    cache and stores newly parsed ones in it.
+
+    Reads can be limited to some columns (usecols); values of the other
+    columns are dropped as each row is parsed, so they never reach a frame.
+    """
+
+    def __init__(self, path, chunk_size=DEFAULT_CHUNK_SIZE, cache=None, memory_map=None):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.cache = cache
+        self.workbook = None
+        self.excel_file = None
+        self.csv_sheet = None
+
+        extension = os.path.splitext(path)[1].lower()
+        if extension in (".xlsx", ".xlsm"):
+            self.workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        elif extension in CSV_SEPARATORS:
+            self.csv_sheet = os.path.splitext(os.path.basename(path))[0]
+            self.separator = CSV_SEPARATORS[extension]
+            self.memory_map = memory_map if memory_map is not None else os.path.getsize(path) >= MMAP_MIN_BYTES
+        else:
+            self.excel_file = pd.ExcelFile(path)
+
+    @property
+    def sheet_names(self):
+        if self.csv_sheet is not None:
+            return [self.csv_sheet]
+        if self.workbook is not None:
+            return list(self.workbook.sheetnames)
+        return list(self.excel_file.sheet_names)
+
+    def header(self, sheet_name):
+        """Column names of a sheet, read from its first row only"""
+        if self.csv_sheet is not None:
+            self._check_csv_sheet(sheet_name)
+            with open(self.path, newline="", encoding="utf-8-sig") as f:
+                first = next(csv.reader(f, delimiter=self.separator), None)
+            return make_column_names([value if value != "" else None for value in first]) if first else []
+        if self.workbook is None:
+            return list(self.excel_file.parse(sheet_name, nrows=0).columns)
+        first = next(self.workbook[sheet_name].iter_rows(max_row=1, values_only=True), None)
+        return make_column_names(first) if first is not None else []
+
+    def projection(self, sheet_name, usecols):
+        """usecols in sheet order if they all exist in the header, else None
+        (meaning: read every column)"""
+        if not usecols:
+            return None
+        header = self.header(sheet_name)
+        if any(col not in header for col in usecols):
+            return None
+        return [col for col in header if col in usecols]
+
+    def iter_chunks(self, sheet_name, stats=None, usecols=None, stream=False):
+        """Yield the sheet as DataFrames of at most chunk_size rows, with all
+        columns or only usecols (which must exist in the header).
+
+        Text files come as one frame, or with stream in CSV_STREAM_ROWS
+        chunks so the whole file is never in memory at once."""
+        if self.csv_sheet is not None:
+            if stream:
+                yield from self._stream_csv(sheet_name, stats, usecols)
+                return
+            df = self._read_csv(sheet_name, usecols)
+            if stats is not None:
+                stats.add(len(df))
+            yield df
+            return
+
+        if self.workbook is None:
+            df = self.excel_file.parse(sheet_name, usecols=usecols)
+            if stats is not None:
+                stats.add(len(df))
+            yield df
+            return
+
+        rows = self.workbook[sheet_name].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = make_column_names(header)
+        width = len(columns)
+        positions = None
+        if usecols is not None:
+            positions = [columns.index(col) for col in usecols]
+            columns = list(usecols)
+
+        chunk = []
+        blank_run = []
+        for row in rows:
+            row = tuple(row[:width]) + (None,) * (width - len(row))
+            # Hold back blank rows so trailing empty rows are dropped
+            if all(value is None for value in row):
+                blank_run.append(row)
+                continue
+            if positions is not None:
+                # Trailing blank rows are judged on whole rows, as in a full read
+                row = tuple(row[i] for i in positions)
+                blank_run = [tuple(None for _ in positions) for _ in blank_run]
+            if blank_run:
+                chunk.extend(blank_run)
+                blank_run = []
+            chunk.append(row)
+
+            if len(chunk) >= self.chunk_size:
+                yield self._make_frame(chunk, columns, stats)
+                chunk = []
+
+        if chunk:
+            yield self._make_frame(chunk, columns, stats)
+
+    def read_sheet(self, sheet_name, stats=None, on_chunk=None, usecols=None):
+        """Read a whole sheet into one DataFrame.
+
+        on_chunk(chunk, index) is called as each chunk arrives, e.g. to show
+        the first page early or to abort the read by raising. With usecols
+        only those columns are read (in sheet order); if any of them isn't
+        in the header, the whole sheet is read instead.
+        """
+        usecols = self.projection(sheet_name, usecols)
+        if self.cache is not None:
+            df = self.cache.get(self.path, sheet_name, usecols)
+            if df is not None:
+                if stats is not None:
+                    stats.from_cache = True
+                    stats.add(len(df))
+                if on_chunk is not None:
+                    on_chunk(df, 0)
+                return df
+
+        chunks = []
+        for chunk in self.iter_chunks(sheet_name, stats, usecols):
+            if on_chunk is not None:
+                on_chunk(chunk, len(chunks))
+            chunks.append(chunk)
+        if not chunks:
+            # No data rows: keep the header's columns
+            df = self._empty_frame(sheet_name, usecols)
+        else:
+            df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+        if self.cache is not None:
+            self.cache.put(self.path, sheet_name, df, usecols)
+        return df
+
+    def read_sample(self, sheet_name, size, method="first", stats=None, on_chunk=None, usecols=None, seed=None):
+        """Read a preview of a sheet: its first size rows, or (method
+        "random") a uniform random sample of size rows in sheet order.
+
+        Returns (frame, total rows in the sheet or None if not known). The
+        first rows are read without parsing the rest of the sheet; a random
+        sample takes one streaming pass and holds only the sample in memory.
+        A sheet in the cache is sampled from there.
+        """
+        usecols = self.projection(sheet_name, usecols)
+        if self.cache is not None:
+            df = self.cache.get(self.path, sheet_name, usecols)
+            if df is not None:
+                if stats is not None:
+                    stats.from_cache = True
+                if method == "random" and len(df) > size:
+                    rows = np.sort(np.random.default_rng(seed).choice(len(df), size, replace=False))
+                    sample = df.iloc[rows].reset_index(drop=True)
+                else:
+                    sample = df.iloc[:size]
+                if stats is not None:
+                    stats.add(len(df))
+                if on_chunk is not None:
+                    on_chunk(sample, 0)
+                return sample, len(df)
+
+        if method == "random":
+            def chunks():
+                for index, chunk in enumerate(self.iter_chunks(sheet_name, stats, usecols)):
+                    if on_chunk is not None:
+                        on_chunk(chunk, index)
+                    yield chunk
+            sample, total = reservoir_sample(chunks(), size, seed)
+            return (sample if total else self._empty_frame(sheet_name, usecols)), total
+
+        if self.csv_sheet is not None:
+            df = self._read_csv(sheet_name, usecols, nrows=size)
+            if stats is not None:
+                stats.add(len(df))
+            if on_chunk is not None:
+                on_chunk(df, 0)
+            return df, (len(df) if len(df) < size else None)
+
+        chunks = []
+        rows = 0
+        source = self.iter_chunks(sheet_name, stats, usecols)
+        for chunk in source:
+            if on_chunk is not None:
+                on_chunk(chunk, len(chunks))
+            chunks.append(chunk)
+            rows += len(chunk)
+            if rows >= size:
+                break
+        source.close()
+        if not chunks:
+            return self._empty_frame(sheet_name, usecols), 0
+        df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+        # Fewer rows than asked for: that was the whole sheet
+        return df.iloc[:size], (rows if rows < size else None)
+
+    def close(self):
+        if self.workbook is not None:
+            self.workbook.close()
+        if self.excel_file is not None:
+            self.excel_file.close()
+
+    def _check_csv_sheet(self, sheet_name):
+        if sheet_name != self.csv_sheet:
+            raise ValueError(f"Sheet '{sheet_name}' not found in {self.path}")
+
+    def _read_csv(self, sheet_name, usecols=None, nrows=None):
+        """The whole text file (or its first nrows) as one frame, parsed column-wise"""
+        header = self.header(sheet_name)
+        if not header:
+            return pd.DataFrame()
+        if not HAS_PYARROW or nrows is not None:
+            # pandas stops parsing after nrows; pyarrow has no such option
+            return pd.read_csv(self.path, sep=self.separator, header=0, names=header, usecols=usecols,
+                               memory_map=self.memory_map, encoding="utf-8-sig", nrows=nrows)
+
+        # Header names as make_column_names gives them, so usecols and
+        # duplicate names match the workbook path
+        read_options = pa_csv.ReadOptions(column_names=header, skip_rows=1, use_threads=True, block_size=CSV_BLOCK_SIZE)
+        parse_options = pa_csv.ParseOptions(delimiter=self.separator, newlines_in_values=True)
+        # Blank text cells are missing values, as pandas reads them
+        convert_options = pa_csv.ConvertOptions(include_columns=usecols, strings_can_be_null=True)
+        # pyarrow parses dates and times, which pandas (previews, streamed
+        # and out-of-core loads) leaves as text: read those columns as text
+        # too, so every load mode gives the same types
+        reader = pa_csv.open_csv(self.path, read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+        try:
+            convert_options.column_types = {field.name: pa.string() for field in reader.schema if pa.types.is_temporal(field.type)}
+        finally:
+            reader.close()
+        source = pa.memory_map(self.path) if self.memory_map else self.path
+        try:
+            table = pa_csv.read_csv(source, read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+        finally:
+            if self.memory_map:
+                source.close()
+        return table.to_pandas()
+
+    def _stream_csv(self, sheet_name, stats=None, usecols=None):
+        # pandas' chunked reader: each chunk's types are inferred on their
+        # own, where pyarrow's streaming reader fails on a later block that
+        # doesn't fit the types of the first
+        header = self.header(sheet_name)
+        if not header:
+            return
+        with pd.read_csv(self.path, sep=self.separator, header=0, names=header, usecols=usecols,
+                         memory_map=self.memory_map, encoding="utf-8-sig", chunksize=CSV_STREAM_ROWS) as reader:
+            for df in reader:
+                if stats is not None:
+                    stats.add(len(df))
+                yield df
+
+    def _empty_frame(self, sheet_name, usecols):
+        """A frame without rows but with the columns a read would have"""
+        return pd.DataFrame(columns=usecols if usecols is not None else self.header(sheet_name))
+
+    def _make_frame(self, rows, columns, stats):
+        df = pd.DataFrame.from_records(rows, columns=columns)
+        if stats is not None:
+            stats.add(len(df))
+        return df
+
+
+def make_column_names(header):
+    """Name header cells the way pandas does (Unnamed: n, duplicates as A.1)"""
+    names = []
+    seen = {}
+    for i, value in enumerate(header):
+        name = f"Unnamed: {i}" if value is None else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names